@@ -4,33 +4,148 @@
 # Alex Holehouse
 # January 2013
 # v 0.1
+#
+# Removes everything but sequence characters (spaces, newlines, tabs,
+# numbers etc) from a string, or from whole files read in large chunks.
+# Cleaning uses str.translate with a table of the characters to delete,
+# so each chunk is a single C level pass and memory use doesn't grow
+# with the size of the input.
+#
 
+import sys
 
-if __name__ == "__main__":
-    import string
-    import argparse	
-    import sys						
+# characters kept by klean and klean_nuc
+AMINO_ACIDS = 'acdefghiklmnpqrstvwyACDEFGHIKLMNPQRSTVWY'
+NUCLEOTIDES = 'acgtuACGTU'
+
+# read size used when cleaning files
+CHUNK_BYTES = 2**22
+
+_DELETE = {}
+
+
+def deletion_table(keep):
+    """ Input:  String of the characters to keep
+
+        Output: String of every other byte value, for str.translate
+    """
+    try:
+        return _DELETE[keep]
+    except KeyError:
+        delete = "".join([chr(i) for i in xrange(256) if chr(i) not in keep])
+        _DELETE[keep] = delete
+        return delete
+
+
+def klean_string(inputString, keep=AMINO_ACIDS):
+    """ Input:  A string and optionally the characters to keep
+
+        Output: The string with every other character removed
+    """
+    return inputString.translate(None, deletion_table(keep))
+
+
+def klean_stream(source, dest, keep=AMINO_ACIDS, chunk_bytes=CHUNK_BYTES):
+    """ Input:  An open file object to read from, one to write to, and
+                optionally the characters to keep and the read size
+
+        Output: Number of characters written. The input is read and
+                cleaned chunk_bytes at a time
+    """
+    delete = deletion_table(keep)
+    written = 0
+
+    while True:
+        chunk = source.read(chunk_bytes)
+        if not chunk:
+            break
+
+        chunk = chunk.translate(None, delete)
+        dest.write(chunk)
+        written += len(chunk)
+
+    return written
+
+
+def klean_files(filenames, dest, keep=AMINO_ACIDS, chunk_bytes=CHUNK_BYTES):
+    """ Input:  List of filenames ("-" for stdin), an open file object to
+                write to, and optionally the characters to keep and the
+                read size
+
+        Output: Number of characters written. Files are cleaned one
+                after the other into dest
+    """
+    written = 0
+    for filename in filenames:
+        if filename == "-":
+            written += klean_stream(sys.stdin, dest, keep, chunk_bytes)
+        else:
+            with open(filename, "rb") as f:
+                written += klean_stream(f, dest, keep, chunk_bytes)
+
+    return written
+
+
+def _openClipboard():
+    """ xsel process whose stdin is the middle mouse click clipboard
+    """
     from subprocess import Popen, PIPE
 
-    # test that xsel is installed. 
+    # test that xsel is installed.
     try:
-        p = Popen(['xsel','-pi'], stdin=PIPE)
+        return Popen(['xsel','-pi'], stdin=PIPE)
     except:
         print " =============================== ERROR! ===============================\n\n          klean requires an external program called xsel.\n\nPlease ensure it is installed and configured to be called from the command\nline correctly. In Ubuntu this is as simple as 'sudo apt-get install xsel'.\nFor more information see http://www.vergenet.net/~conrad/software/xsel/.\n\nTo check it has been installed correctly, type 'xsel --help' in the terminal.\nYou should be greeted with xsel's help information.\n\nFor further help contact alex@holehouse.org"
         exit(1)
 
 
-    parser = argparse.ArgumentParser(description='Clear an input string of spaces, newlines, tabs etc, and copy to clipboard. [Contact alex@holehouse.org]')
-    parser.add_argument('input', metavar='input',  nargs='+',
+def main(keep, name):
+    """ Command line interface shared by klean and klean_nuc
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Clear an input string (or files) of spaces, newlines, tabs etc, leaving only ' + name + ' characters. Strings are copied to the clipboard, files are written to stdout. [Contact alex@holehouse.org]')
+    parser.add_argument('input', metavar='input',  nargs='*',
                         help='input string (in quotation marks)')
+    parser.add_argument('-f', '--file', action='append', default=[],
+                        help='clean a file instead ("-" for stdin, can be given more than once)')
+    parser.add_argument('-o', '--out', help='write the output to this file')
+    parser.add_argument('-c', '--clipboard', action='store_true',
+                        help='copy the output to the clipboard (needs xsel, default for input strings)')
 
     args = parser.parse_args()
 
-    # get input string
-    inputString = args.input[0]
+    if not args.input and not args.file:
+        parser.error("give an input string or --file")
 
-    # get characters we care about 
-    charSet = 'acdefghiklmnpqrstvwyACDEFGHIKLMNPQRSTVWY' # amino acids only
+    clipboard = args.clipboard or (args.input and not args.file and args.out is None)
+    if clipboard and args.out is not None:
+        parser.error("--clipboard and --out can't be used together")
 
-    # build and add newstring to the middle mouse click
-    p.communicate(input=("".join([x for x in inputString if x in charSet])))
+    if clipboard:
+        p = _openClipboard()
+        dest = p.stdin
+    elif args.out is not None:
+        dest = open(args.out, "wb")
+    else:
+        dest = sys.stdout
+
+    try:
+        # get input string
+        for inputString in args.input[:1]:
+            dest.write(klean_string(inputString, keep))
+        klean_files(args.file, dest, keep)
+
+    except IOError, e:
+        print "[ERROR] - " + str(e)
+        exit(1)
+
+    finally:
+        if dest is not sys.stdout:
+            dest.close()
+        if clipboard:
+            p.wait()
+
+
+if __name__ == "__main__":
+    main(AMINO_ACIDS, "amino acid")
@@ -21,6 +21,7 @@
 # Amino acids!
 AA = ("A","C","D","E","F","G","H","I","K","L","M","N","P","Q","R","S","T","V","W","Y")
 AA1_TO_3 ={"A":"Ala","C":"Cys","D":"Asp","E":"Glu", "F":"Phe", "G":"Gly", "H":"His","I":"Ile","K":"Lys","L":"Leu","M":"Met","N":"Asn","P":"Pro","Q":"Gln","R":"Arg","S":"Ser","T":"Thr","V":"Val","W":"Trp","Y":"Tyr"}
+AA3_TO_1 = dict([(three.upper(), one) for (one, three) in AA1_TO_3.items()])
 
 
 # ------------------------------------------------------------
@@ -264,3 +265,76 @@ SHEET_PROPENSITY = {'A':0.75,\
 LOW_EXPOSED = ("I", "C", "L", "V", "F","M", "W","A")
 MED_EXPOSED = ("G", "H","P", "S", "T", "Y")
 HIGH_EXPOSED = ("R", "D", "N", "E", "Q", "K")
+
+
+# ------------------------------------------------------------
+# SCALE REGISTRY
+#
+# Every per-residue scale above, and any registered with register_scale,
+# is compiled once into a 256 entry array('d') indexed by character code
+# (upper and lower case residues both map to the residue's value, every
+# other character to NaN). Functions which sum, average or window a scale
+# (see sequenceTools.calc_scaleSum and calc_windowProfile) look values
+# up by byte rather than through a dictionary, so a new scale only needs
+# registering here to work with all of them.
+#
+# ADDING ADDITIONAL SCALES
+# e.g. register_scale("MY_SCALE", {"A":0.5, "C":1.2, ...}) with a value
+# for each of the 20 amino acids in AA
+#
+
+import array as _array
+
+class aaGroupsException(Exception):
+    """
+       Exception class for aaGroups methods
+    """
+    pass
+
+
+# scale name -> dictionary of per-residue values
+SCALES = {}
+
+# scale name -> 256 entry array('d') lookup table
+SCALE_TABLES = {}
+
+
+def _compileScale(name, values):
+    missing = [a for a in AA if a not in values]
+    if missing:
+        raise aaGroupsException("Scale '" + str(name) + "' has no value for " + str(missing))
+
+    table = _array.array('d', [float("nan")]*256)
+    for a in AA:
+        table[ord(a)] = float(values[a])
+        table[ord(a.lower())] = float(values[a])
+    return table
+
+
+def register_scale(name, values):
+    """ Register (or replace) a per-residue scale, compiling it into a
+        lookup table
+
+        name       Name to refer to the scale by
+        values     Dictionary with a value for every residue in AA
+    """
+    SCALE_TABLES[name] = _compileScale(name, values)
+    SCALES[name] = dict([(a, values[a]) for a in AA])
+
+
+def get_scale_table(scale):
+    """ Lookup table for a registered scale name, or for a dictionary of
+        per-residue values (compiled on the fly, not registered)
+    """
+    if isinstance(scale, dict):
+        return _compileScale("<dict>", scale)
+
+    try:
+        return SCALE_TABLES[scale]
+    except (KeyError, TypeError):
+        raise aaGroupsException("Unknown scale '" + str(scale) + "'. Registered scales are " + str(sorted(SCALES.keys())))
+
+
+for _name in ("KD_HYDROPHOBICITY", "HELIX_ENTROPY", "COIL_ENTROPY", "HELIX_PROPENSITY",
+              "HELIX_PROPENSITY_KCAL", "SHEET_PROPENSITY", "SHEET_PROPENSITY_KCAL"):
+    register_scale(_name, globals()[_name])
@@ -0,0 +1,397 @@
+# cache
+#
+# Content addressed cache for sequenceTools descriptors.
+#
+# Values are keyed by a hash of the (upper case) sequence, the descriptor
+# name and its parameters, with defaults filled in, so
+#
+#     calc("EntropySum", seq) and calc("EntropySum", seq, conf="helix")
+#
+# share an entry, while calc("EntropySum", seq, "coil") doesn't.
+# Identical sequences anywhere in the input (isoforms, repeated runs,
+# reference sets) are computed once.
+#
+# There are two tiers
+#
+#   memory   An LRU dictionary of at most maxsize entries, per process
+#
+#   disk     Optional. One pickle file per entry under a directory,
+#            sharded by the first two characters of the key. Files are
+#            written to a temporary name and renamed into place, so
+#            concurrent worker processes never see a partial entry, and
+#            reads touch the file's mtime so eviction (oldest mtime
+#            first, once the store is larger than max_bytes) is roughly
+#            least recently used. Only one process evicts at a time; the
+#            others skip eviction rather than wait.
+#
+# Hits and misses are counted per tier (see DescriptorCache.stats).
+#
+
+import collections
+import cPickle as pickle
+import hashlib
+import inspect
+import os
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import sequenceTools
+
+
+# ---------------------------------------
+#
+class cacheException(Exception):
+    """
+       Exception class for cache methods
+    """
+    pass
+
+
+# default number of entries held in memory
+MEMORY_ENTRIES = 100000
+
+# default size of the on-disk store
+DISK_BYTES = 2**30
+
+# after an eviction the store is at most this fraction of max_bytes
+_EVICT_TO = 0.9
+
+_LOCK_NAME = ".evict.lock"
+
+
+def descriptor_key(seq, name, params):
+    """ Input:  A sequence, a descriptor name and a dictionary of its
+                parameters
+
+        Output: Hex digest identifying the value of that descriptor for
+                that sequence
+    """
+    digest = hashlib.sha1()
+    digest.update(name)
+    digest.update("\0")
+    digest.update(repr(sorted(params.items())))
+    digest.update("\0")
+    digest.update(seq.upper())
+    return digest.hexdigest()
+
+
+def _descriptorFunction(name):
+    """ The sequenceTools function for a descriptor name, with or without
+        its calc_ prefix
+    """
+    if not name.startswith("calc_"):
+        name = "calc_" + name
+
+    fn = getattr(sequenceTools, name, None)
+    if fn is None or not callable(fn):
+        raise cacheException("Unknown descriptor '" + name + "'")
+    return fn
+
+
+def _parameters(fn, seq, args, kwargs):
+    """ All of the arguments fn would be called with apart from the
+        sequence (including defaults), as a dictionary
+    """
+    original = getattr(fn, "__wrapped__", fn)
+    try:
+        params = inspect.getcallargs(original, seq, *args, **kwargs)
+    except TypeError, e:
+        raise cacheException(str(e))
+
+    params.pop(inspect.getargspec(original).args[0])
+    return params
+
+
+# ---------------------------------------
+#
+class LRUCache(object):
+    """
+       A dictionary holding at most maxsize entries, which discards the
+       least recently used entry when full.
+    """
+
+    def __init__(self, maxsize=MEMORY_ENTRIES):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()
+
+
+    def __len__(self):
+        return len(self._entries)
+
+
+    def __contains__(self, key):
+        return key in self._entries
+
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries.pop(key)
+        except KeyError:
+            return default
+
+        self._entries[key] = value
+        return value
+
+
+    def set(self, key, value):
+        self._entries.pop(key, None)
+        self._entries[key] = value
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+    def clear(self):
+        self._entries.clear()
+
+
+# ---------------------------------------
+#
+class DiskStore(object):
+    """
+       A directory of pickled entries, safe to share between processes.
+
+       directory  Where entries are stored (created if needed)
+
+       max_bytes  Size the store is kept under
+    """
+
+    def __init__(self, directory, max_bytes=DISK_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                # another process may have just made it
+                if not os.path.isdir(directory):
+                    raise
+
+        # bytes written since the store's size was last checked
+        self._written = 0
+        self.evict()
+
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+
+    def get(self, key):
+        """ Returns (True, value) if key is in the store, otherwise
+            (False, None)
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return (False, None)
+
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        return (True, value)
+
+
+    def set(self, key, value):
+        path = self._path(key)
+        shard = os.path.dirname(path)
+        if not os.path.isdir(shard):
+            try:
+                os.mkdir(shard)
+            except OSError:
+                if not os.path.isdir(shard):
+                    raise
+
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        (fd, tmp) = tempfile.mkstemp(dir=shard, prefix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.rename(tmp, path)
+        except:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        # the size of the whole store is only checked every so often
+        self._written += len(data)
+        if self._written > self.max_bytes*(1 - _EVICT_TO):
+            self.evict()
+
+
+    def size(self):
+        """ Total size in bytes of the entries in the store
+        """
+        return sum([size for (_, _, size) in self._entries()])
+
+
+    def _entries(self):
+        entries = []
+        for (root, _, files) in os.walk(self.directory):
+            for name in files:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+
+    def evict(self):
+        """ Remove the least recently used entries until the store is
+            under max_bytes. Does nothing if another process is already
+            evicting
+        """
+        self._written = 0
+
+        lock = open(os.path.join(self.directory, _LOCK_NAME), "a")
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError:
+                    return
+
+            entries = self._entries()
+            total = sum([size for (_, _, size) in entries])
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for (_, path, size) in entries:
+                if total <= self.max_bytes*_EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    # already removed by someone else
+                    pass
+                total -= size
+        finally:
+            lock.close()
+
+
+    def clear(self):
+        for (_, path, _) in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# ---------------------------------------
+#
+class DescriptorCache(object):
+    """
+       Two tier (memory, then optionally disk) cache of descriptor values.
+
+       maxsize    Number of entries held in memory
+
+       directory  Directory for the on-disk tier (default = no disk tier)
+
+       max_bytes  Size the on-disk tier is kept under
+    """
+
+    def __init__(self, maxsize=MEMORY_ENTRIES, directory=None, max_bytes=DISK_BYTES):
+        self.memory = LRUCache(maxsize)
+        if directory is None:
+            self.disk = None
+        else:
+            self.disk = DiskStore(directory, max_bytes)
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+
+    def get(self, key):
+        """ Returns (True, value) if key is cached, otherwise (False, None)
+        """
+        if key in self.memory:
+            self.memory_hits += 1
+            return (True, self.memory.get(key))
+
+        if self.disk is not None:
+            (found, value) = self.disk.get(key)
+            if found:
+                self.disk_hits += 1
+                self.memory.set(key, value)
+                return (True, value)
+
+        self.misses += 1
+        return (False, None)
+
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+
+    def calc(self, name, seq, *args, **kwargs):
+        """ Input:  A sequenceTools descriptor name (e.g. "EntropySum" or
+                    "calc_EntropySum"), a sequence and any other
+                    arguments to the descriptor function
+
+            Output: The descriptor value, from the cache if possible
+        """
+        fn = _descriptorFunction(name)
+        key = descriptor_key(seq, fn.__name__, _parameters(fn, seq, args, kwargs))
+
+        (found, value) = self.get(key)
+        if not found:
+            value = fn(seq, *args, **kwargs)
+            self.set(key, value)
+
+        return value
+
+
+    def wrap(self, name):
+        """ Input:  A sequenceTools descriptor name
+
+            Output: Function with the same arguments as the descriptor
+                    function which goes through the cache
+        """
+        fn = _descriptorFunction(name)
+
+        def cached(seq, *args, **kwargs):
+            return self.calc(fn.__name__, seq, *args, **kwargs)
+
+        cached.__name__ = fn.__name__
+        cached.__doc__ = fn.__doc__
+        return cached
+
+
+    def stats(self):
+        """ Dictionary of hit/miss counters (for this process)
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {"memory_hits" : self.memory_hits,
+                "disk_hits"   : self.disk_hits,
+                "misses"      : self.misses,
+                "hit_rate"    : (self.memory_hits + self.disk_hits)/float(lookups) if lookups else 0.0}
+
+
+    def clear(self):
+        """ Empty both tiers and reset the counters
+        """
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
@@ -0,0 +1,454 @@
+#!/usr/bin/python
+# dedup
+#
+# Collapse duplicate and near-duplicate sequences in one or more FASTA
+# files into clusters, so descriptors only need to be computed once per
+# cluster (for its representative).
+#
+# There are two stages
+#
+#   exact   Every sequence is hashed (sha1 of the upper case sequence)
+#           and written to one of a number of bucket files on disk,
+#           chosen by its hash. Buckets are then read back one at a time
+#           and grouped by hash, so only one bucket's distinct sequences
+#           are ever held in memory.
+#
+#   near    Optional. Each distinct sequence gets a MinHash signature
+#           over its k-mers (the minimum of num_hashes multiply-shift
+#           hashes of the k-mers, computed for many sequences at once
+#           with numpy) which is written to disk and memory mapped.
+#           Signatures are split into bands and sequences whose band
+#           agrees are candidate pairs (locality sensitive hashing).
+#           Candidates are kept if the fraction of matching signature
+#           entries, an estimate of the Jaccard similarity of their
+#           k-mer sets, is at least that expected for the requested
+#           identity, and the shorter sequence is at least identity
+#           times the length of the longer. Kept pairs are joined
+#           (union-find) into clusters.
+#
+# The representative of a cluster is its first sequence in input order.
+# Memory use is a few bytes per distinct sequence (the union-find and
+# per-band arrays) plus one bucket; the sequences themselves and their
+# signatures stay on disk.
+#
+# Near-duplicate clustering is approximate. Pairs can be missed when no
+# band agrees, and clusters are transitive, so two members of one
+# cluster can be less similar than the threshold.
+#
+
+import array
+import hashlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from extract_accessions import read_fasta
+from fasta_index import header_accession
+
+
+# ---------------------------------------
+#
+class dedupException(Exception):
+    """
+       Exception class for dedup methods
+    """
+    pass
+
+
+# default k-mer length and signature size
+KMER = 5
+NUM_HASHES = 64
+
+# default number of bucket files each stage is spilled to
+BUCKETS = 256
+
+# number of sequences given signatures at once
+SIGNATURE_BATCH = 10000
+
+# k-mers hashed at once (each takes num_hashes 8 byte hashes)
+_CHUNK_KMERS = 2**16
+
+# candidate pairs checked at once
+_CHUNK_PAIRS = 2**16
+
+_BAND_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+
+def sequence_digest(seq):
+    """ Input:  A sequence
+
+        Output: Hex digest identifying the (upper case) sequence
+    """
+    return hashlib.sha1(seq.upper()).hexdigest()
+
+
+def identity_to_jaccard(identity, k=KMER):
+    """ Input:  Sequence identity (0-1) and k-mer length
+
+        Output: Expected Jaccard similarity of the k-mer sets of two
+                sequences with that identity (substitutions spread
+                evenly, so a fraction identity^k of k-mers are shared)
+    """
+    shared = identity**k
+    return shared/(2 - shared)
+
+
+def _hashParameters(num_hashes, seed):
+    """ Odd multipliers and offsets for the multiply-shift hashes
+    """
+    rng = np.random.RandomState(seed)
+    (high, low) = rng.randint(0, 2**32, (2, 2, num_hashes)).astype(np.uint64)
+    return ((high[0] << np.uint64(32)) | low[0] | np.uint64(1), (high[1] << np.uint64(32)) | low[1])
+
+
+def _kmerValues(seqs, k):
+    """ Every k-mer of every sequence as an integer (its bytes in base
+        256), and the offset of each sequence's first k-mer. Sequences
+        shorter than k are padded so they have one k-mer
+    """
+    padded = [s.upper() + "\0"*(k - len(s)) if len(s) < k else s.upper() for s in seqs]
+    lengths = np.array([len(s) for s in padded], dtype=np.int64)
+    data = np.frombuffer("".join(padded), dtype=np.uint8).astype(np.uint64)
+
+    counts = lengths - k + 1
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # k-mer starts skip the last k-1 positions of every sequence
+    seqStarts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    starts = np.arange(counts.sum()) - np.repeat(offsets - seqStarts, counts)
+
+    values = np.zeros(len(starts), dtype=np.uint64)
+    for j in range(k):
+        values = (values << np.uint64(8)) | data[starts + j]
+
+    return (values, offsets)
+
+
+def calc_signatures(seqs, k=KMER, num_hashes=NUM_HASHES, seed=0):
+    """ Input:  List of sequences, the k-mer length (1-8), the signature
+                size and the seed of the hash functions
+
+        Output: (n x num_hashes) uint32 numpy array of MinHash signatures.
+                The fraction of entries two signatures share estimates
+                the Jaccard similarity of the sequences' k-mer sets
+                (upper case)
+    """
+    if k < 1 or k > 8:
+        raise dedupException("k must be between 1 and 8, not " + str(k))
+
+    (a, b) = _hashParameters(num_hashes, seed)
+    signatures = np.empty((len(seqs), num_hashes), dtype=np.uint32)
+
+    first = 0
+    while first < len(seqs):
+        # as many sequences as fit in one chunk of k-mers (at least one)
+        last = first + 1
+        total = max(len(seqs[first]) - k + 1, 1)
+        while last < len(seqs) and total + max(len(seqs[last]) - k + 1, 1) <= _CHUNK_KMERS:
+            total += max(len(seqs[last]) - k + 1, 1)
+            last += 1
+
+        (values, offsets) = _kmerValues(seqs[first:last], k)
+        # hashes x k-mers, so each reduction runs along contiguous memory
+        hashes = (a[:, None]*values[None, :] + b[:, None]) >> np.uint64(32)
+        signatures[first:last] = np.minimum.reduceat(hashes, offsets, axis=1).T
+
+        first = last
+
+    return signatures
+
+
+def _bandShape(jaccard, num_hashes):
+    """ (bands, rows) dividing num_hashes whose LSH threshold,
+        (1/bands)^(1/rows), is the highest which is still at or below
+        jaccard, so few true pairs are missed
+    """
+    shapes = []
+    for bands in range(1, num_hashes + 1):
+        if num_hashes % bands == 0:
+            rows = num_hashes//bands
+            threshold = (1.0/bands)**(1.0/rows)
+            if threshold <= jaccard:
+                shapes.append((threshold, bands, rows))
+
+    if len(shapes) == 0:
+        return (num_hashes, 1)
+    return max(shapes)[1:]
+
+
+def _bandKeys(signatures):
+    """ One 64 bit key per row of a block of signature columns
+    """
+    keys = np.zeros(len(signatures), dtype=np.uint64)
+    for j in range(signatures.shape[1]):
+        keys = keys*_BAND_MULTIPLIER + signatures[:, j].astype(np.uint64)
+    return keys
+
+
+def _find(parent, i):
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        (parent[i], i) = (root, parent[i])
+    return root
+
+
+def link_near_duplicates(signatures, lengths, identity, k=KMER):
+    """ Input:  (n x num_hashes) signatures, the length of each sequence,
+                the identity threshold (0-1) and the k-mer length the
+                signatures were made with
+
+        Output: numpy array giving, for each sequence, the smallest
+                index in its cluster
+    """
+    n = len(signatures)
+    parent = np.arange(n)
+    if n == 0:
+        return parent
+
+    jaccard = identity_to_jaccard(identity, k)
+    (bands, rows) = _bandShape(jaccard, signatures.shape[1])
+    lengths = np.asarray(lengths, dtype=np.int64)
+
+    for band in range(bands):
+        keys = np.empty(n, dtype=np.uint64)
+        for start in range(0, n, SIGNATURE_BATCH):
+            keys[start:start+SIGNATURE_BATCH] = _bandKeys(signatures[start:start+SIGNATURE_BATCH, band*rows:(band+1)*rows])
+
+        # sequences with the same key are compared with the first
+        # (lowest index) sequence with that key
+        order = np.argsort(keys, kind="mergesort")
+        keys = keys[order]
+        newKey = np.concatenate(([True], keys[1:] != keys[:-1]))
+        firsts = order[newKey][np.cumsum(newKey) - 1]
+        (left, right) = (firsts[~newKey], order[~newKey])
+
+        for start in range(0, len(left), _CHUNK_PAIRS):
+            (i, j) = (left[start:start+_CHUNK_PAIRS], right[start:start+_CHUNK_PAIRS])
+            similar = (signatures[i] == signatures[j]).mean(axis=1) >= jaccard
+            (short, long) = (np.minimum(lengths[i], lengths[j]), np.maximum(lengths[i], lengths[j]))
+            similar &= short >= identity*long
+
+            for (x, y) in zip(i[similar], j[similar]):
+                (x, y) = (_find(parent, x), _find(parent, y))
+                if x != y:
+                    parent[max(x, y)] = min(x, y)
+
+    # every root is smaller than its children, so this converges
+    while True:
+        grandparent = parent[parent]
+        if (grandparent == parent).all():
+            return parent
+        parent = grandparent
+
+
+def _bucketPaths(directory, name, buckets):
+    return [os.path.join(directory, name + "." + str(i)) for i in range(buckets)]
+
+
+def _spill(lines, paths):
+    """ Write (bucket, line) pairs to the bucket files
+    """
+    files = [open(path, "w") for path in paths]
+    try:
+        for (bucket, line) in lines:
+            files[bucket].write(line)
+    finally:
+        for f in files:
+            f.close()
+
+
+def _exactClusters(filenames, directory, buckets):
+    """ Generator which yields (first, accession, sequence, members) for
+        each distinct sequence, where first is the input position of its
+        first occurrence and members the accessions of every occurrence
+    """
+    def records():
+        index = 0
+        for filename in filenames:
+            for (header, sequence) in read_fasta(filename):
+                digest = sequence_digest(sequence)
+                yield (int(digest[:8], 16) % buckets, digest + "\t" + str(index) + "\t" + header_accession(header) + "\t" + sequence + "\n")
+                index += 1
+
+    paths = _bucketPaths(directory, "exact", buckets)
+    _spill(records(), paths)
+
+    for path in paths:
+        groups = {}
+        with open(path) as f:
+            for line in f:
+                (digest, index, accession, sequence) = line.rstrip("\n").split("\t")
+                if digest in groups:
+                    groups[digest][3].append(accession)
+                else:
+                    groups[digest] = (int(index), accession, sequence, [accession])
+        os.remove(path)
+
+        for cluster in sorted(groups.values()):
+            yield cluster
+
+
+def _nearClusters(exact, directory, buckets, identity, k, num_hashes, seed):
+    """ Merges the exact clusters of similar sequences, yielding
+        clusters as for _exactClusters
+    """
+    clusterPath = os.path.join(directory, "clusters")
+    signaturePath = os.path.join(directory, "signatures")
+    lengths = array.array('l')
+
+    # exact clusters and their signatures are written out in the same
+    # order, so cluster i is line i and signature row i
+    with open(clusterPath, "w") as out:
+        with open(signaturePath, "wb") as signatures:
+            batch = []
+            for (first, accession, sequence, members) in exact:
+                out.write(str(first) + "\t" + accession + "\t" + sequence + "\t" + " ".join(members) + "\n")
+                lengths.append(len(sequence))
+                batch.append(sequence)
+
+                if len(batch) >= SIGNATURE_BATCH:
+                    signatures.write(calc_signatures(batch, k, num_hashes, seed).tostring())
+                    batch = []
+
+            if len(batch) > 0:
+                signatures.write(calc_signatures(batch, k, num_hashes, seed).tostring())
+
+    if len(lengths) > 0:
+        signatures = np.memmap(signaturePath, dtype=np.uint32, mode="r", shape=(len(lengths), num_hashes))
+    else:
+        signatures = np.zeros((0, num_hashes), dtype=np.uint32)
+    roots = link_near_duplicates(signatures, lengths, identity, k)
+    del signatures
+
+    def lines():
+        with open(clusterPath) as f:
+            for (i, line) in enumerate(f):
+                yield (roots[i] % buckets, str(roots[i]) + "\t" + line)
+
+    paths = _bucketPaths(directory, "near", buckets)
+    _spill(lines(), paths)
+    os.remove(clusterPath)
+    os.remove(signaturePath)
+
+    for path in paths:
+        groups = {}
+        with open(path) as f:
+            for line in f:
+                (root, first, accession, sequence, members) = line.rstrip("\n").split("\t")
+                groups.setdefault(root, []).append((int(first), accession, sequence, members.split(" ")))
+        os.remove(path)
+
+        merged = []
+        for group in groups.values():
+            group.sort()
+            members = []
+            for cluster in group:
+                members.extend(cluster[3])
+            merged.append(group[0][:3] + (members,))
+
+        for cluster in sorted(merged):
+            yield cluster
+
+
+def iter_clusters(filenames, identity=None, k=KMER, num_hashes=NUM_HASHES, buckets=BUCKETS, workdir=None, seed=0):
+    """ Input:  List of FASTA filenames and optionally
+
+                identity    Also merge sequences with at least this
+                            identity (0-1), estimated from MinHash
+                            signatures (default = exact duplicates only)
+
+                k           k-mer length of the signatures (1-8)
+
+                num_hashes  Signature size
+
+                buckets     Number of files the input is spilled to.
+                            Each is read into memory on its own, so
+                            larger inputs need more buckets
+
+                workdir     Directory for temporary files (default =
+                            the system temporary directory)
+
+                seed        Seed of the MinHash hash functions
+
+        Output: Generator which yields (accession, sequence, members) for
+                every cluster, where accession and sequence are those of
+                the representative (the first member in input order)
+                and members is a list of the accessions of every
+                sequence in the cluster, representative first. Sequences
+                are compared ignoring case
+    """
+    if identity is not None and not 0 < identity <= 1:
+        raise dedupException("identity must be between 0 and 1, not " + str(identity))
+    if k < 1 or k > 8:
+        raise dedupException("k must be between 1 and 8, not " + str(k))
+    if buckets < 1:
+        raise dedupException("Invalid number of buckets " + str(buckets))
+
+    directory = tempfile.mkdtemp(prefix="dedup", dir=workdir)
+    try:
+        clusters = _exactClusters(filenames, directory, buckets)
+        if identity is not None:
+            clusters = _nearClusters(clusters, directory, buckets, identity, k, num_hashes, seed)
+
+        for (first, accession, sequence, members) in clusters:
+            yield (accession, sequence, members)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Collapse duplicate (and optionally near-duplicate) sequences in one or more FASTA files. Writes a tab seperated table of representative, cluster size and members to STDOUT')
+    parser.add_argument('filename', metavar='filename',  nargs='+',
+                        help='FASTA file(s) to collapse')
+
+    parser.add_argument('--identity', dest='identity', type=float, default=None,
+                        help='also merge sequences with at least this identity (0-1, default = exact duplicates only)')
+
+    parser.add_argument('--kmer', dest='kmer', type=int, default=KMER,
+                        help='k-mer length for near-duplicates (default = ' + str(KMER) + ')')
+
+    parser.add_argument('--hashes', dest='hashes', type=int, default=NUM_HASHES,
+                        help='MinHash signature size (default = ' + str(NUM_HASHES) + ')')
+
+    parser.add_argument('--buckets', dest='buckets', type=int, default=BUCKETS,
+                        help='number of temporary bucket files (default = ' + str(BUCKETS) + ')')
+
+    parser.add_argument('--workdir', dest='workdir', default=None,
+                        help='directory for temporary files')
+
+    parser.add_argument('--fasta', dest='fasta', default=None,
+                        help='also write the representative sequences to this FASTA file')
+
+    args = parser.parse_args()
+
+    fasta = None
+    if args.fasta:
+        fasta = open(args.fasta, "w")
+
+    numSequences = 0
+    numClusters = 0
+    try:
+        for (accession, sequence, members) in iter_clusters(args.filename, args.identity, args.kmer, args.hashes, args.buckets, args.workdir):
+            sys.stdout.write(accession + "\t" + str(len(members)) + "\t" + ",".join(members) + "\n")
+            if fasta is not None:
+                fasta.write(">" + accession + "\n" + sequence + "\n")
+            numSequences += len(members)
+            numClusters += 1
+
+    except (IOError, dedupException), e:
+        print "[ERROR] - " + str(e)
+        exit(1)
+
+    finally:
+        if fasta is not None:
+            fasta.close()
+
+    sys.stderr.write("Collapsed " + str(numSequences) + " sequences into " + str(numClusters) + " clusters\n")
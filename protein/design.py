@@ -0,0 +1,402 @@
+# design
+#
+# Monte Carlo sequence design against sequenceTools descriptors.
+#
+# A design run starts from a sequence and repeatedly proposes a move,
+# either
+#
+#   mutation   one (non-fixed) position changed to another residue from
+#              the alphabet
+#   swap       two (non-fixed) positions exchanged, which keeps the
+#              composition
+#
+# and accepts it with the Metropolis criterion on the energy
+#
+#   E = sum_k weight_k * (value_k - target_k)^2
+#
+# over a list of objectives. The candidate is held as a bytearray of
+# residue codes and every objective keeps running totals which it updates
+# from the changed positions alone
+#
+#   composition descriptors   any of sequenceTools.BATCH_DESCRIPTORS (NCPR,
+#                             HydrophobicityScore, ...) - one running sum,
+#                             O(1) per move
+#   kappa                     per-blob G1/G2 counts plus the sums of blob
+#                             asymmetry and its square, O(blob) per move,
+#                             with delta_max memoized per composition
+#   SCD                       the change in the pair sum from the changed
+#                             charges, O(L) per move (one dot product)
+#
+# Composition constraints (bounds on the count of a residue or group)
+# are checked incrementally, and moves which break them are rejected
+# without evaluating the objectives. Independent chains (different random
+# seeds) can be run in parallel over a pool of processes.
+#
+
+import math
+import multiprocessing
+import random
+
+import numpy as np
+
+import patterning
+import sequenceTools
+from aaGroups import *
+
+
+# ---------------------------------------
+#
+class designException(Exception):
+    """
+       Exception class for design methods
+    """
+    pass
+
+
+# objectives which aren't BATCH_DESCRIPTORS
+DESIGN_OBJECTIVES = ("kappa", "SCD")
+
+# running totals are recomputed from scratch this often (in accepted
+# moves) so floating point drift can't build up
+REFRESH_INTERVAL = 10000
+
+
+# ---------------------------------------
+#
+class _CompositionObjective(object):
+    """ A BATCH_DESCRIPTORS value, from a running per-residue sum
+    """
+
+    def __init__(self, name, codes):
+        (values, perResidue, scale) = sequenceTools._descriptorDef(name)
+        self.table = [values[a] for a in AA]
+        self.divisor = len(codes)*scale if perResidue else 1.0
+        self.refresh(codes)
+
+
+    def refresh(self, codes):
+        self.total = sum([self.table[c] for c in codes])
+        self.value = self.total/self.divisor
+
+
+    def propose(self, changes):
+        self.pending = self.total + sum([self.table[new] - self.table[old] for (_, old, new) in changes])
+        return self.pending/self.divisor
+
+
+    def commit(self, changes):
+        self.total = self.pending
+        self.value = self.total/self.divisor
+
+
+class _KappaObjective(object):
+    """ kappa (see patterning.calc_kappa), from per-blob counts
+    """
+
+    def __init__(self, codes, G1=NEG, G2=POS, blobs=patterning.BLOB_SIZES):
+        self.m1 = [1 if a in G1 else 0 for a in AA]
+        self.m2 = [1 if a in G2 else 0 for a in AA]
+        self.blobs = [blob for blob in blobs]
+        self.L = len(codes)
+        self._deltaMax = {}
+        self.refresh(codes)
+
+
+    def refresh(self, codes):
+        self.n1 = sum([self.m1[c] for c in codes])
+        self.n2 = sum([self.m2[c] for c in codes])
+
+        # per blob size: [counts1, counts2, sum sigma, sum sigma^2]
+        self.state = []
+        for g in self.blobs:
+            c1 = [sum([self.m1[c] for c in codes[b:b+g]]) for b in xrange(self.L-g+1)]
+            c2 = [sum([self.m2[c] for c in codes[b:b+g]]) for b in xrange(self.L-g+1)]
+            sigmas = [_sigma(x, y, g) for (x, y) in zip(c1, c2)]
+            self.state.append([c1, c2, sum(sigmas), sum([s*s for s in sigmas])])
+
+        self.value = self._kappa(self.n1, self.n2, [(s[2], s[3]) for s in self.state])
+
+
+    def _getDeltaMax(self, n1, n2, g):
+        key = (n1, n2, g)
+        if key not in self._deltaMax:
+            self._deltaMax[key] = float(patterning._segregatedDeltaMax(np.array([n1]), np.array([n2]), np.array([self.L]), g)[0])
+        return self._deltaMax[key]
+
+
+    def _kappa(self, n1, n2, sums):
+        sigmaSeq = _sigma(n1, n2, self.L)
+
+        total = 0.0
+        for (g, (s1, s2)) in zip(self.blobs, sums):
+            numBlobs = self.L - g + 1
+            if numBlobs <= 0:
+                return -1.0
+            delta = (s2 - 2*sigmaSeq*s1 + numBlobs*sigmaSeq*sigmaSeq)/numBlobs
+            term = patterning._normalizedDelta(delta, self._getDeltaMax(n1, n2, g))
+            if not np.isfinite(term):
+                return -1.0
+            total += float(term)
+
+        return total/len(self.blobs)
+
+
+    def propose(self, changes):
+        n1 = self.n1 + sum([self.m1[new] - self.m1[old] for (_, old, new) in changes])
+        n2 = self.n2 + sum([self.m2[new] - self.m2[old] for (_, old, new) in changes])
+
+        self.pending = []
+        sums = []
+        for (g, (c1, c2, s1, s2)) in zip(self.blobs, self.state):
+            # new counts for every blob covering a changed position
+            updated = {}
+            for (i, old, new) in changes:
+                d1 = self.m1[new] - self.m1[old]
+                d2 = self.m2[new] - self.m2[old]
+                if d1 == 0 and d2 == 0:
+                    continue
+                for b in xrange(max(0, i-g+1), min(i, self.L-g)+1):
+                    (x, y) = updated.get(b, (c1[b], c2[b]))
+                    updated[b] = (x+d1, y+d2)
+
+            for (b, (x, y)) in updated.items():
+                old = _sigma(c1[b], c2[b], g)
+                new = _sigma(x, y, g)
+                s1 += new - old
+                s2 += new*new - old*old
+
+            self.pending.append((updated, s1, s2))
+            sums.append((s1, s2))
+
+        self.pendingCounts = (n1, n2)
+        return self._kappa(n1, n2, sums)
+
+
+    def commit(self, changes):
+        (self.n1, self.n2) = self.pendingCounts
+        for (state, (updated, s1, s2)) in zip(self.state, self.pending):
+            for (b, (x, y)) in updated.items():
+                state[0][b] = x
+                state[1][b] = y
+            state[2] = s1
+            state[3] = s2
+
+        self.value = self._kappa(self.n1, self.n2, [(s[2], s[3]) for s in self.state])
+
+
+class _SCDObjective(object):
+    """ SCD (see sequenceTools.calc_SCD), from the change in the pair sum
+    """
+
+    def __init__(self, codes):
+        self.table = np.array([sequenceTools._CHARGE[a] for a in AA], dtype=np.float64)
+        self.L = len(codes)
+
+        # weights[L-1-i+j] = |i-j|^0.5
+        self.weights = np.sqrt(np.abs(np.arange(-(self.L-1), self.L)).astype(np.float64))
+        self.refresh(codes)
+
+
+    def refresh(self, codes):
+        self.charges = self.table[np.frombuffer(bytes(codes), dtype=np.uint8)]
+        self.total = sequenceTools.calc_SCD("".join([AA[c] for c in codes]))*self.L
+        self.value = self.total/self.L
+
+
+    def propose(self, changes):
+        delta = 0.0
+        applied = []
+        for (i, old, new) in changes:
+            dq = self.table[new] - self.table[old]
+            if dq == 0:
+                continue
+            row = self.weights[self.L-1-i:2*self.L-1-i]
+            coefficient = self.charges.dot(row) + sum([dk*row[k] for (k, dk) in applied])
+            delta += dq*coefficient
+            applied.append((i, dq))
+
+        self.pending = self.total + delta
+        return self.pending/self.L
+
+
+    def commit(self, changes):
+        for (i, _, new) in changes:
+            self.charges[i] = self.table[new]
+        self.total = self.pending
+        self.value = self.total/self.L
+
+
+def _sigma(n1, n2, length):
+    if n1 + n2 == 0:
+        return 0.0
+    f1 = n1/float(length)
+    f2 = n2/float(length)
+    return (f1-f2)*(f1-f2)/(f1+f2)
+
+
+def _buildObjective(name, args, codes):
+    if name in sequenceTools._DESCRIPTOR_DEFS:
+        return _CompositionObjective(name, codes)
+    elif name == "kappa":
+        return _KappaObjective(codes, *args)
+    elif name == "SCD":
+        return _SCDObjective(codes)
+
+    raise designException("Unknown objective '" + str(name) + "'. Options are " + str(sequenceTools.BATCH_DESCRIPTORS + DESIGN_OBJECTIVES))
+
+
+# ---------------------------------------
+#
+def design_sequence(seq, objectives, steps=100000, temperature=0.01, fixed=(), composition=None,
+                    alphabet=AA, swap_fraction=0.5, seed=None):
+    """ Input:  seq            Starting sequence
+                objectives     List of (name, target, weight) or (name,
+                               target, weight, arguments) tuples, where
+                               name is one of BATCH_DESCRIPTORS or
+                               DESIGN_OBJECTIVES (arguments are passed on,
+                               e.g. (G1, G2) for kappa)
+                steps          Number of moves
+                temperature    Metropolis temperature (in energy units)
+                fixed          Positions (0 based) which are never changed
+                composition    Dictionary of residue or group -> (min, max)
+                               count, which every accepted sequence obeys
+                alphabet       Residues mutations may introduce
+                swap_fraction  Fraction of moves which are swaps
+                seed           Random seed
+
+        Output: Dictionary with the lowest energy sequence found
+                ("sequence"), its "energy" and objective "values" (in
+                objective order), and the number of "accepted" moves
+    """
+    (encoded, _) = sequenceTools._encodeBatch([seq])
+    codes = bytearray(encoded.astype(np.uint8).tobytes())
+    L = len(codes)
+
+    fixed = set(fixed)
+    for i in fixed:
+        if not 0 <= i < L:
+            raise designException("Fixed position " + str(i) + " is outside the sequence")
+    movable = [i for i in xrange(L) if i not in fixed]
+
+    alphabet = [sequenceTools.AA_INDEX[a.upper()] for a in alphabet]
+
+    # composition constraints as (membership, min, max, count)
+    constraints = []
+    if composition is not None:
+        for (GROUP, (lo, hi)) in composition.items():
+            member = [1 if a in GROUP else 0 for a in AA]
+            count = sum([member[c] for c in codes])
+            if not lo <= count <= hi:
+                raise designException("Starting sequence has " + str(count) + " residues from " + str(GROUP) + ", outside the allowed range")
+            constraints.append([member, lo, hi, count])
+
+    built = []
+    for objective in objectives:
+        if len(objective) == 3:
+            (name, target, weight) = objective
+            args = ()
+        else:
+            (name, target, weight, args) = objective
+        built.append((_buildObjective(name, args, codes), target, weight))
+
+    rng = random.Random(seed)
+
+    def energy(values):
+        return sum([weight*(v - target)**2 for (v, (_, target, weight)) in zip(values, built)])
+
+    current = energy([o.value for (o, _, _) in built])
+    best = (current, str(codes), [o.value for (o, _, _) in built])
+    accepted = 0
+
+    if len(movable) == 0:
+        steps = 0
+
+    for step in xrange(steps):
+        # propose a move
+        if len(movable) > 1 and rng.random() < swap_fraction:
+            (i, j) = rng.sample(movable, 2)
+            if codes[i] == codes[j]:
+                continue
+            changes = [(i, codes[i], codes[j]), (j, codes[j], codes[i])]
+        else:
+            i = rng.choice(movable)
+            new = rng.choice(alphabet)
+            if new == codes[i]:
+                continue
+            changes = [(i, codes[i], new)]
+
+            # composition bounds
+            allowed = True
+            for (member, lo, hi, count) in constraints:
+                if not lo <= count + member[new] - member[codes[i]] <= hi:
+                    allowed = False
+                    break
+            if not allowed:
+                continue
+
+        values = [o.propose(changes) for (o, _, _) in built]
+        proposed = energy(values)
+
+        if proposed <= current or rng.random() < math.exp(-(proposed - current)/temperature):
+            for (o, _, _) in built:
+                o.commit(changes)
+            for constraint in constraints:
+                constraint[3] += sum([constraint[0][new] - constraint[0][old] for (_, old, new) in changes])
+            for (k, _, new) in changes:
+                codes[k] = new
+
+            current = proposed
+            accepted += 1
+
+            if accepted % REFRESH_INTERVAL == 0:
+                for (o, _, _) in built:
+                    o.refresh(codes)
+                current = energy([o.value for (o, _, _) in built])
+
+            if current < best[0]:
+                best = (current, str(codes), [o.value for (o, _, _) in built])
+
+    return {"sequence" : "".join([AA[c] for c in bytearray(best[1])]),
+            "energy"   : best[0],
+            "values"   : best[2],
+            "accepted" : accepted}
+
+
+def _designChain(args):
+    (seq, objectives, kwargs) = args
+    return design_sequence(seq, objectives, **kwargs)
+
+
+def design_chains(seq, objectives, chains=4, processes=None, seed=None, **kwargs):
+    """ Input:  Starting sequence, objectives (see design_sequence), the
+                number of independent chains, the number of worker
+                processes (default = number of cores, 1 = don't use a
+                pool), a base random seed (chain k uses seed + k) and any
+                other design_sequence arguments
+
+        Output: List of design_sequence results, lowest energy first
+    """
+    if seed is None:
+        seed = random.randrange(2**30)
+
+    tasks = []
+    for k in xrange(chains):
+        chainArgs = dict(kwargs)
+        chainArgs["seed"] = seed + k
+        tasks.append((seq, objectives, chainArgs))
+
+    if processes is None:
+        processes = min(chains, multiprocessing.cpu_count())
+
+    if processes == 1:
+        results = [_designChain(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(_designChain, tasks)
+            pool.close()
+        finally:
+            pool.terminate()
+            pool.join()
+
+    return sorted(results, key=lambda result: result["energy"])
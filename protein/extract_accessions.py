@@ -7,72 +7,315 @@
 #
 #
 
-def __internal_handler(filename, request):
-    
-    if request == "acc":
-        r = 1
-    if request == "name":
-        r = 2
-    if request == "both":
-        r = 3
+import contextlib
+import mmap
+import re
+
+# UniProt header fields, in the order they're returned by
+# parse_uniprot_header / get_header_columns
+UNIPROT_FIELDS = ("db", "accession", "entry_name", "description", "OS", "OX", "GN", "PE", "SV")
+
+# read size used when counting records
+SCAN_CHUNK_BYTES = 2**24
+
+__UNIPROT_HEADER = re.compile(r"^>?(sp|tr)\|([^|]*)\|(\S*)\s*(.*?)(?:\s*OS=(.*?))?(?:\s+OX=(\d+))?(?:\s+GN=(.*?))?(?:\s+PE=(\d+))?(?:\s+SV=(\d+))?\s*$")
+
+
+# ---------------------------------------
+# Open a filename for reading, or pass an already open file
+# object straight through (without closing it afterwards)
+@contextlib.contextmanager
+def __open_fasta(filename):
+    if hasattr(filename, "readline"):
+        yield filename
+    else:
+        with open(filename) as f:
+            yield f
+
+
+def read_fasta(filename):
+    """ Input:  Name of file as string (or an open file object)
+
+        Output: Generator which yields a (header, sequence) tuple for 
+                each record in the file, in order. The header has the
+                leading '>' and newline removed and the sequence lines
+                are joined together. Only one record is held in memory
+                at a time.
+    """
+    with __open_fasta(filename) as f:
+        header = None
+        lines = []
+
+        for line in f:
+            if line.startswith(">"):
+                if header is not None:
+                    yield (header, "".join(lines))
+                header = line[1:].rstrip("\r\n")
+                lines = []
+            elif header is not None:
+                lines.append(line.strip())
+
+        if header is not None:
+            yield (header, "".join(lines))
+
+
+def iter_headers(filename):
+    """ Input:  Name of file as string (or an open file object)
+
+        Output: Generator which yields every header line in the file
+                (without the leading '>' or newline), skipping over
+                sequence lines without storing them
+    """
+    with __open_fasta(filename) as f:
+        for line in f:
+            if line.startswith(">"):
+                yield line[1:].rstrip("\r\n")
+
+
+def scan_headers(filename):
+    """ Input:  Name of file as string (or an open file object)
+
+        Output: Generator which yields every header line in the file
+                (without the leading '>' or newline). Files are memory
+                mapped and scanned by jumping from one '>' to the next,
+                so sequence lines are never read into Python.
+    """
+    if hasattr(filename, "readline"):
+        for header in iter_headers(filename):
+            yield header
+        return
+
+    with open(filename, "rb") as f:
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty files can't be mapped
+            return
+
+        try:
+            if mm[:1] == ">":
+                pos = 0
+            else:
+                pos = mm.find("\n>") + 1
+                if pos == 0:
+                    return
+
+            while True:
+                end = mm.find("\n", pos)
+                if end == -1:
+                    end = len(mm)
+                yield mm[pos+1:end].rstrip("\r")
+
+                # end is the header's own newline, so this also finds
+                # a header on the very next line
+                pos = mm.find("\n>", end) + 1
+                if pos == 0:
+                    break
+        finally:
+            mm.close()
+
+
+def count_records(filename, prefixes=None):
+    """ Input:  Name of file as string, and optionally a list of header
+                prefixes (e.g. ("sp|", "tr|"))
+
+        Output: The number of records in the file, or if prefixes is
+                given the number of records whose header starts with
+                one of them (prefixes shouldn't overlap each other). Reads the file in large chunks and counts
+                with bulk byte searches, without parsing any lines.
+    """
+    if prefixes is None:
+        patterns = ["\n>"]
+    else:
+        patterns = ["\n>" + p for p in prefixes]
+
+    overlap = max([len(p) for p in patterns]) - 1
+    count = 0
+
+    with open(filename, "rb") as f:
+        # treat the start of the file as following a newline
+        tail = "\n"
+        while True:
+            chunk = f.read(SCAN_CHUNK_BYTES)
+            if not chunk:
+                break
+
+            # patterns start with a newline so can't overlap each other,
+            # carrying the last few bytes over means none are missed or
+            # counted twice at chunk boundaries
+            block = tail + chunk
+            for p in patterns:
+                count += block.count(p) - tail.count(p)
+            tail = block[-overlap:]
+
+    return count
+
+
+def parse_uniprot_header(header):
+    """ Input:  A UniProt header line, with or without the leading '>'
+                (e.g. sp|P04637|P53_HUMAN Cellular tumor antigen p53
+                OS=Homo sapiens OX=9606 GN=TP53 PE=1 SV=4)
+
+        Output: Dictionary with all of the UNIPROT_FIELDS (fields missing
+                from the header are None), or None if the header isn't
+                a SwissProt/TrEMBL header
+    """
+    match = __UNIPROT_HEADER.match(header.rstrip("\r\n"))
+    if match is None:
+        return None
+
+    return dict(zip(UNIPROT_FIELDS, match.groups()))
+
+
+def get_header_columns(filename, fields=UNIPROT_FIELDS):
+    """ Input:  Name of file as string, and optionally which of the
+                UNIPROT_FIELDS to return
+
+        Output: Dictionary of field -> list of values, with one entry
+                in each list for every SwissProt/TrEMBL record in the
+                file (in file order). Only header lines are read.
+    """
+    columns = dict([(field, []) for field in fields])
+
+    for header in scan_headers(filename):
+        record = parse_uniprot_header(header)
+        if record is not None:
+            for field in fields:
+                columns[field].append(record[field])
+
+    return columns
+
+
+def parse_header(header):
+    """ Input:  A SwissProt/TrEMBL header line, with or without the
+                leading '>' (e.g. sp|P04637|P53_HUMAN Cellular tumor
+                antigen p53 OS=Homo sapiens ...)
+
+        Output: Dictionary with the database ('sp' or 'tr'), the
+                accession and the name (entry name and description,
+                everything before OS=), or None if the header isn't a
+                SwissProt/TrEMBL header
+    """
+    fields = header.lstrip(">").split("|")
     
-   
-    with open(args.filename[0]) as f:
-        content = f.readlines()
+    if len(fields) < 3 or not (fields[0].endswith("sp") or fields[0].endswith("tr")):
+        return None
+
+    return {"db"        : fields[0][-2:],
+            "accession" : fields[1],
+            "name"      : fields[2].split(" OS")[0].rstrip("\r\n")}
+
+
+def iter_records(filename):
+    """ Input:  Name of file as string (or an open file object)
+
+        Output: Generator which yields a dictionary for each SwissProt
+                or TrEMBL record in the file (see parse_header) with the
+                sequence added under 'sequence'
+    """
+    for (header, sequence) in read_fasta(filename):
+        record = parse_header(header)
+        if record is not None:
+            record["sequence"] = sequence
+            yield record
 
-    acc = []
+
+def __internal_handler(filename, request, unique=False):
+    """ Generator which yields accessions ("acc"), names ("name") or
+        accession and name ("both") for every SwissProt/TrEMBL header,
+        skipping values already yielded if unique is True
+    """
+    seen = set()
 
     # search for sp| so we only search for swissprot records
-    for line in content:
+    for line in scan_headers(filename):
         if line.find("sp|") > -1 or line.find("tr|") > -1:
+            record = parse_header(line)
+            if record is None:
+                continue
 
-            if r == 3:
-                temp = line.split("|")[2]
-                nextVal = temp.split(" OS")[0]
-                nextVal = line.split("|")[1] + " " + nextVal
+            if request == "both":
+                value = record["accession"] + " " + record["name"]
 
-            elif r == 2:
-                temp = line.split("|")[r]
-                nextVal = temp.split(" OS")[0]
+            elif request == "name":
+                value = record["name"]
 
             else:
-                nextVal = line.split("|")[r]
+                value = record["accession"]
 
-            acc.append(nextVal)
-            
+            # use set to remove duplicates
+            if unique:
+                if value in seen:
+                    continue
+                seen.add(value)
+
+            yield value
+
+
+def iter_acc_from_file(filename, unique=False):
+    """ Input:  Name of file as string (or an open file object), and
+                whether to skip repeated values
+    
+        Output: Generator which yields accessions in the order 
+                they are in the file
+    """
 
-    # use set to remove duplicates
-    return acc
+    return(__internal_handler(filename, "acc", unique))
 
 
-def get_acc_from_file(filename):
-    """ Input:  Name of file as string
+def iter_name_from_file(filename, unique=False):
+    """ Input:  Name of file as string (or an open file object), and
+                whether to skip repeated values
+    
+        Output: Generator which yields names in the order they
+                are in the file
+    """
+
+    return(__internal_handler(filename, "name", unique))
+
+
+def iter_acc_and_name_from_file(filename, unique=False):
+    """ Input:  Name of file as string (or an open file object), and
+                whether to skip repeated values
+    
+        Output: Generator which yields accessions and names in 
+                the order they are in the file
+    """
+
+    return(__internal_handler(filename, "both", unique))
+
+
+def get_acc_from_file(filename, unique=False):
+    """ Input:  Name of file as string, and whether to skip
+                repeated values
     
         Output: Returns a list of accessions ordered as they
                 were in the file
     """
 
-    return(__internal_handler(filename, "acc"))
+    return(list(iter_acc_from_file(filename, unique)))
 
 
-def get_name_from_file(filename):
-    """ Input:  Name of file as string
+def get_name_from_file(filename, unique=False):
+    """ Input:  Name of file as string, and whether to skip
+                repeated values
     
         Output: Returns a list of names ordered as they
                 were in the file
     """
 
-    return(__internal_handler(filename, "name"))
+    return(list(iter_name_from_file(filename, unique)))
 
 
-def get_acc_and_name_from_file(filename):
-    """ Input:  Name of file as string
+def get_acc_and_name_from_file(filename, unique=False):
+    """ Input:  Name of file as string, and whether to skip
+                repeated values
     
         Output: Returns a list of acessions and names ordered
                 as they were in the file
     """
 
-    return(__internal_handler(filename, "both"))
+    return(list(iter_acc_and_name_from_file(filename, unique)))
 
 
 
@@ -108,17 +351,32 @@ if __name__ == "__main__":
                         help='print as a comma seperated list')
 
 
+    parser.add_argument('--unique', dest='unique', action='store_const',
+                        const=True, default=False,
+                        help='only print the first occurrence of each value')
+
     parser.add_argument('--num', dest='num', action='store_const',
                         const=True, default=False,
                         help='number of accessions in file')
 
+    parser.add_argument('--table', dest='table', action='store_const',
+                        const=True, default=False,
+                        help='print the parsed UniProt header fields as a tab seperated table')
+
 
     args = parser.parse_args()
 
 
     if args.num:
-        out = get_acc_from_file(args.filename[0])
-        print len(out)
+        print count_records(args.filename[0], prefixes=("sp|", "tr|"))
+        exit(0)
+
+    if args.table:
+        print "\t".join(UNIPROT_FIELDS)
+        for header in scan_headers(args.filename[0]):
+            record = parse_uniprot_header(header)
+            if record is not None:
+                print "\t".join([record[field] or "" for field in UNIPROT_FIELDS])
         exit(0)
 
 
@@ -132,13 +390,13 @@ if __name__ == "__main__":
 
     
     if args.nameR:
-        out = get_name_from_file(args.filename[0])
+        out = get_name_from_file(args.filename[0], args.unique)
     
     if args.accR:
-        out = get_acc_from_file(args.filename[0])
+        out = get_acc_from_file(args.filename[0], args.unique)
 
     if args.bothR:
-        out = get_acc_and_name_from_file(args.filename[0])
+        out = get_acc_and_name_from_file(args.filename[0], args.unique)
 
     ## Formatting ouput
 
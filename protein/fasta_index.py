@@ -0,0 +1,436 @@
+#!/usr/bin/python
+# fasta_index
+#
+# Random access into large FASTA files. An index (similar in spirit to
+# a samtools .fai file) is built in one streaming pass and records, for
+# each accession, where the record starts in the file. Records are then
+# read straight out of a memory map of the FASTA file, so fetching a
+# few thousand records from a 90 GB UniProt file doesn't require a
+# linear scan.
+#
+# The index (<fasta>.aidx by default) is a binary file made of a header
+#
+#   magic  key_width  count
+#
+# followed by count fixed width entries sorted by accession
+#
+#   accession  offset  header_length  sequence_length  sequence_bytes
+#
+# where the accession is padded with NUL bytes to key_width bytes,
+# offset is the byte offset of the '>', header_length the length of the
+# header line in bytes (including the newline), sequence_length the
+# number of residues and sequence_bytes the length of the sequence block
+# in bytes (including newlines).
+#
+# The index is memory mapped and searched by bisection, so opening it is
+# instant and nothing is loaded into memory up front, however many
+# records it has. While building, entries are sorted in runs of
+# INDEX_RUN_RECORDS which are spilled to disk and then merged, so
+# building doesn't hold the whole index in memory either.
+#
+
+import bisect
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+
+from extract_accessions import parse_header
+
+INDEX_EXTENSION = ".aidx"
+
+# entries sorted in memory at once while building an index
+INDEX_RUN_RECORDS = 2**21
+
+_MAGIC = "AIDX\x00\x00\x00\x01"
+_HEADER = struct.Struct("<8sIQ")
+
+# offset, header_length, sequence_length, sequence_bytes
+_ENTRY = "QIQQ"
+
+
+# ---------------------------------------
+#
+class fastaIndexException(Exception):
+    """
+       Exception class for fasta_index methods
+    """
+    pass
+
+
+def header_accession(header):
+    """ Input:  Header line, with or without the leading '>'
+
+        Output: The accession for SwissProt/TrEMBL headers, otherwise
+                the first word of the header
+    """
+    record = parse_header(header)
+    if record is not None:
+        return record["accession"]
+
+    fields = header.lstrip(">").split()
+    if len(fields) == 0:
+        return ""
+    return fields[0]
+
+
+def _scanRecords(filename):
+    """ Generator which yields [accession, offset, header_length,
+        sequence_length, sequence_bytes] for every record in a FASTA file
+    """
+    with open(filename, "rb") as f:
+        offset = 0
+        record = None
+
+        for line in f:
+            if line.startswith(">"):
+                if record is not None:
+                    yield record
+                record = [header_accession(line.rstrip("\r\n")), offset, len(line), 0, 0]
+            elif record is not None:
+                record[3] += len(line.rstrip("\r\n"))
+                record[4] += len(line)
+
+            offset += len(line)
+
+        if record is not None:
+            yield record
+
+
+def _writeRun(records, directory):
+    """ Sort a list of records and write them to a temporary run file
+    """
+    records.sort()
+    (fd, path) = tempfile.mkstemp(dir=directory, prefix=".run")
+    with os.fdopen(fd, "w") as out:
+        for record in records:
+            out.write("%s\t%d\t%d\t%d\t%d\n" % tuple(record))
+    return path
+
+
+def _readRun(path):
+    with open(path) as f:
+        for line in f:
+            fields = line.rstrip("\n").split("\t")
+            yield (fields[0],) + tuple([int(x) for x in fields[1:]])
+
+
+def build_index(filename, index_filename=None):
+    """ Input:  Name of FASTA file as string, and optionally the name
+                of the index file to write (default <filename>.aidx)
+
+        Output: Writes the index file in a single streaming pass over
+                the FASTA file and returns the number of records
+                indexed. If an accession appears more than once only
+                the first record is indexed.
+    """
+    if index_filename is None:
+        index_filename = filename + INDEX_EXTENSION
+
+    directory = os.path.dirname(os.path.abspath(index_filename))
+    runs = []
+    try:
+        # sorted runs, spilled to disk
+        keyWidth = 1
+        records = []
+        for record in _scanRecords(filename):
+            keyWidth = max(keyWidth, len(record[0]))
+            records.append(record)
+            if len(records) >= INDEX_RUN_RECORDS:
+                runs.append(_writeRun(records, directory))
+                records = []
+        runs.append(_writeRun(records, directory))
+
+        # merged into the fixed width index. Equal accessions come out
+        # in file order, so the first one is kept
+        entry = struct.Struct("<" + str(keyWidth) + "s" + _ENTRY)
+        count = 0
+        previous = None
+        with open(index_filename + ".tmp", "wb") as out:
+            out.write(_HEADER.pack(_MAGIC, keyWidth, 0))
+            for record in heapq.merge(*[_readRun(path) for path in runs]):
+                if record[0] != previous:
+                    out.write(entry.pack(*record))
+                    previous = record[0]
+                    count += 1
+
+            out.seek(0)
+            out.write(_HEADER.pack(_MAGIC, keyWidth, count))
+
+    finally:
+        for path in runs:
+            os.remove(path)
+
+    # write then rename so we never leave a half written index behind
+    os.rename(index_filename + ".tmp", index_filename)
+
+    return count
+
+
+class _Keys(object):
+    """ The padded accessions of an AccessionIndex as a sequence, for
+        bisect
+    """
+    __slots__ = ("_index",)
+
+    def __init__(self, index):
+        self._index = index
+
+    def __len__(self):
+        return self._index.count
+
+    def __getitem__(self, i):
+        start = _HEADER.size + i*self._index._entry.size
+        return self._index._map[start:start+self._index.key_width]
+
+
+# ---------------------------------------
+#
+class AccessionIndex(object):
+    """
+       Memory mapped index file written by build_index. Behaves as a
+       read only dictionary of accession -> (offset, header_length,
+       sequence_length, sequence_bytes), with lookups by bisection. Can
+       be used as a context manager.
+
+       index_filename   Index file
+    """
+
+    def __init__(self, index_filename):
+        self._file = open(index_filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise fastaIndexException("Index " + index_filename + " is empty")
+
+        if len(self._map) < _HEADER.size or self._map[:8] != _MAGIC:
+            self.close()
+            raise fastaIndexException(index_filename + " isn't an accession index (rebuild it with build_index)")
+
+        (_, self.key_width, self.count) = _HEADER.unpack(self._map[:_HEADER.size])
+        self._entry = struct.Struct("<" + str(self.key_width) + "s" + _ENTRY)
+
+        if len(self._map) != _HEADER.size + self.count*self._entry.size:
+            self.close()
+            raise fastaIndexException("Index " + index_filename + " is truncated")
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __getitem__(self, accession):
+        entry = self.get(accession)
+        if entry is None:
+            raise KeyError(accession)
+        return entry
+
+
+    def __contains__(self, accession):
+        return self.get(accession) is not None
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+    def _unpack(self, i):
+        start = _HEADER.size + i*self._entry.size
+        values = self._entry.unpack(self._map[start:start+self._entry.size])
+        return (values[0].rstrip("\0"),) + values[1:]
+
+
+    def get(self, accession, default=None):
+        """ (offset, header_length, sequence_length, sequence_bytes) for
+            an accession, or default if it isn't in the index
+        """
+        if len(accession) > self.key_width:
+            return default
+
+        key = accession + "\0"*(self.key_width - len(accession))
+        keys = _Keys(self)
+        i = bisect.bisect_left(keys, key, 0, self.count)
+        if i < self.count and keys[i] == key:
+            return self._unpack(i)[1:]
+        return default
+
+
+    def items(self):
+        """ Generator which yields (accession, entry) in accession order
+        """
+        for i in xrange(self.count):
+            values = self._unpack(i)
+            yield (values[0], values[1:])
+
+
+def load_index(index_filename):
+    """ Input:  Name of an index file written by build_index
+
+        Output: The index as an AccessionIndex (a read only dictionary
+                like object of accession -> (offset, header_length,
+                sequence_length, sequence_bytes))
+    """
+    return AccessionIndex(index_filename)
+
+
+# ---------------------------------------
+#
+class FastaIndex(object):
+    """
+       Indexed, memory mapped FASTA file. Loads the index if it
+       exists (building it if it doesn't) and maps the FASTA file
+       into memory. Can be used as a context manager.
+
+       filename         FASTA file
+
+       index_filename   Index file (default <filename>.aidx)
+
+       rebuild          If True always rebuild the index
+    """
+
+    def __init__(self, filename, index_filename=None, rebuild=False):
+        if index_filename is None:
+            index_filename = filename + INDEX_EXTENSION
+
+        if rebuild or not os.path.exists(index_filename) or os.path.getmtime(index_filename) < os.path.getmtime(filename):
+            build_index(filename, index_filename)
+
+        try:
+            self.index = load_index(index_filename)
+        except fastaIndexException:
+            # e.g. an index in an older format
+            build_index(filename, index_filename)
+            self.index = load_index(index_filename)
+
+        self.filename = filename
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can't be mapped, but it has no records to read
+            self._map = None
+
+
+    def __len__(self):
+        return len(self.index)
+
+
+    def __contains__(self, accession):
+        return accession in self.index
+
+
+    def __getitem__(self, accession):
+        return self.fetch(accession)[1]
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *args):
+        self.close()
+
+
+    def close(self):
+        self.index.close()
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+
+    def _read(self, entry):
+        (offset, header_length, _, sequence_bytes) = entry
+        start = offset + header_length
+        header = self._map[offset+1:start].rstrip("\r\n")
+        sequence = self._map[start:start+sequence_bytes].translate(None, "\r\n")
+        return (header, sequence)
+
+
+    def fetch(self, accession):
+        """ Input:  An accession
+
+            Output: (header, sequence) tuple for that record. Raises a
+                    fastaIndexException if the accession isn't in the
+                    index
+        """
+        entry = self.index.get(accession)
+        if entry is None:
+            raise fastaIndexException("Accession '" + str(accession) + "' not found in index of " + self.filename)
+        return self._read(entry)
+
+
+    def fetch_many(self, accessions, ignore_missing=False):
+        """ Input:  A list of accessions
+
+            Output: Generator which yields an (accession, header, sequence)
+                    tuple for every requested accession. Records are read
+                    in file order (rather than the order requested) so
+                    the underlying reads are sequential. Unknown accessions
+                    raise a fastaIndexException, unless ignore_missing is
+                    True in which case they are skipped.
+        """
+        entries = []
+        for accession in set(accessions):
+            entry = self.index.get(accession)
+            if entry is not None:
+                entries.append((entry, accession))
+            elif not ignore_missing:
+                raise fastaIndexException("Accession '" + str(accession) + "' not found in index of " + self.filename)
+
+        entries.sort()
+
+        for (entry, accession) in entries:
+            (header, sequence) = self._read(entry)
+            yield (accession, header, sequence)
+
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Build an accession index for a FASTA file, or fetch records from an indexed FASTA file and print them to STDOUT')
+    parser.add_argument('filename', metavar='filename',
+                        help='FASTA file')
+
+    parser.add_argument('accessions', metavar='accession',  nargs='*',
+                        help='accessions to fetch')
+
+    parser.add_argument('--build', dest='build', action='store_const',
+                        const=True, default=False,
+                        help='(re)build the index')
+
+    parser.add_argument('--acc-file', dest='accFile', default=None,
+                        help='file with one accession per line to fetch')
+
+    args = parser.parse_args()
+
+    accessions = list(args.accessions)
+    if args.accFile:
+        with open(args.accFile) as f:
+            accessions.extend([line.strip() for line in f if line.strip()])
+
+    if args.build and len(accessions) == 0:
+        print "Indexed " + str(build_index(args.filename)) + " records"
+        exit(0)
+
+    try:
+        with FastaIndex(args.filename, rebuild=args.build) as fasta:
+            for (accession, header, sequence) in fasta.fetch_many(accessions):
+                sys.stdout.write(">" + header + "\n")
+                for i in xrange(0, len(sequence), 60):
+                    sys.stdout.write(sequence[i:i+60] + "\n")
+    except fastaIndexException, e:
+        print "[ERROR] - " + str(e)
+        exit(1)
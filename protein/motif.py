@@ -0,0 +1,167 @@
+# motif
+#
+# Compiled sequence motifs. A motif is the same list-of-positions syntax
+# used by sequenceTools.calc_isMotifPresent, where each element is a
+# single residue ("A"), a string of residues ("AG"), an aaGroups group
+# (aaGroups.NEG) or a wildcard ("*").
+#
+# Compiling a motif turns each position into a translation table which
+# maps residues allowed at that position to '1' and everything else to
+# '0'. Scanning a sequence translates it once per motif position into a
+# bitmask over sequence positions (bit i set if residue i is allowed),
+# and a shift-and over those masks, i.e.
+#
+#     matches = M[0] & (M[1] >> 1) & ... & (M[m-1] >> (m-1))
+#
+# leaves a bit set at every position where the motif starts. All of the
+# work is done by str.translate and Python's long integer operations, so
+# there's no per-residue Python code, and the reverse orientation reuses
+# the same masks in the opposite order.
+#
+
+from aaGroups import AA
+
+
+# ---------------------------------------
+#
+class motifException(Exception):
+    """
+       Exception class for motif methods
+    """
+    pass
+
+
+# character used to join sequences when scanning a batch (never matches)
+_SEPARATOR = "\n"
+
+
+# ---------------------------------------
+#
+class Motif(object):
+    """
+       A compiled motif, which can be reused to scan any number of
+       sequences.
+
+       motif      List of motif positions, where each element is a
+                  residue, a string of residues, an aaGroups group or
+                  "*" (any amino acid). The list isn't modified.
+    """
+
+    def __init__(self, motif):
+        if len(motif) == 0:
+            raise motifException("Motif must have at least one position")
+
+        self.positions = []
+        for element in motif:
+            if element == "*":
+                element = AA
+
+            residues = frozenset([str(a).upper() for a in element if len(str(a)) == 1])
+            self.positions.append(residues)
+
+        self.length = len(self.positions)
+        self._tables = [_positionTable(residues) for residues in self.positions]
+
+
+    def __len__(self):
+        return self.length
+
+
+    def _masks(self, seq):
+        """ Bitmask over sequence positions for each motif position
+        """
+        masks = []
+        for table in self._tables:
+            # int() wants the most significant bit first
+            bits = seq.translate(table)[::-1]
+            masks.append(int(bits, 2) if bits else 0)
+        return masks
+
+
+    def _matches(self, masks):
+        forward = masks[0]
+        reverse = masks[-1]
+        for k in xrange(1, self.length):
+            forward &= masks[k] >> k
+            reverse &= masks[self.length-1-k] >> k
+        return (forward, reverse)
+
+
+    def find_all(self, seq, polar=False):
+        """ Input:  A sequence, and whether the motif is polar (if False
+                    the reversed motif is searched for as well)
+
+            Output: Sorted list of (start, orientation) tuples, one for
+                    every (possibly overlapping) match, where orientation
+                    is "+" for the motif as given and "-" for the reversed
+                    motif. start is always the position in seq of the
+                    first residue of the match
+        """
+        (forward, reverse) = self._matches(self._masks(seq))
+
+        hits = [(i, "+") for i in _setBits(forward)]
+        if not polar:
+            hits.extend([(i, "-") for i in _setBits(reverse)])
+            hits.sort()
+
+        return hits
+
+
+    def find_in_batch(self, seqs, polar=False):
+        """ Input:  A list of sequences, and whether the motif is polar
+
+            Output: Sorted list of (sequence index, start, orientation)
+                    tuples for every match in every sequence. All the
+                    sequences are scanned in a single pass.
+        """
+        starts = []
+        offset = 0
+        for seq in seqs:
+            starts.append(offset)
+            offset += len(seq) + 1
+
+        hits = []
+        k = 0
+        for (start, orientation) in self.find_all(_SEPARATOR.join(seqs), polar):
+            while k+1 < len(starts) and starts[k+1] <= start:
+                k += 1
+            hits.append((k, start - starts[k], orientation))
+
+        return hits
+
+
+    def search(self, seq, polar=False):
+        """ Input:  A sequence, and whether the motif is polar
+
+            Output: True if the motif is found anywhere in seq
+        """
+        (forward, reverse) = self._matches(self._masks(seq))
+        return forward != 0 or (not polar and reverse != 0)
+
+
+def compile_motif(motif):
+    """ Input:  List of motif positions (see Motif)
+
+        Output: A compiled Motif
+    """
+    return Motif(motif)
+
+
+def _positionTable(residues):
+    """ Translation table mapping allowed residues (upper or lower case)
+        to '1' and every other character to '0'
+    """
+    chars = "".join(residues) + "".join(residues).lower()
+    return "".join(["1" if chr(i) in chars else "0" for i in xrange(256)])
+
+
+def _setBits(value):
+    """ Positions of the set bits in a (long) integer, lowest first
+    """
+    bits = bin(value)[:1:-1]
+    positions = []
+    i = bits.find("1")
+    while i != -1:
+        positions.append(i)
+        i = bits.find("1", i+1)
+    return positions
@@ -0,0 +1,180 @@
+# mutagenesis
+#
+# Saturation mutagenesis scans. For a sequence of length L every single
+# point mutant (residue i replaced by amino acid a) is described by one
+# entry of an (L x 20) matrix per descriptor, with columns ordered as in
+# AA (the wild type residue's column holds the wild type value).
+#
+# No mutant sequence is ever built. Each descriptor is written as the
+# wild type value plus a per-residue delta
+#
+#   composition based    value = f(S + v[a] - v[wt_i]) where S is the
+#   (sequenceTools         wild type sum of a per-residue table v, so
+#   BATCH_DESCRIPTORS,     every entry is O(1)
+#   group contents)
+#
+#   SCD, SHD             both are sums over residue pairs, so changing
+#                        residue i changes the value by the change in
+#                        its own term times a per-position coefficient,
+#                          SCD: dq * sum_j q_j |i-j|^0.5 / N
+#                          SHD: dh * sum_j 1/|i-j| / N
+#                        The coefficients for every i are one
+#                        convolution (FFT), after which each entry is O(1)
+#
+#   window max/min       the largest (smallest) valid window mean of a
+#                        WINDOW_SCALES scale. A mutation only shifts the
+#                        windows covering i, all by the same amount, so
+#                        the new maximum is the larger of the best
+#                        unaffected window (prefix/suffix maxima) and the
+#                        best affected window plus the shift
+#
+# so a full scan is O(20 L) after O(L log L) (O(L w) for windows of w
+# residues) set up, rather than O(L^2).
+#
+
+import numpy as np
+
+import sequenceTools
+from aaGroups import *
+
+
+# ---------------------------------------
+#
+class mutagenesisException(Exception):
+    """
+       Exception class for mutagenesis methods
+    """
+    pass
+
+
+# order dependent descriptors available to the scan
+SCAN_ORDER_DESCRIPTORS = ("SCD", "SHD")
+
+
+def _substitutionDeltas(codes, table):
+    """ (L x 20) matrix of table[a] - table[wild type residue i]
+    """
+    return table[None, :] - table[codes][:, None]
+
+
+def _pairCoefficients(values, kernel):
+    """ sum_{j != i} values[j] * kernel(|i-j|) for every i, via an FFT
+        convolution (kernel(0) is taken as 0)
+    """
+    L = len(values)
+    weights = np.zeros(2*L - 1)
+    d = np.abs(np.arange(-(L-1), L))
+    weights[d > 0] = kernel(d[d > 0].astype(np.float64))
+
+    size = int(2**np.ceil(np.log2(3*L - 2)))
+    full = np.fft.irfft(np.fft.rfft(values, size) * np.fft.rfft(weights, size), size)
+    return full[L-1:2*L-1]
+
+
+def _windowExtremes(profile, window, L, deltas):
+    """ Largest valid window mean of every mutant, given the wild type
+        profile (L-window+1 values) and the (L x 20) per-residue change
+        in the scale
+    """
+    M = len(profile)
+    i = np.arange(L)
+
+    # windows containing residue i are lo[i]..hi[i]
+    lo = np.maximum(i - window + 1, 0)
+    hi = np.minimum(i, M - 1)
+
+    # best window among those containing i
+    offsets = lo[:, None] + np.arange(window)[None, :]
+    covering = np.where(offsets <= hi[:, None], profile[np.minimum(offsets, M-1)], -np.inf).max(axis=1)
+
+    # best window before lo / after hi
+    prefix = np.concatenate(([-np.inf], np.maximum.accumulate(profile)))
+    suffix = np.concatenate((np.maximum.accumulate(profile[::-1])[::-1], [-np.inf]))
+    outside = np.maximum(prefix[lo], suffix[hi+1])
+
+    return np.maximum(outside[:, None], covering[:, None] + deltas/float(window))
+
+
+# ---------------------------------------
+#
+def calc_mutationalScan(seq, descriptors=None, groups=None, scales=None, window=sequenceTools.WINDOW_SIZE):
+    """ Calculate descriptors for every single point mutant of a sequence
+        Return type: <dict> of (L x 20) numpy arrays, where [i, a] is the
+                     value for the mutant with residue i replaced by
+                     AA[a], keyed by
+
+                     descriptor name            for descriptors
+                     ("GroupContent", group)    for groups
+                     ("windowMax", scale)       largest window mean
+                     ("windowMin", scale)       smallest window mean
+
+        seq          Protein sequence
+
+        descriptors  Any of sequenceTools.BATCH_DESCRIPTORS and
+                     SCAN_ORDER_DESCRIPTORS (default = all of them)
+
+        groups       Groups to count (names from sequenceTools.GROUP_NAMES
+                     or groups of residues, default = all GROUP_NAMES)
+
+        scales       Window scales, either a list of names from 
+                     sequenceTools.WINDOW_SCALES or a dictionary of
+                     key -> scale as for sequenceTools.calc_windowProfiles
+                     (default = all WINDOW_SCALES). Ignored if the 
+                     sequence is shorter than the window
+
+        window       Window size
+    """
+    if descriptors is None:
+        descriptors = sequenceTools.BATCH_DESCRIPTORS + SCAN_ORDER_DESCRIPTORS
+    if groups is None:
+        groups = sequenceTools.GROUP_NAMES
+    if scales is None:
+        scales = sequenceTools.WINDOW_SCALES.keys()
+    if not isinstance(scales, dict):
+        scales = dict([(key, key) for key in scales])
+    if window < 1:
+        raise mutagenesisException("Invalid window size " + str(window))
+
+    for name in descriptors:
+        if name not in sequenceTools._DESCRIPTOR_DEFS and name not in SCAN_ORDER_DESCRIPTORS:
+            raise mutagenesisException("Unknown descriptor '" + str(name) + "'. Options are " + str(sequenceTools.BATCH_DESCRIPTORS + SCAN_ORDER_DESCRIPTORS))
+
+    (codes, _) = sequenceTools._encodeBatch([seq])
+    L = len(codes)
+    scan = {}
+
+    for name in descriptors:
+        if name in sequenceTools._DESCRIPTOR_DEFS:
+            (values, perResidue, scale) = sequenceTools._descriptorDef(name)
+            table = np.array([values[a] for a in AA], dtype=np.float64)
+            matrix = table[codes].sum() + _substitutionDeltas(codes, table)
+            if perResidue:
+                matrix = matrix / (L*scale)
+            scan[name] = matrix
+
+        elif name == "SCD":
+            charge = np.array([sequenceTools._CHARGE[a] for a in AA], dtype=np.float64)
+            coefficients = _pairCoefficients(charge[codes], np.sqrt)
+            scan[name] = sequenceTools.calc_SCD(seq) + _substitutionDeltas(codes, charge) * coefficients[:, None] / L
+
+        elif name == "SHD":
+            hydropathy = np.array([sequenceTools._NORMALIZED_KD[a] for a in AA], dtype=np.float64)
+            coefficients = _pairCoefficients(np.ones(L), lambda d: 1.0/d)
+            scan[name] = sequenceTools.calc_SHD(seq) + _substitutionDeltas(codes, hydropathy) * coefficients[:, None] / L
+
+    membership = sequenceTools._groupTables(groups).astype(np.float64)
+    for (g, GROUP) in enumerate(groups):
+        table = membership[:, g]
+        scan[("GroupContent", GROUP if isinstance(GROUP, basestring) else tuple(GROUP))] = table[codes].sum() + _substitutionDeltas(codes, table)
+
+    if L >= window:
+        for (key, scale) in scales.items():
+            table = sequenceTools._windowScaleTable(scale)
+            cumsum = np.concatenate(([0.0], np.cumsum(table[codes])))
+            profile = (cumsum[window:] - cumsum[:-window]) / float(window)
+            deltas = _substitutionDeltas(codes, table)
+
+            scan[("windowMax", key)] = _windowExtremes(profile, window, L, deltas)
+            scan[("windowMin", key)] = -_windowExtremes(-profile, window, L, -deltas)
+
+    return scan
@@ -0,0 +1,322 @@
+# patterning
+#
+# Charge patterning parameters for whole sequences or whole proteomes.
+#
+# Like sequenceTools.calc_Patterning these work on two groups of
+# residues, G1 and G2 (by default the aaGroups NEG and POS groups), with
+# everything else treated as neutral.
+#
+# kappa (Das and Pappu, PNAS 2013 110(33):13392-7)
+#
+#   For a blob (window) of g residues with fractions f1 and f2 of G1 and
+#   G2 residues the blob asymmetry is
+#
+#       sigma = (f1 - f2)^2 / (f1 + f2)          (0 if f1 + f2 = 0)
+#
+#   delta is the mean over all L-g+1 blobs of (sigma_blob - sigma_seq)^2,
+#   where sigma_seq is the asymmetry of the whole sequence, and
+#   kappa = delta / delta_max, where delta_max is the largest delta for
+#   a sequence with the same composition. kappa is reported as the
+#   average over blob sizes 5 and 6.
+#
+#   delta_max is taken as the largest delta over a grid of maximally
+#   segregated arrangements (a block of G1 residues and a block of G2
+#   residues with the neutral residues split in various ways around
+#   them, or one group's block inside the other's), and the sequence's
+#   own delta, rather than an exhaustive search, so kappa is at most 1.
+#   For these arrangements only the blobs which straddle a block
+#   boundary need evaluating, so delta_max costs O(blob) per
+#   arrangement rather than O(L).
+#
+# Omega (Martin et al., Science 2016 351(6280):1239-42)
+#
+#   The same calculation with G1 = charged residues plus proline and G2
+#   = everything else, i.e. how segregated charged residues and prolines
+#   are from the rest of the sequence.
+#
+# All blob sums are computed with cumulative sums over a concatenated
+# batch of sequences, so the cost is linear in the total number of
+# residues. Sequences with no G1 or G2 residues (or, for Omega, only
+# G1 residues), or which are shorter than the blob size, have an
+# undefined kappa/Omega and get -1.
+#
+
+import numpy as np
+
+import sequenceTools
+from aaGroups import *
+
+
+BLOB_SIZES = (5, 6)
+
+OMEGA_GROUP = NEG + POS + ("P",)
+
+# fractions of the neutral residues placed before the G1 block, and of
+# those left placed between the G1 and G2 blocks, in the segregated
+# delta_max arrangements (the rest go after the G2 block). Also the
+# fractions of a group's block placed before the other group's block
+# when one is split around the other
+_SEGREGATED_SPLITS = (0.0, 0.125, 0.25, 0.375, 0.5, 0.625, 0.75, 0.875, 1.0)
+
+
+def _groupTable(GROUP):
+    return np.array([1.0 if a in GROUP else 0.0 for a in AA])
+
+
+def _calculate(seqs, G1, G2, fn):
+    """ Encode a sequence or list of sequences and apply fn(m1, m2, lengths)
+        to chunks of them, where m1 and m2 are the concatenated G1 and G2
+        membership arrays of the chunk (G2 = None means every residue not
+        in G1). Returns a float for a single sequence, otherwise a numpy
+        array
+    """
+    single = isinstance(seqs, basestring)
+    if single:
+        seqs = [seqs]
+
+    (codes, lengths) = sequenceTools._encodeBatch(seqs)
+    table1 = _groupTable(G1)
+    if G2 is None:
+        table2 = 1.0 - table1
+    else:
+        table2 = _groupTable(G2)
+
+    values = np.empty(len(lengths))
+    for (first, last, start, stop) in sequenceTools._batchChunks(lengths):
+        chunk = codes[start:stop]
+        values[first:last] = fn(table1[chunk], table2[chunk], lengths[first:last])
+
+    if single:
+        return float(values[0])
+    return values
+
+
+def _asymmetry(f1, f2):
+    total = f1 + f2
+    return np.where(total > 0, (f1 - f2)**2 / np.where(total > 0, total, 1.0), 0.0)
+
+
+def _blobDeltas(m1, m2, lengths, blob):
+    """ delta for each of a set of concatenated sequences, given their G1
+        and G2 membership arrays. Sequences shorter than the blob size
+        get NaN
+    """
+    n = len(lengths)
+    c1 = np.concatenate(([0.0], np.cumsum(m1)))
+    c2 = np.concatenate(([0.0], np.cumsum(m2)))
+    starts = np.cumsum(lengths) - lengths
+
+    # whole sequence asymmetry
+    ends = starts + lengths
+    sigmaSeq = _asymmetry((c1[ends] - c1[starts]) / lengths, (c2[ends] - c2[starts]) / lengths)
+
+    # every blob of every sequence
+    numBlobs = np.maximum(lengths - blob + 1, 0)
+    seg = np.repeat(np.arange(n), numBlobs)
+    i = np.arange(len(seg)) - np.repeat(np.cumsum(numBlobs) - numBlobs, numBlobs) + starts[seg]
+
+    sigmaBlob = _asymmetry((c1[i+blob] - c1[i]) / float(blob), (c2[i+blob] - c2[i]) / float(blob))
+
+    deviations = np.bincount(seg, weights=(sigmaBlob - sigmaSeq[seg])**2, minlength=n)
+
+    deltas = np.empty(n)
+    deltas.fill(np.nan)
+    valid = numBlobs > 0
+    deltas[valid] = deviations[valid] / numBlobs[valid]
+
+    return deltas
+
+
+def _overlap(i, blob, lo, hi):
+    """ Number of residues of the blobs starting at i which fall in [lo, hi)
+    """
+    return np.maximum(0, np.minimum(i + blob, hi) - np.maximum(i, lo))
+
+
+def _blockDeltas(blocks, lengths, blob):
+    """ delta for sequences made of consecutive blocks of a single kind of
+        residue, without building the sequences. blocks is a list of
+        (kind, sizes) with kind 1 (G1), 2 (G2) or 0 (neutral) and sizes
+        an array with one block size per sequence (sizes can be 0).
+
+        Blobs which lie entirely inside one block have sigma = 1 (G1 or
+        G2 block) or 0 (neutral block) and are counted directly, so only
+        the blobs which straddle a block boundary (at most blob-1 per
+        boundary) are evaluated.
+    """
+    lengths = lengths.astype(np.int64)
+    sizes = np.column_stack([size for (_, size) in blocks]).astype(np.int64)
+    bounds = np.column_stack((np.zeros_like(lengths), np.cumsum(sizes, axis=1)))
+
+    n1 = sum([size for (kind, size) in blocks if kind == 1])
+    n2 = sum([size for (kind, size) in blocks if kind == 2])
+    sigmaSeq = _asymmetry(n1 / lengths.astype(np.float64), n2 / lengths.astype(np.float64))
+
+    # blobs entirely inside a block
+    inside = np.maximum(sizes - blob + 1, 0)
+    charged = np.array([kind != 0 for (kind, _) in blocks])
+    total = inside[:, charged].sum(axis=1)*(1.0 - sigmaSeq)**2 + inside[:, ~charged].sum(axis=1)*sigmaSeq**2
+
+    # blobs starting at i strictly contain boundary j if i < bound_j < i+blob.
+    # Each one is counted against the first boundary it contains, i.e.
+    # only if it starts at or after the previous boundary
+    B = len(blocks)
+    i = bounds[:, 1:B, None] - np.arange(1, blob)[None, None, :]
+    counted = (i >= bounds[:, 0:B-1, None]) & (i <= (lengths - blob)[:, None, None])
+
+    f1 = np.zeros(i.shape)
+    f2 = np.zeros(i.shape)
+    for (b, (kind, _)) in enumerate(blocks):
+        if kind != 0:
+            overlap = _overlap(i, blob, bounds[:, b, None, None], bounds[:, b+1, None, None]) / float(blob)
+            if kind == 1:
+                f1 += overlap
+            else:
+                f2 += overlap
+    total += np.where(counted, (_asymmetry(f1, f2) - sigmaSeq[:, None, None])**2, 0.0).sum(axis=2).sum(axis=1)
+
+    numBlobs = lengths - blob + 1
+    deltas = np.empty(len(lengths))
+    deltas.fill(np.nan)
+    valid = numBlobs > 0
+    deltas[valid] = total[valid] / numBlobs[valid]
+
+    return deltas
+
+
+def _segregatedDeltas(n1, n2, lengths, blob, before, middle):
+    """ delta for segregated sequences made of blocks of (before) neutral,
+        (n1) G1, (middle) neutral, (n2) G2 and then the remaining neutral
+        residues
+    """
+    after = lengths - before - n1 - middle - n2
+    return _blockDeltas([(0, before), (1, n1), (0, middle), (2, n2), (0, after)], lengths, blob)
+
+
+def _segregatedDeltaMax(n1, n2, lengths, blob):
+    """ delta_max for each sequence given its G1 and G2 counts, as the
+        largest delta over segregated arrangements with
+
+          the neutral residues split in different proportions before,
+          between and after the G1 and G2 blocks
+
+          one group's block between the two halves of the other group's
+          block, split in different proportions (the neutral residues
+          split before and after), which matters when there are few or
+          no neutral residues (e.g. Omega)
+    """
+    n0 = lengths - n1 - n2
+
+    deltaMax = np.zeros(len(lengths))
+    for x in _SEGREGATED_SPLITS:
+        before = np.round(n0*x).astype(np.int64)
+        after = n0 - before
+        for y in _SEGREGATED_SPLITS:
+            middle = np.round((n0 - before)*y).astype(np.int64)
+            deltaMax = np.fmax(deltaMax, _segregatedDeltas(n1, n2, lengths, blob, before, middle))
+
+            # G1 block inside the G2 block, and vice versa
+            split2 = np.round(n2*y).astype(np.int64)
+            blocks = [(0, before), (2, split2), (1, n1), (2, n2 - split2), (0, after)]
+            deltaMax = np.fmax(deltaMax, _blockDeltas(blocks, lengths, blob))
+
+            split1 = np.round(n1*y).astype(np.int64)
+            blocks = [(0, before), (1, split1), (2, n2), (1, n1 - split1), (0, after)]
+            deltaMax = np.fmax(deltaMax, _blockDeltas(blocks, lengths, blob))
+
+    return deltaMax
+
+
+def _normalizedDelta(delta, deltaMax):
+    """ delta/delta_max for one blob size (arrays or single values). The
+        sequence itself is one of the arrangements, so delta_max is at
+        least its own delta even where the grid misses the best
+        arrangement. Gives nan where both are 0 (no charges)
+    """
+    deltaMax = np.fmax(deltaMax, delta)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.true_divide(delta, deltaMax)
+
+
+def _kappa(m1, m2, lengths, blobs):
+    """ kappa like parameter (averaged over blob sizes) for concatenated
+        membership arrays
+    """
+    starts = np.cumsum(lengths) - lengths
+    c1 = np.concatenate(([0.0], np.cumsum(m1)))
+    c2 = np.concatenate(([0.0], np.cumsum(m2)))
+    n1 = np.round(c1[starts+lengths] - c1[starts]).astype(np.int64)
+    n2 = np.round(c2[starts+lengths] - c2[starts]).astype(np.int64)
+
+    # delta_max only depends on the composition, so it's calculated once
+    # per distinct (n1, n2, length) (e.g. once for all scrambles of a
+    # sequence)
+    (compositions, which) = np.unique(np.column_stack((n1, n2, lengths)).astype(np.int64), axis=0, return_inverse=True)
+
+    total = np.zeros(len(lengths))
+    for blob in blobs:
+        delta = _blobDeltas(m1, m2, lengths, blob)
+        deltaMax = _segregatedDeltaMax(compositions[:, 0], compositions[:, 1], compositions[:, 2], blob)[which]
+        total += _normalizedDelta(delta, deltaMax)
+
+    values = total / len(blobs)
+
+    # no charges (delta_max is 0), or sequences shorter than the blob size
+    values[~np.isfinite(values)] = -1.0
+
+    return values
+
+
+# ---------------------------------------
+#
+def calc_patterningDelta(seqs, G1=NEG, G2=POS, blob=5):
+    """ Calculate delta (the mean squared deviation of blob asymmetry
+        from the whole sequence asymmetry) for one blob size.
+        Return type: <float> for a single sequence, or a numpy array
+                     for a list of sequences (NaN for sequences shorter
+                     than the blob)
+
+        seqs       Protein sequence, or list of protein sequences
+
+        G1, G2     The two groups of residues (G2 = None means every
+                   residue not in G1)
+
+        blob       Blob size
+    """
+    return _calculate(seqs, G1, G2, lambda m1, m2, lengths: _blobDeltas(m1, m2, lengths, blob))
+
+
+# ---------------------------------------
+#
+def calc_kappa(seqs, G1=NEG, G2=POS, blobs=BLOB_SIZES):
+    """ Calculate kappa, the charge patterning parameter of Das and Pappu
+        (2013), between 0 (well mixed) and 1 (fully segregated)
+        Return type: <float> for a single sequence, or a numpy array
+                     for a list of sequences. -1 where undefined (no G1
+                     and G2 residues, or shorter than the blob size)
+
+        seqs       Protein sequence, or list of protein sequences
+
+        G1, G2     The two groups of residues
+
+        blobs      Blob sizes to average over (default 5 and 6)
+    """
+    return _calculate(seqs, G1, G2, lambda m1, m2, lengths: _kappa(m1, m2, lengths, blobs))
+
+
+# ---------------------------------------
+#
+def calc_Omega(seqs, G1=OMEGA_GROUP, blobs=BLOB_SIZES):
+    """ Calculate Omega (Martin et al. 2016), the patterning of charged
+        residues and prolines relative to all other residues
+        Return type: <float> for a single sequence, or a numpy array
+                     for a list of sequences. -1 where undefined
+
+        seqs       Protein sequence, or list of protein sequences
+
+        G1         Residues patterned against the rest of the sequence
+                   (default charged residues and proline)
+
+        blobs      Blob sizes to average over (default 5 and 6)
+    """
+    return _calculate(seqs, G1, None, lambda m1, m2, lengths: _kappa(m1, m2, lengths, blobs))
@@ -0,0 +1,240 @@
+# prosite
+#
+# PROSITE style sequence patterns, and scanning of many patterns over
+# many sequences at once.
+#
+# Pattern syntax (see the PROSITE user manual)
+#
+#   A            the residue A
+#   x            any residue
+#   [ALT]        any of A, L or T ([G>] means G or the C-terminus)
+#   {AM}         any residue except A and M
+#   e(3)         element e repeated 3 times
+#   e(2,4)       element e repeated 2 to 4 times
+#   <  / >       pattern anchored to the N- / C-terminus
+#
+# with elements seperated by '-' and an optional final '.', e.g.
+#
+#   <M-x(2,4)-[ST]-{P}-[RK](2).
+#
+# Each pattern is compiled into a regular expression. For scanning,
+# patterns are packed (up to PATTERNS_PER_REGEX at a time) into a single
+# regular expression made of one capturing lookahead per pattern, behind
+# a lookahead that matches if any of the patterns does. The regex engine
+# skips over positions where nothing matches, and at a position where
+# something does every pattern in the pack is tested, so each sequence
+# is read once per pack rather than once per pattern.
+#
+# Every start position at which a pattern matches gives one hit (the
+# longest match starting there). Hits are reported as (start, end) with
+# 0-based start and exclusive end, i.e. seq[start:end] is the match.
+#
+
+import re
+
+from extract_accessions import read_fasta
+from fasta_index import header_accession
+
+
+# ---------------------------------------
+#
+class prositeException(Exception):
+    """
+       Exception class for prosite methods
+    """
+    pass
+
+
+# Python's re module allows at most 100 groups per expression
+PATTERNS_PER_REGEX = 90
+
+__ELEMENT = re.compile(r"^([A-Z]|\[[A-Z]+>?\]|\{[A-Z]+\})(?:\((\d+)(?:,(\d+))?\))?$")
+
+
+def prosite_to_regex(pattern):
+    """ Input:  A PROSITE style pattern (see module header)
+
+        Output: Equivalent regular expression (as a string) with no
+                capturing groups. Raises a prositeException if the
+                pattern is invalid or could match an empty sequence.
+    """
+    body = "".join(pattern.split()).upper().rstrip(".")
+
+    anchorStart = body.startswith("<")
+    anchorEnd = body.endswith(">")
+    body = body.lstrip("<")
+    if anchorEnd:
+        body = body[:-1]
+
+    if len(body) == 0:
+        raise prositeException("Empty pattern '" + str(pattern) + "'")
+
+    parts = []
+    minLength = 0
+
+    for element in body.split("-"):
+        match = __ELEMENT.match(element)
+        if match is None:
+            raise prositeException("Invalid element '" + element + "' in pattern '" + str(pattern) + "'")
+
+        (residues, low, high) = match.groups()
+
+        if residues == "X":
+            regex = "."
+        elif residues.startswith("[") and residues.endswith(">]"):
+            regex = "(?:[" + residues[1:-2] + "]|\\Z)"
+        elif residues.startswith("{"):
+            regex = "[^" + residues[1:-1] + "]"
+        else:
+            regex = residues
+
+        size = 1
+        if low is not None:
+            if high is None:
+                regex = "(?:" + regex + "){" + low + "}"
+                size = int(low)
+            else:
+                if int(high) < int(low):
+                    raise prositeException("Invalid repeat in element '" + element + "' in pattern '" + str(pattern) + "'")
+                regex = "(?:" + regex + "){" + low + "," + high + "}"
+                size = int(low)
+
+        if not residues.endswith(">]"):
+            minLength += size
+
+        parts.append(regex)
+
+    if minLength == 0:
+        raise prositeException("Pattern '" + str(pattern) + "' can match an empty sequence")
+
+    regex = "".join(parts)
+    if anchorStart:
+        regex = "^" + regex
+    if anchorEnd:
+        regex = regex + "\\Z"
+
+    return regex
+
+
+# ---------------------------------------
+#
+class PatternSet(object):
+    """
+       A set of compiled PROSITE patterns which are scanned over
+       sequences together.
+
+       patterns   Either a dictionary of pattern id -> pattern, or a
+                  list of patterns (in which case the ids are their
+                  index in the list)
+    """
+
+    def __init__(self, patterns):
+        if isinstance(patterns, dict):
+            items = sorted(patterns.items())
+        else:
+            items = list(enumerate(patterns))
+
+        self.ids = [pid for (pid, _) in items]
+        self.patterns = dict(items)
+        regexes = [prosite_to_regex(pattern) for (_, pattern) in items]
+
+        # one combined expression per pack of patterns, with the ids of
+        # the patterns in that pack
+        self._packs = []
+        for first in xrange(0, len(regexes), PATTERNS_PER_REGEX):
+            pack = regexes[first:first+PATTERNS_PER_REGEX]
+            combined = "(?=" + "|".join(pack) + ")" + "".join(["(?=(" + r + "))?" for r in pack])
+            self._packs.append((re.compile(combined), self.ids[first:first+PATTERNS_PER_REGEX]))
+
+
+    def __len__(self):
+        return len(self.ids)
+
+
+    def scan(self, seq):
+        """ Input:  A sequence
+
+            Output: List of (pattern id, start, end) for every hit in the
+                    sequence, ordered by pattern (in set order) and then
+                    by start
+        """
+        seq = seq.upper()
+        hits = []
+
+        for (regex, ids) in self._packs:
+            packHits = []
+            for match in regex.finditer(seq):
+                start = match.start()
+                for (k, group) in enumerate(match.groups()):
+                    if group is not None:
+                        packHits.append((k, start, start + len(group)))
+
+            packHits.sort()
+            hits.extend([(ids[k], start, end) for (k, start, end) in packHits])
+
+        return hits
+
+
+    def scan_records(self, records):
+        """ Input:  Iterable of (sequence id, sequence) tuples
+
+            Output: Generator which yields a (sequence id, pattern id,
+                    start, end) tuple for every hit, one sequence at a
+                    time
+        """
+        for (seqid, seq) in records:
+            for (pid, start, end) in self.scan(seq):
+                yield (seqid, pid, start, end)
+
+
+def scan_fasta(filenames, patterns):
+    """ Input:  List of FASTA filenames, and either a PatternSet or the
+                patterns to build one from
+
+        Output: Generator which yields a (accession, pattern id, start,
+                end) tuple for every hit in every record, streaming the
+                files one record at a time
+    """
+    if not isinstance(patterns, PatternSet):
+        patterns = PatternSet(patterns)
+
+    def records():
+        for filename in filenames:
+            for (header, seq) in read_fasta(filename):
+                yield (header_accession(header), seq)
+
+    return patterns.scan_records(records())
+
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Scan FASTA files with a set of PROSITE style patterns and print hits (accession, pattern, start, end) to STDOUT')
+    parser.add_argument('filename', metavar='filename',  nargs='+',
+                        help='FASTA file(s) to scan')
+
+    parser.add_argument('--patterns', dest='patterns', required=True,
+                        help='file with one pattern per line, optionally preceded by an id and a tab')
+
+    args = parser.parse_args()
+
+    patterns = {}
+    with open(args.patterns) as f:
+        for (k, line) in enumerate(f):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "\t" in line:
+                (pid, pattern) = line.split("\t", 1)
+            else:
+                (pid, pattern) = (str(k), line)
+            patterns[pid] = pattern
+
+    try:
+        for hit in scan_fasta(args.filename, patterns):
+            sys.stdout.write("%s\t%s\t%d\t%d\n" % hit)
+    except prositeException, e:
+        print "[ERROR] - " + str(e)
+        exit(1)
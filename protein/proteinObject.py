@@ -0,0 +1,288 @@
+# proteinObject
+#
+# A Protein object wraps one sequence and computes sequenceTools
+# descriptors only when they're first asked for, keeping the result so
+# repeated access is free.
+#
+# Descriptors share intermediates rather than each walking the sequence
+#
+#   composition          counted once, and every composition based sum
+#                        (NetCharge, TotalCharge, group contents, entropy
+#                        and hydrophobicity sums) is read from it
+#   NCPR, TCPR, ...      the matching count divided by the length
+#   HydrophobicityScore  HydrophobicitySum divided by the maximum
+#
+# Objects use __slots__ (one pointer per descriptor, unset until used)
+# and keep the composition as a 20 entry array rather than a dictionary,
+# so millions of them fit in memory. Descriptors which take arguments
+# (windows, motifs, group contents, flanking scores) are memoized in a
+# dictionary which is only created the first time one is used.
+#
+
+import array
+
+import sequenceTools
+from aaGroups import *
+from motif import Motif
+
+
+def _lazy(fn):
+    """ Property which computes fn(self) on first access and keeps the
+        value in the slot named _<fn name>
+    """
+    slot = "_" + fn.__name__
+
+    def getter(self):
+        try:
+            return getattr(self, slot)
+        except AttributeError:
+            value = fn(self)
+            setattr(self, slot, value)
+            return value
+
+    return property(getter, doc=fn.__doc__)
+
+
+def _hashable(value):
+    """ Lists (e.g. motifs, or user defined groups) as tuples, sets as
+        sorted tuples and dictionaries as sorted tuples of items so they
+        can be used in a memo key
+    """
+    if isinstance(value, (list, tuple)):
+        return tuple([_hashable(v) for v in value])
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted([_hashable(v) for v in value]))
+    if isinstance(value, dict):
+        return tuple(sorted([(k, _hashable(v)) for (k, v) in value.items()]))
+    return value
+
+
+# ---------------------------------------
+#
+class Protein(object):
+    """
+       A protein sequence with lazily computed, memoized descriptors.
+       Raises a sequenceToolsException if the sequence isn't valid.
+
+       seq        Protein sequence (any case)
+    """
+
+    __slots__ = ("sequence",
+                 "_composition",
+                 "_memo",
+                 "_NetCharge",
+                 "_TotalCharge",
+                 "_NCPR",
+                 "_TCPR",
+                 "_ACPR",
+                 "_HCPR",
+                 "_PCPR",
+                 "_BHCPR",
+                 "_HelixEntropySum",
+                 "_CoilEntropySum",
+                 "_HydrophobicitySum",
+                 "_HydrophobicityScore",
+                 "_AntiStructureScore",
+                 "_SCD",
+                 "_SHD")
+
+    def __init__(self, seq):
+        # validated once, so the calc_* functions don't re-check it
+        self.sequence = sequenceTools._ValidatedSequence(sequenceTools._sanitize(seq))
+        self._memo = None
+
+
+    def __len__(self):
+        return len(self.sequence)
+
+
+    def __str__(self):
+        return str(self.sequence)
+
+
+    def __repr__(self):
+        if len(self.sequence) > 20:
+            return "Protein('" + self.sequence[:17] + "...')"
+        return "Protein('" + self.sequence + "')"
+
+
+    def _memoized(self, key, fn, *args):
+        if self._memo is None:
+            self._memo = {}
+
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = fn(self.sequence, *args)
+            self._memo[key] = value
+            return value
+
+
+    def _scaleSum(self, table):
+        # compiled tables, so scales replaced in the registry are used
+        # (as they are by sequenceTools)
+        return sum([n*table[ord(a)] for (a, n) in zip(AA, self.composition) if n])
+
+
+    def _count(self, GROUP):
+        GROUP = set(GROUP)
+        return sum([n for (a, n) in zip(AA, self.composition) if a in GROUP])
+
+
+    def clear(self):
+        """ Forget every memoized value
+        """
+        for slot in Protein.__slots__[1:]:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                pass
+        self._memo = None
+
+
+    # composition and the values derived from it
+
+    @_lazy
+    def composition(self):
+        """ Residue counts, ordered as in AA """
+        return array.array('i', [self.sequence.count(a) for a in AA])
+
+    @_lazy
+    def NetCharge(self):
+        """ See sequenceTools.calc_NetCharge """
+        return self._count(POS) - self._count(NEG)
+
+    @_lazy
+    def TotalCharge(self):
+        """ See sequenceTools.calc_TotalCharge """
+        return self._count(NEG+POS)
+
+    @_lazy
+    def NCPR(self):
+        """ See sequenceTools.calc_NCPR """
+        return self.NetCharge/float(len(self))
+
+    @_lazy
+    def TCPR(self):
+        """ See sequenceTools.calc_TCPR """
+        return self.TotalCharge/float(len(self))
+
+    @_lazy
+    def ACPR(self):
+        """ See sequenceTools.calc_ACPR """
+        return self.GroupContent(AROMATIC)/float(len(self))
+
+    @_lazy
+    def HCPR(self):
+        """ See sequenceTools.calc_HCPR """
+        return self.GroupContent(HYDROPHOBIC)/float(len(self))
+
+    @_lazy
+    def PCPR(self):
+        """ See sequenceTools.calc_PCPR """
+        return self.GroupContent(POLAR)/float(len(self))
+
+    @_lazy
+    def BHCPR(self):
+        """ See sequenceTools.calc_BHCPR """
+        return self.GroupContent(BULKYHYDROPHOBES)/float(len(self))
+
+    @_lazy
+    def HelixEntropySum(self):
+        """ See sequenceTools.calc_EntropySum (conf = "helix") """
+        return self._scaleSum(SCALE_TABLES["HELIX_ENTROPY"])
+
+    @_lazy
+    def CoilEntropySum(self):
+        """ See sequenceTools.calc_EntropySum (conf = "coil") """
+        return self._scaleSum(SCALE_TABLES["COIL_ENTROPY"])
+
+    @_lazy
+    def HydrophobicitySum(self):
+        """ See sequenceTools.calc_HydrophobicitySum """
+        return self._scaleSum(SCALE_TABLES["KD_HYDROPHOBICITY"])
+
+    @_lazy
+    def HydrophobicityScore(self):
+        """ See sequenceTools.calc_HydrophobicityScore """
+        return self.HydrophobicitySum/(len(self)*max(SCALES["KD_HYDROPHOBICITY"].values()))
+
+    @_lazy
+    def AntiStructureScore(self):
+        """ See sequenceTools.calc_AntiStructureScore """
+        return self._scaleSum(sequenceTools._ANTISTRUCTURE_TABLE)
+
+
+    # order dependent values
+
+    @_lazy
+    def SCD(self):
+        """ See sequenceTools.calc_SCD """
+        return sequenceTools.calc_SCD(self.sequence)
+
+    @_lazy
+    def SHD(self):
+        """ See sequenceTools.calc_SHD """
+        return sequenceTools.calc_SHD(self.sequence)
+
+
+    # descriptors with arguments
+
+    def GroupContent(self, CLASS):
+        """ See sequenceTools.calc_GroupContent """
+        key = ("GroupContent", _hashable(CLASS))
+        return self._memoized(key, lambda seq: self._count(CLASS))
+
+
+    def EntropySum(self, conf="helix"):
+        """ See sequenceTools.calc_EntropySum """
+        if conf == "helix":
+            return self.HelixEntropySum
+        elif conf == "coil":
+            return self.CoilEntropySum
+        return sequenceTools.calc_EntropySum(self.sequence, conf)
+
+
+    def flankingScore(self, TARGET, FLANKER, getMax=False, bonusHug=True):
+        """ See sequenceTools.calc_flankingScore """
+        key = ("flankingScore", _hashable(TARGET), _hashable(FLANKER), getMax, bonusHug)
+        return self._memoized(key, sequenceTools.calc_flankingScore, TARGET, FLANKER, getMax, bonusHug)
+
+
+    def maximumResidueSeperation(self, GROUP, nonDelin=False):
+        """ See sequenceTools.calc_maximumResidueSeperation """
+        key = ("maximumResidueSeperation", _hashable(GROUP), nonDelin)
+        return self._memoized(key, sequenceTools.calc_maximumResidueSeperation, GROUP, nonDelin)
+
+
+    def Patterning(self, G1, G2):
+        """ See sequenceTools.calc_Patterning """
+        key = ("Patterning", _hashable(G1), _hashable(G2))
+        return self._memoized(key, sequenceTools.calc_Patterning, G1, G2)
+
+
+    def motifPositions(self, motif, polar=False):
+        """ See sequenceTools.calc_motifPositions. motif can also be a
+            compiled motif.Motif
+        """
+        if isinstance(motif, Motif):
+            key = ("motifPositions", tuple(motif.positions), polar)
+        else:
+            key = ("motifPositions", _hashable(motif), polar)
+        return self._memoized(key, sequenceTools.calc_motifPositions, motif, polar)
+
+
+    def isMotifPresent(self, motif, polar=False):
+        """ See sequenceTools.calc_isMotifPresent (reuses motifPositions) """
+        return len(self.motifPositions(motif, polar)) > 0
+
+
+    def windowProfile(self, scale="hydropathy", window=sequenceTools.WINDOW_SIZE, edge="same"):
+        """ See sequenceTools.calc_windowProfile (requires numpy) """
+        key = ("windowProfile", _hashable(scale), window, edge)
+        return self._memoized(key, sequenceTools.calc_windowProfile, scale, window, edge)
+
+
+    def profile(self):
+        """ Dictionary of every sequenceTools.BATCH_DESCRIPTORS value """
+        return dict([(name, getattr(self, name)) for name in sequenceTools.BATCH_DESCRIPTORS])
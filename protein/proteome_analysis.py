@@ -0,0 +1,170 @@
+#!/usr/bin/python
+# proteome_analysis
+#
+# Compute sequenceTools descriptors for every sequence in one or more
+# FASTA files, spreading the work over a pool of processes, and write
+# the results as a tab separated table (one row per sequence).
+#
+# Sequences are streamed from the FASTA files and grouped into chunks
+# by total residue count rather than by number of sequences, so every
+# task handed to the pool is roughly the same amount of work and one
+# very long protein doesn't leave the other workers sitting idle. Only
+# a bounded number of chunks are in flight at once, so memory use
+# doesn't grow with the size of the input.
+#
+
+import collections
+import multiprocessing
+
+import sequenceTools
+from aaGroups import AA
+from extract_accessions import read_fasta
+from fasta_index import header_accession
+
+# default number of residues per chunk of work
+CHUNK_RESIDUES = 500000
+
+_AA_SET = frozenset(AA + tuple([a.lower() for a in AA]))
+
+
+def iter_chunks(filenames, chunk_residues=CHUNK_RESIDUES):
+    """ Input:  List of FASTA filenames, and the (approximate) number of
+                residues per chunk
+
+        Output: Generator which yields lists of (accession, sequence)
+                tuples, each holding at least chunk_residues residues
+                (apart from the last one)
+    """
+    chunk = []
+    residues = 0
+
+    for filename in filenames:
+        for (header, sequence) in read_fasta(filename):
+            chunk.append((header_accession(header), sequence))
+            residues += len(sequence)
+
+            if residues >= chunk_residues:
+                yield chunk
+                chunk = []
+                residues = 0
+
+    if len(chunk) > 0:
+        yield chunk
+
+
+def _analyse_chunk(args):
+    """ Worker function. Returns a list of (accession, length, values) rows
+        for the valid sequences in the chunk, and a list of the accessions
+        of sequences which were skipped because they are empty or contain
+        non-cannonical amino acids
+    """
+    (chunk, descriptors) = args
+
+    valid = [(acc, seq) for (acc, seq) in chunk if len(seq) > 0 and _AA_SET.issuperset(seq)]
+    skipped = [acc for (acc, seq) in chunk if not (len(seq) > 0 and _AA_SET.issuperset(seq))]
+
+    rows = []
+    if len(valid) > 0:
+        values = sequenceTools.calc_batchDescriptors([seq for (_, seq) in valid], descriptors)
+        for (k, (acc, seq)) in enumerate(valid):
+            rows.append((acc, len(seq), values[k].tolist()))
+
+    return (rows, skipped)
+
+
+def analyse_proteome(filenames, descriptors=None, processes=None, chunk_residues=CHUNK_RESIDUES):
+    """ Input:  List of FASTA filenames, the descriptors to compute (any
+                of sequenceTools.BATCH_DESCRIPTORS or ORDER_DESCRIPTORS,
+                default all of BATCH_DESCRIPTORS), the
+                number of worker processes (default = number of cores,
+                1 = don't use a pool) and the residues per chunk
+
+        Output: Generator which yields (rows, skipped) for each chunk in
+                input order, where rows is a list of (accession, length,
+                values) and skipped a list of accessions of sequences
+                that couldn't be analysed (empty, or containing
+                non-cannonical amino acids)
+    """
+    if descriptors is None:
+        descriptors = sequenceTools.BATCH_DESCRIPTORS
+
+    for name in descriptors:
+        if name not in sequenceTools.BATCH_DESCRIPTORS + sequenceTools.ORDER_DESCRIPTORS:
+            raise sequenceTools.sequenceToolsException("Unknown batch descriptor '" + str(name) + "'. Options are " + str(sequenceTools.BATCH_DESCRIPTORS + sequenceTools.ORDER_DESCRIPTORS))
+
+    tasks = ((chunk, descriptors) for chunk in iter_chunks(filenames, chunk_residues))
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if processes == 1:
+        for task in tasks:
+            yield _analyse_chunk(task)
+        return
+
+    # keep a few chunks queued per worker, but never read the whole
+    # input into the pool's task queue
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = collections.deque()
+        for task in tasks:
+            pending.append(pool.apply_async(_analyse_chunk, (task,)))
+            if len(pending) >= 4*processes:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Compute sequence descriptors for every sequence in one or more FASTA files and write a tab seperated table')
+    parser.add_argument('filename', metavar='filename',  nargs='+',
+                        help='FASTA file(s) to analyse')
+
+    parser.add_argument('--descriptors', dest='descriptors', default=",".join(sequenceTools.BATCH_DESCRIPTORS),
+                        help='comma seperated list of descriptors to compute. Options are ' + ", ".join(sequenceTools.BATCH_DESCRIPTORS + sequenceTools.ORDER_DESCRIPTORS) + ' (default = ' + ", ".join(sequenceTools.BATCH_DESCRIPTORS) + ')')
+
+    parser.add_argument('--processes', dest='processes', type=int, default=None,
+                        help='number of worker processes (default = number of cores)')
+
+    parser.add_argument('--chunk', dest='chunk', type=int, default=CHUNK_RESIDUES,
+                        help='number of residues per chunk of work (default = ' + str(CHUNK_RESIDUES) + ')')
+
+    parser.add_argument('--out', dest='out', default=None,
+                        help='output file (default = STDOUT)')
+
+    args = parser.parse_args()
+
+    descriptors = [x.strip() for x in args.descriptors.split(",") if x.strip()]
+
+    if args.out:
+        out = open(args.out, "w")
+    else:
+        out = sys.stdout
+
+    numSkipped = 0
+    try:
+        out.write("accession\tlength\t" + "\t".join(descriptors) + "\n")
+        for (rows, skipped) in analyse_proteome(args.filename, descriptors, args.processes, args.chunk):
+            out.write("".join([acc + "\t" + str(length) + "\t" + "\t".join([repr(v) for v in values]) + "\n" for (acc, length, values) in rows]))
+            numSkipped += len(skipped)
+
+    except sequenceTools.sequenceToolsException, e:
+        print "[ERROR] - " + str(e)
+        exit(1)
+
+    finally:
+        if args.out:
+            out.close()
+
+    if numSkipped > 0:
+        sys.stderr.write("WARNING: Skipped " + str(numSkipped) + " empty sequences or sequences with non-cannonical amino acids\n")
@@ -0,0 +1,200 @@
+# pssm
+#
+# Position specific scoring matrix (PSSM) motif scanning.
+#
+# A PSSM of width m is an (m x 20) matrix of scores, with columns in the
+# same order as aaGroups.AA. The score of a window of m residues is the
+# sum over positions j of matrix[j, residue at j]. Scores are computed by
+# encoding sequences into an array of residue codes and gathering rows,
+# i.e. for every window start at once
+#
+#     score = matrix[0][codes[0:]] + matrix[1][codes[1:]] + ...
+#
+# so there is no per-residue Python loop. PSSMs of the same width are
+# stacked so a single gather scores a window against all of them.
+#
+# Residues outside AA (X, U, B, ...) score -inf, so windows containing
+# them never pass a threshold.
+#
+
+import math
+
+import numpy as np
+
+import sequenceTools
+from aaGroups import AA
+
+
+# ---------------------------------------
+#
+class pssmException(Exception):
+    """
+       Exception class for pssm methods
+    """
+    pass
+
+
+# code given to non-cannonical residues (and sequence seperators)
+_UNKNOWN = len(AA)
+
+# byte -> code lookup, with everything outside AA mapped to _UNKNOWN
+_CODES = sequenceTools._CODE_LUT.copy()
+_CODES[_CODES == 255] = _UNKNOWN
+
+
+def _encode(seqs):
+    """ Concatenate sequences (seperated by one unknown residue, so no
+        window can span two sequences) into an array of codes. Returns
+        (codes, starts) where starts[k] is the offset of sequence k
+    """
+    joined = "\n".join(seqs)
+    if not isinstance(joined, bytes):
+        joined = joined.encode("ascii")
+
+    starts = np.cumsum([0] + [len(s)+1 for s in seqs])[:-1]
+    return (_CODES[np.frombuffer(joined, dtype=np.uint8)], starts)
+
+
+# ---------------------------------------
+#
+class PSSM(object):
+    """
+       A position specific scoring matrix.
+
+       matrix     Either an (m x 20) array (or list of lists) of scores
+                  with columns ordered as in AA, or a list of m
+                  dictionaries of residue -> score (missing residues
+                  score 0)
+
+       threshold  Default score a window must reach to be a hit
+
+       name       Optional name for the matrix
+    """
+
+    def __init__(self, matrix, threshold=0.0, name=None):
+        if len(matrix) > 0 and isinstance(matrix[0], dict):
+            matrix = [[position.get(a, 0.0) for a in AA] for position in matrix]
+
+        matrix = np.array(matrix, dtype=np.float64)
+        if matrix.ndim != 2 or matrix.shape[1] != len(AA) or matrix.shape[0] == 0:
+            raise pssmException("PSSM must be an (m x " + str(len(AA)) + ") matrix, got shape " + str(matrix.shape))
+
+        self.matrix = matrix
+        self.width = matrix.shape[0]
+        self.threshold = threshold
+        self.name = name
+
+        # extra column for unknown residues
+        self._table = np.hstack((matrix, np.empty((self.width, 1))))
+        self._table[:, _UNKNOWN] = -np.inf
+
+
+    def __len__(self):
+        return self.width
+
+
+    @classmethod
+    def from_sites(cls, sites, pseudocount=1.0, threshold=0.0, name=None):
+        """ Input:  List of aligned example sites (all the same length)
+                    and a pseudocount added to every residue count
+
+            Output: PSSM of log2 odds scores against a uniform residue
+                    background
+        """
+        if len(sites) == 0 or len(set([len(s) for s in sites])) != 1:
+            raise pssmException("Sites must be a non-empty list of equal length sequences")
+
+        matrix = []
+        for j in xrange(len(sites[0])):
+            column = [s[j].upper() for s in sites]
+            total = len(sites) + pseudocount*len(AA)
+            matrix.append([math.log((column.count(a) + pseudocount)/total*len(AA), 2) for a in AA])
+
+        return cls(matrix, threshold, name)
+
+
+    def score(self, seq):
+        """ Input:  A sequence
+
+            Output: numpy array with the score of every window (len(seq)
+                    - width + 1 values)
+        """
+        (codes, _) = _encode([seq])
+        n = len(codes) - self.width + 1
+        scores = np.zeros(max(n, 0))
+
+        for j in xrange(self.width):
+            scores += self._table[j][codes[j:j+n]]
+
+        return scores
+
+
+    def find(self, seq, threshold=None):
+        """ Input:  A sequence, and optionally a threshold (default is
+                    the PSSM's threshold)
+
+            Output: List of (start, score) for every window scoring at
+                    least threshold
+        """
+        if threshold is None:
+            threshold = self.threshold
+
+        scores = self.score(seq)
+        return [(int(i), float(scores[i])) for i in np.flatnonzero(scores >= threshold)]
+
+
+def scan_batch(seqs, pssms, thresholds=None, chunk_residues=None):
+    """ Input:  List of sequences, list of PSSMs, optionally a list of
+                thresholds (one per PSSM, default is each PSSM's own
+                threshold) and the number of residues scored at once
+                (default sequenceTools.BATCH_CHUNK_RESIDUES)
+
+        Output: List of (sequence index, pssm index, start, score) for
+                every window of every sequence scoring at least the
+                threshold, sorted by sequence, then pssm, then start
+    """
+    if thresholds is None:
+        thresholds = [p.threshold for p in pssms]
+    if len(thresholds) != len(pssms):
+        raise pssmException("Need one threshold per PSSM")
+    if chunk_residues is None:
+        chunk_residues = sequenceTools.BATCH_CHUNK_RESIDUES
+
+    # stack PSSMs of the same width into (width x 21 x n) tables
+    byWidth = {}
+    for (k, p) in enumerate(pssms):
+        byWidth.setdefault(p.width, []).append(k)
+
+    groups = []
+    for (width, members) in sorted(byWidth.items()):
+        table = np.dstack([pssms[k]._table for k in members])
+        groups.append((width, np.array(members), table, np.array([thresholds[k] for k in members])))
+
+    hits = []
+    lengths = np.array([len(s) for s in seqs], dtype=np.int64)
+
+    # score whole sequences a chunk at a time to bound memory
+    for (first, last, _, _) in sequenceTools._batchChunks(lengths + 1):
+        (codes, starts) = _encode(seqs[first:last])
+        seqIndex = np.repeat(np.arange(first, last), lengths[first:last] + 1)
+
+        for (width, members, table, cutoffs) in groups:
+            n = len(codes) - width + 1
+            if n <= 0:
+                continue
+
+            # sub-chunk so the (windows x pssms) score array stays small
+            step = max(1, chunk_residues // len(members))
+            for lo in xrange(0, n, step):
+                hi = min(n, lo+step)
+                scores = np.zeros((hi-lo, len(members)))
+                for j in xrange(width):
+                    scores += table[j][codes[lo+j:hi+j]]
+
+                (windows, cols) = np.nonzero(scores >= cutoffs)
+                for (w, c) in zip(windows, cols):
+                    s = seqIndex[lo+w]
+                    hits.append((int(s), int(members[c]), int(lo + w - starts[s-first]), float(scores[w, c])))
+
+    hits.sort()
+    return hits
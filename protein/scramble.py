@@ -0,0 +1,253 @@
+# scramble
+#
+# Scrambled sequence null models. To judge whether a patterning or
+# flanking value is unusual for a sequence it's compared against the
+# same metric for many random permutations of that sequence (same
+# composition, random order).
+#
+# Rather than building and scoring thousands of shuffled strings, the
+# sequence is encoded once as an array of residue codes and a batch of
+# permutations is generated as a 2D integer array (one permutation per
+# row). Indexing the codes with it gives every scrambled sequence at
+# once, and each metric is computed for all rows with array operations.
+# Permutations are generated and scored a chunk of rows at a time so
+# memory stays bounded by sequenceTools.BATCH_CHUNK_RESIDUES however
+# many scrambles are asked for.
+#
+# Metrics are given as (name, arguments) tuples, where name is one of
+# SCRAMBLE_METRICS and the arguments are those of the matching function
+# after the sequence
+#
+#   ("flankingScore", (TARGET, FLANKER))           sequenceTools.calc_flankingScore
+#   ("flankingScore", (TARGET, FLANKER, False))    ... with bonusHug=False
+#   ("Patterning", (G1, G2))                       sequenceTools.calc_Patterning
+#   ("kappa", (G1, G2))                            patterning.calc_kappa
+#
+# so several metrics can be evaluated over the same set of scrambles.
+#
+
+import numpy as np
+
+import patterning
+import sequenceTools
+from aaGroups import *
+
+
+# ---------------------------------------
+#
+class scrambleException(Exception):
+    """
+       Exception class for scramble methods
+    """
+    pass
+
+
+SCRAMBLE_METRICS = ("flankingScore", "Patterning", "kappa")
+
+SCRAMBLE_TAILS = ("two-sided", "greater", "less")
+
+
+def _flankingKernel(TARGET, FLANKER, bonusHug=True):
+    """ calc_flankingScore for every row of a 2D array of residue codes.
+        A target scores 1 for each flanking neighbour, or 6 if flanked on
+        both sides (as in calc_flankingScore, bonusHug only changes the
+        maximum score)
+    """
+    target = patterning._groupTable(TARGET).astype(bool)
+    flanker = patterning._groupTable(FLANKER).astype(bool)
+
+    def kernel(rows):
+        length = rows.shape[1]
+        if length < 2:
+            raise scrambleException("flankingScore needs a sequence of at least 2 residues")
+
+        maxVal = sequenceTools._flankingMaxVal(length, bonusHug)
+
+        T = target[rows]
+        F = flanker[rows].astype(np.int64)
+
+        left = np.zeros_like(F)
+        left[:, 1:] = F[:, :-1]
+        right = np.zeros_like(F)
+        right[:, :-1] = F[:, 1:]
+
+        count = np.where(T, left + right + 4*left*right, 0).sum(axis=1)
+        return count / float(maxVal)
+
+    return kernel
+
+
+def _patterningKernel(G1, G2):
+    """ calc_Patterning (the number of switches between G1 and G2
+        residues, ignoring everything else) for every row of a 2D array
+        of residue codes
+    """
+    g1 = patterning._groupTable(G1).astype(bool)
+    g2 = patterning._groupTable(G2).astype(bool)
+    if (g1 & g2).any():
+        raise scrambleException("Patterning null model needs non-overlapping groups G1 and G2")
+
+    labels = np.where(g1, 1, np.where(g2, 2, 0)).astype(np.int8)
+
+    def kernel(rows):
+        lab = labels[rows]
+
+        # every row is a permutation of the same sequence, so each has
+        # the same number of G1/G2 residues and dropping the neutral
+        # ones leaves a rectangular array
+        charged = lab[lab != 0].reshape(len(rows), -1)
+        if charged.shape[1] < 2:
+            return np.zeros(len(rows))
+
+        return (charged[:, 1:] != charged[:, :-1]).sum(axis=1).astype(np.float64)
+
+    return kernel
+
+
+def _kappaKernel(G1=NEG, G2=POS, blobs=patterning.BLOB_SIZES):
+    """ kappa for every row of a 2D array of residue codes
+    """
+    table1 = patterning._groupTable(G1)
+    table2 = patterning._groupTable(G2)
+
+    def kernel(rows):
+        lengths = np.empty(len(rows), dtype=np.int64)
+        lengths.fill(rows.shape[1])
+        return patterning._kappa(table1[rows].ravel(), table2[rows].ravel(), lengths, blobs)
+
+    return kernel
+
+
+_KERNELS = {"flankingScore" : _flankingKernel,
+            "Patterning"    : _patterningKernel,
+            "kappa"         : _kappaKernel}
+
+
+def _kernels(metrics):
+    kernels = []
+    for metric in metrics:
+        try:
+            (name, args) = metric
+        except (TypeError, ValueError):
+            raise scrambleException("Metrics must be (name, arguments) tuples, got " + str(metric))
+
+        if name not in _KERNELS:
+            raise scrambleException("Unknown metric '" + str(name) + "'. Options are " + str(SCRAMBLE_METRICS))
+        kernels.append(_KERNELS[name](*args))
+
+    return kernels
+
+
+# ---------------------------------------
+#
+def permutations(length, n, rng=None):
+    """ Input:  Sequence length, number of permutations and optionally a
+                numpy RandomState (or an integer seed)
+
+        Output: (n x length) numpy integer array where each row is a
+                random permutation of 0..length-1
+    """
+    if rng is None or isinstance(rng, (int, long)):
+        rng = np.random.RandomState(rng)
+
+    # sorting a row of random keys gives a uniformly random permutation
+    return rng.random_sample((n, length)).argsort(axis=1)
+
+
+# ---------------------------------------
+#
+def calc_scrambledScores(seq, metrics, n=1000, rng=None, chunk_rows=None):
+    """ Calculate metrics over n random scrambles of a sequence
+        Return type: (observed, null) where observed is a numpy array of
+                     the metric values for seq itself, and null a numpy
+                     array of shape (n, len(metrics)) with the values for
+                     each scramble
+
+        seq         Protein sequence
+
+        metrics     List of (name, arguments) tuples (see module header)
+
+        n           Number of scrambles
+
+        rng         numpy RandomState or integer seed (default = random)
+
+        chunk_rows  Number of scrambles generated and scored at once
+                    (default = as many as fit in
+                    sequenceTools.BATCH_CHUNK_RESIDUES residues)
+    """
+    (codes, lengths) = sequenceTools._encodeBatch([seq])
+    kernels = _kernels(metrics)
+    length = len(codes)
+
+    if rng is None or isinstance(rng, (int, long)):
+        rng = np.random.RandomState(rng)
+
+    if chunk_rows is None:
+        chunk_rows = max(1, sequenceTools.BATCH_CHUNK_RESIDUES // length)
+
+    observed = np.array([kernel(codes[None, :])[0] for kernel in kernels])
+
+    null = np.empty((n, len(kernels)))
+    for first in xrange(0, n, chunk_rows):
+        last = min(n, first+chunk_rows)
+        rows = codes[permutations(length, last-first, rng)]
+        for (col, kernel) in enumerate(kernels):
+            null[first:last, col] = kernel(rows)
+
+    return (observed, null)
+
+
+# ---------------------------------------
+#
+def calc_scrambleSignificance(seq, metrics, n=1000, rng=None, tail="two-sided", chunk_rows=None):
+    """ Compare metrics for a sequence against n random scrambles of it
+        Return type: List of dictionaries (one per metric) with keys
+                     observed, mean, std, z and p
+
+        z is (observed - mean)/std over the scrambles (NaN if the std
+        is 0), and p the empirical p-value (k+1)/(n+1) where k is the
+        number of scrambles at least as extreme as the observed value
+
+        seq         Protein sequence
+
+        metrics     List of (name, arguments) tuples (see module header)
+
+        n           Number of scrambles
+
+        rng         numpy RandomState or integer seed (default = random)
+
+        tail        "greater" (scrambles >= observed), "less"
+                    (scrambles <= observed) or "two-sided" (scrambles
+                    at least as far from the mean as observed)
+
+        chunk_rows  Number of scrambles generated and scored at once
+    """
+    if tail not in SCRAMBLE_TAILS:
+        raise scrambleException("Unknown tail '" + str(tail) + "'. Options are " + str(SCRAMBLE_TAILS))
+
+    (observed, null) = calc_scrambledScores(seq, metrics, n, rng, chunk_rows)
+
+    mean = null.mean(axis=0)
+    std = null.std(axis=0)
+
+    if tail == "greater":
+        extreme = null >= observed
+    elif tail == "less":
+        extreme = null <= observed
+    else:
+        extreme = np.abs(null - mean) >= np.abs(observed - mean)
+
+    results = []
+    for col in xrange(len(observed)):
+        if std[col] > 0:
+            z = (observed[col] - mean[col]) / std[col]
+        else:
+            z = float("nan")
+
+        results.append({"observed" : float(observed[col]),
+                        "mean"     : float(mean[col]),
+                        "std"      : float(std[col]),
+                        "z"        : float(z),
+                        "p"        : (extreme[:, col].sum() + 1.0) / (n + 1.0)})
+
+    return results
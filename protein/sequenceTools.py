@@ -6,7 +6,20 @@
 # using results from these tools.
 #
 
+import array
+import functools
+import operator
+import string
+
 from aaGroups import * # get all our classes 
+from motif import Motif
+
+# numpy is only needed for the batch (whole proteome) functions, so
+# the per-sequence functions still work without it
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 # ---------------------------------------
@@ -19,33 +32,129 @@ class sequenceToolsException(Exception):
 
 
 # ---------------------------------------
-# Nice decorator which santizizes input for all functions
-def _convertToUpperCase_sanitize(fn):
-    def wrapped(seq, A=None,B=None,C=None,D=None):
+# Residue encoding. Each residue gets an integer code (its index in AA)
+# and a bitmask with one bit per aaGroups group it's a member of
+#
+GROUP_NAMES = ("NEG", "POS", "HYDROPHOBIC", "POLAR", "BULKYHYDROPHOBES", "NONPOLAR",
+               "AROMATIC", "AMINES", "HYDROXYLS", "LOW_EXPOSED", "MED_EXPOSED", "HIGH_EXPOSED")
 
-        # check it's a string
-        try:
-            UC_seq = seq.upper()
-        except:
-            raise sequenceToolsException("Invalid sequence input: Must be a string")
+GROUP_BITS = dict([(name, 1 << k) for k, name in enumerate(GROUP_NAMES)])
+
+AA_INDEX = dict([(a, k) for k, a in enumerate(AA)])
+
+_AA_SET = frozenset(AA)
+_RESIDUE_MASKS = dict([(a, sum([GROUP_BITS[name] for name in GROUP_NAMES if a in globals()[name]])) for a in AA])
+_CODE_TRANSLATION = string.maketrans("".join(AA), "".join([chr(k) for k in xrange(len(AA))]))
+
+
+def calc_groupBit(GROUP):
+    """ Returns the EncodedSequence mask bit for an aaGroups group, given
+        either its name ("NEG") or the group itself (NEG, or the same
+        residues in any order or container). Returns 0 if the group
+        isn't one of GROUP_NAMES
+
+        GROUP      Group name or group
+    """
+    if isinstance(GROUP, basestring):
+        return GROUP_BITS.get(GROUP, 0)
+
+    residues = frozenset(GROUP)
+    for name in GROUP_NAMES:
+        if frozenset(globals()[name]) == residues:
+            return GROUP_BITS[name]
+
+    return 0
+
+
+# ---------------------------------------
+#
+class _ValidatedSequence(str):
+    """
+       Upper case sequence which has already been checked for
+       non-cannonical amino acids. The sanitize decorator passes
+       these straight through, so functions which call other
+       calc_* functions only validate once
+    """
+    pass
+
+
+class EncodedSequence(_ValidatedSequence):
+    """
+       A protein sequence which is validated once on construction
+       and can then be passed to any calc_* function without being
+       re-validated. Behaves as an upper case string, and in addition
+       stores
+
+       codes          bytearray of residue codes (index into AA)
+       masks          array of per-residue group bitmasks (see
+                      GROUP_BITS and calc_groupBit)
+       composition    tuple of residue counts, ordered as in AA
+
+       seq            Protein sequence
+    """
+    def __new__(cls, seq):
+        obj = _ValidatedSequence.__new__(cls, _sanitize(seq))
+        obj.codes = bytearray(str.translate(obj, _CODE_TRANSLATION))
+        obj.masks = array.array('L', [_RESIDUE_MASKS[a] for a in obj])
+        obj.composition = tuple([obj.count(a) for a in AA])
+        return obj
+
+
+def _sanitize(seq):
+    """ Returns the upper case version of seq, raising a sequenceToolsException
+        if it's not a string or contains non-cannonical amino acids
+    """
+    # check it's a string
+    try:
+        UC_seq = seq.upper()
+    except:
+        raise sequenceToolsException("Invalid sequence input: Must be a string")
         
-        # check we don't have any non-cannonical AAs
+    # check we don't have any non-cannonical AAs
+    if not _AA_SET.issuperset(UC_seq):
         bad = (["".join(x) for x in UC_seq if not x in AA])
-        
-        if len(bad) > 0:
-            raise sequenceToolsException("Invalid sequence input: Contains non-cannonical amino acid: " + str(bad)) 
-        
-        # this is ugly, but provides decorator polymorphism
-        if A==None:
-            return fn(UC_seq)
-        elif B==None:
-            return fn(UC_seq,A)
-        elif C==None:
-            return fn(UC_seq,A,B)
-        elif D==None:
-            return fn(UC_seq,A,B,C)
-        else:
-            return fn(UC_seq,A,B,C,D)
+        raise sequenceToolsException("Invalid sequence input: Contains non-cannonical amino acid: " + str(bad)) 
+
+    return UC_seq
+
+
+def _groupCount(seq, CLASS):
+    """ Number of residues of an EncodedSequence which are in CLASS, from
+        its composition
+    """
+    return sum([seq.composition[k] for k, a in enumerate(AA) if a in CLASS])
+
+
+def _scaleSum(seq, table):
+    """ Sum of a compiled scale (see _tableSum) over an EncodedSequence,
+        from its composition
+    """
+    return sum([seq.composition[k]*table[ord(a)] for k, a in enumerate(AA)])
+
+
+def _tableSum(seq, table):
+    """ Sum of a compiled scale (256 entry lookup table, see 
+        aaGroups.SCALE_TABLES) over a validated sequence
+    """
+    return sum(map(table.__getitem__, bytearray(seq)))
+
+
+# ---------------------------------------
+# Nice decorator which santizizes input for all functions. Sequences
+# which have already been validated (EncodedSequence objects) are passed
+# straight through
+def _convertToUpperCase_sanitize(fn):
+    @functools.wraps(fn)
+    def wrapped(seq, *args, **kwargs):
+
+        if not isinstance(seq, _ValidatedSequence):
+            seq = _ValidatedSequence(_sanitize(seq))
+
+        return fn(seq, *args, **kwargs)
+
+    # python 2's functools.wraps doesn't keep a reference to the original
+    # function, which is needed to see its argument defaults
+    wrapped.__wrapped__ = fn
         
     return wrapped
 
@@ -136,6 +245,8 @@ def calc_NetCharge(seq):
 
         seq        Protein sequence 
     """
+    if isinstance(seq, EncodedSequence):
+        return _groupCount(seq, POS) - _groupCount(seq, NEG)
   
     charge = 0
 
@@ -147,6 +258,36 @@ def calc_NetCharge(seq):
 
     return charge
 
+# ---------------------------------------
+# ---------------------------------------
+# 
+@_convertToUpperCase_sanitize
+def calc_SCD(seq):
+    """ Calculate the sequence charge decoration (Sawle and Ghosh, J Chem
+        Phys 2015 143:085101)
+
+            SCD = 1/N sum_{i<j} q_i q_j (j-i)^0.5
+
+        where q is +1 for POS, -1 for NEG and 0 for other residues.
+        Rather than the O(N^2) double sum this is computed from the charge
+        autocorrelation, sum_i q_i q_{i+d} for every separation d, which
+        is obtained with an FFT in O(N log N). Without numpy only pairs
+        of charged residues are summed.
+
+        seq        Protein sequence 
+    """
+    if np is not None:
+        return float(calc_batchSCD([seq])[0])
+
+    charged = [(i, _CHARGE[a]) for (i, a) in enumerate(seq) if _CHARGE[a] != 0]
+
+    scd = 0.0
+    for (k, (i, qi)) in enumerate(charged):
+        for (j, qj) in charged[k+1:]:
+            scd = scd + qi*qj*(j-i)**0.5
+
+    return scd/len(seq)
+
 # ---------------------------------------
 # ---------------------------------------
 # 
@@ -156,7 +297,8 @@ def calc_TotalCharge(seq):
 
         seq        Protein sequence 
     """
-
+    if isinstance(seq, EncodedSequence):
+        return _groupCount(seq, NEG+POS)
     
     charge = 0
 
@@ -176,6 +318,9 @@ def calc_GroupContent(seq, CLASS):
 
         seq        Protein sequence 
     """
+    if isinstance(seq, EncodedSequence):
+        return _groupCount(seq, CLASS)
+
     content = 0
 
     for i in seq:
@@ -200,21 +345,16 @@ def calc_EntropySum(seq, conf="helix"):
     seqType = -1
 
     if conf =="helix":
-        seqType = HELIX_ENTROPY
+        seqType = "HELIX_ENTROPY"
     elif conf =="coil":
-        seqType = COIL_ENTROPY
+        seqType = "COIL_ENTROPY"
     else:
         raise sequenceToolsException("Invalid conformation type for calc_entropySum() funcion.")
-    
-    ent_sum = 0
 
-    for i in seq:
-        try:
-            ent_sum = seqType[i]+ent_sum
-        except KeyError, e:
-            raise sequenceToolsException("Invalid amino acid in sequence")
-        
-    return ent_sum
+    if isinstance(seq, EncodedSequence):
+        return _scaleSum(seq, SCALE_TABLES[seqType])
+
+    return _tableSum(seq, SCALE_TABLES[seqType])
 
 # ---------------------------------------
 # ---------------------------------------
@@ -228,15 +368,38 @@ def calc_HydrophobicitySum(seq):
         seq        Protein sequence 
 
     """
-    hydr_sum = 0
+    if isinstance(seq, EncodedSequence):
+        return _scaleSum(seq, SCALE_TABLES["KD_HYDROPHOBICITY"])
+
+    return _tableSum(seq, SCALE_TABLES["KD_HYDROPHOBICITY"])
+
+# ---------------------------------------
+# ---------------------------------------
+# 
+@_convertToUpperCase_sanitize
+def calc_SHD(seq):
+    """ Calculate the sequence hydropathy decoration (Zheng et al, J Phys
+        Chem Lett 2020 11:3408)
+
+            SHD = 1/N sum_{i<j} (h_i + h_j) / (j-i)
 
+        where h is the Kyte-Doolittle hydropathy rescaled to [0, 1].
+        Grouping the pairs by separation d, the sum over pairs d apart
+        is (P[N-d] + P[N] - P[d]) / d where P is the prefix sum of h,
+        so SHD is computed in O(N) rather than O(N^2).
+
+        seq        Protein sequence 
+    """
+    prefix = [0.0]
     for i in seq:
-        try:
-            hydr_sum = KD_HYDROPHOBICITY[i]+hydr_sum
-        except KeyError, e:
-            raise sequenceToolsException("Invalid amino acid in sequence")
-        
-    return hydr_sum
+        prefix.append(prefix[-1] + _NORMALIZED_KD[i])
+
+    N = len(seq)
+    shd = 0.0
+    for d in xrange(1, N):
+        shd = shd + (prefix[N-d] + prefix[N] - prefix[d])/d
+
+    return shd/N
 
 # ---------------------------------------
 # ---------------------------------------
@@ -250,17 +413,75 @@ def calc_HydrophobicityScore(seq):
         seq        Protein sequence 
 
     """
-    maxVal = len(seq)*max(KD_HYDROPHOBICITY.values())
+    maxVal = len(seq)*max(SCALES["KD_HYDROPHOBICITY"].values())
 
-    hydr_sum = 0
+    if isinstance(seq, EncodedSequence):
+        return _scaleSum(seq, SCALE_TABLES["KD_HYDROPHOBICITY"])/maxVal
 
-    for i in seq:
-        try:
-            hydr_sum = KD_HYDROPHOBICITY[i]+hydr_sum
-        except KeyError, e:
-            raise sequenceToolsException("Invalid amino acid in sequence")
-        
-    return hydr_sum/maxVal
+    return _tableSum(seq, SCALE_TABLES["KD_HYDROPHOBICITY"])/maxVal
+
+
+
+# ---------------------------------------
+# ---------------------------------------
+# 
+def calc_scaleSum(seqs, scale):
+    """ Calculate the sum of any per-residue scale over a sequence, or 
+        over every sequence in a list (which requires numpy)
+        Return type: <float> for a single sequence, or a numpy array
+                     for a list of sequences
+
+        seqs       Protein sequence, or list of protein sequences
+
+        scale      Name of a scale registered in aaGroups (see 
+                   aaGroups.register_scale) or a dictionary of 
+                   per-residue values
+    """
+    try:
+        table = get_scale_table(scale)
+    except aaGroupsException, e:
+        raise sequenceToolsException(str(e))
+
+    if isinstance(seqs, basestring):
+        return _tableSum(_sanitize(seqs), table)
+
+    _requireNumpy()
+    (values, lengths) = _scaleValues(seqs, table)
+
+    sums = np.empty(len(lengths))
+    for (first, last, start, stop) in _batchChunks(lengths):
+        segments = np.repeat(np.arange(last-first), lengths[first:last])
+        sums[first:last] = np.bincount(segments, weights=values[start:stop], minlength=last-first)
+
+    return sums
+
+# ---------------------------------------
+# ---------------------------------------
+# 
+def calc_scaleMean(seqs, scale):
+    """ Calculate the mean of any per-residue scale over a sequence, or 
+        over every sequence in a list (see calc_scaleSum)
+        Return type: <float> for a single sequence, or a numpy array
+                     for a list of sequences
+
+        seqs       Protein sequence, or list of protein sequences
+
+        scale      Name of a registered scale or a dictionary of 
+                   per-residue values
+    """
+    if isinstance(seqs, basestring):
+        return calc_scaleSum(seqs, scale)/float(len(seqs))
+
+    return calc_scaleSum(seqs, scale)/np.array([len(s) for s in seqs], dtype=np.float64)
+
+
+def _scaleValues(seqs, table):
+    """ Per-residue values of a compiled scale for a concatenated list of
+        sequences, looked up directly from the raw bytes. Returns (values,
+        lengths), raising a sequenceToolsException on an empty sequence
+        or a non-cannonical amino acid
+    """
+    return _lookupBatch(seqs, np.frombuffer(table, dtype=np.float64), np.isnan)
 
 
 
@@ -270,6 +491,8 @@ def calc_AntiStructureScore(seq):
     
         seq        Protein sequence 
     """
+    if isinstance(seq, EncodedSequence):
+        return _scaleSum(seq, _ANTISTRUCTURE_TABLE)
     
     score = 0
     
@@ -468,78 +691,742 @@ def calc_isMotifPresent(seq, motif, polar=False):
        or aaGroups based groups (aaGroups.NEG). A wildcard ("*")
        will match any possible amino acid. If a match is found 
        returns true, will only find the first match (i.e. doesn't
-       return the number of matches)
+       return the number of matches, see calc_motifPositions). The
+       motif array isn't modified.
+
+       For scanning many sequences for the same motif compile it
+       once with motif.Motif and use its search/find_all methods
 
        seq        Protein sequence of interest
                   [String]  
 
-       motif      array containing the motif of intrerest
+       motif      array containing the motif of intrerest, or a
+                  compiled motif.Motif
 
        polar      define if we care about motif polarity. i.e.
                   if false and motif is "AKG" will look for either
                   "AKG" or "GKA"
 
     """
+    if not isinstance(motif, Motif):
+        motif = Motif(motif)
 
-    # -----------------------------------------------------------
-    # internal method
-    def matchCheck(seq, motif):
-        progressThroughMotif = 0
-        progressThroughSequence = 0
+    return motif.search(seq, polar)
 
-        while progressThroughSequence < len(seq):
-            #print "SeqPos = " + str(progressThroughSequence)
-            
-        # if we've moved all the way through the motif while
-        # succesfully matching then return true
-            
-            
-            if seq[progressThroughSequence] in motif[progressThroughMotif]:
-                #print "Motif Pos = " + str(progressThroughMotif) + " => " + str(seq[progressThroughSequence]) + " in " + str(motif[progressThroughMotif])
-                progressThroughMotif=progressThroughMotif+1
-                progressThroughSequence = progressThroughSequence+1
-            else:
-                #print "Motif Pos = " + str(progressThroughMotif) + " => " + str(seq[progressThroughSequence]) + " not in " + str(motif[progressThroughMotif])
-                progressThroughSequence = progressThroughSequence-(progressThroughMotif-1) # if 0 progress though motif will add one
-                progressThroughMotif = 0
-
-                
-            #print len(motif)
-            #print progressThroughMotif
-            #print progressThroughSequence
-            #print len(seq)
-            if progressThroughMotif == len(motif):
-                return True
-
-                
-                # note this allows us to restart and test a motif after one possible motif fails
-                # e.g. if we had EEEEAEEE and were looking at EAE
-                #print "is " + str(i) + " in " + str(motif[progressThroughMotif])
-                #if seq[progressThroughSequence] in motif[progressThroughMotif]:
-                #    progressThroughMotif=progressThroughMotif+1
-
-        # if we get here, never found it, False
-        return False
-    # -----------------------------------------------------------
-    
+
+@_convertToUpperCase_sanitize
+def calc_motifPositions(seq, motif, polar=False):
     
-    #print "============="
-    # replace wildcard with all amino acids
-    k = 0
-    for i in motif:
-        if i == "*":
-            motif[k] = AA
-            
-        motif[k] = [a.upper() for a in motif[k]]
-            
-        k = k+1 
-            
-    # first pass
-    if matchCheck(seq, motif):
-        return True
+    """
+       Returns every position at which $motif is found in $sequence
+       as a sorted list of (start, orientation) tuples, where 
+       orientation is "+" for the motif as given and "-" for the
+       reversed motif. See calc_isMotifPresent for the motif syntax.
+
+       seq        Protein sequence of interest
+                  [String]  
+
+       motif      array containing the motif of intrerest, or a
+                  compiled motif.Motif
+
+       polar      if True only look for the motif as given, 
+                  otherwise also look for the reversed motif
+
+    """
+    if not isinstance(motif, Motif):
+        motif = Motif(motif)
+
+    return motif.find_all(seq, polar)
+
+
+
+
+# ---------------------------------------
+# ---------------------------------------
+# PROFILE AND BATCH DESCRIPTORS
+#
+# calc_profile computes every descriptor below for one sequence from a
+# single composition count, and the batch functions compute them for a
+# whole list of sequences at once. Rather than walking each string one character at a time, all
+# sequences are concatenated into one uint8 buffer, mapped to residue
+# codes (index into AA) through a 256 entry lookup table and reduced per
+# sequence into an (n x 20) composition matrix. Every descriptor below
+# is a per-residue sum (optionally divided by length) so it is then just
+# a matrix product against a per-residue value table.
+#
+
+# descriptors available to calc_profile and calc_batchDescriptors, in
+# default column order
+BATCH_DESCRIPTORS = ("NetCharge",
+                     "TotalCharge",
+                     "NCPR",
+                     "TCPR",
+                     "ACPR",
+                     "HCPR",
+                     "PCPR",
+                     "BHCPR",
+                     "HelixEntropySum",
+                     "CoilEntropySum",
+                     "HydrophobicitySum",
+                     "HydrophobicityScore",
+                     "AntiStructureScore")
+
+# descriptors which depend on residue order rather than just composition,
+# which calc_batchDescriptors also accepts (but doesn't compute by default)
+ORDER_DESCRIPTORS = ("SCD",
+                     "SHD")
+
+# maximum number of residues reduced in one go (bounds memory use)
+BATCH_CHUNK_RESIDUES = 2**22
+
+def _membership(GROUP):
+    return dict([(a, 1 if a in GROUP else 0) for a in AA])
+
+_CHARGE = dict([(a, (1 if a in POS else 0) - (1 if a in NEG else 0)) for a in AA])
+_NORMALIZED_KD = dict([(a, (KD_HYDROPHOBICITY[a] - min(KD_HYDROPHOBICITY.values()))/(max(KD_HYDROPHOBICITY.values()) - min(KD_HYDROPHOBICITY.values()))) for a in AA])
+_ANTISTRUCTURE = dict([(a, SHEET_PROPENSITY[a]+HELIX_PROPENSITY[a]) for a in AA])
+_ANTISTRUCTURE_TABLE = get_scale_table(_ANTISTRUCTURE)
+
+# descriptor name -> (per-residue values or the name of a registered
+# scale, per residue?, scale). Per residue descriptors are divided by
+# (length * scale), where a scale of None means the largest value of the
+# registered scale
+_DESCRIPTOR_DEFS = {"NetCharge"           : (_CHARGE, False, 1.0),
+                    "TotalCharge"         : (_membership(NEG+POS), False, 1.0),
+                    "NCPR"                : (_CHARGE, True, 1.0),
+                    "TCPR"                : (_membership(NEG+POS), True, 1.0),
+                    "ACPR"                : (_membership(AROMATIC), True, 1.0),
+                    "HCPR"                : (_membership(HYDROPHOBIC), True, 1.0),
+                    "PCPR"                : (_membership(POLAR), True, 1.0),
+                    "BHCPR"               : (_membership(BULKYHYDROPHOBES), True, 1.0),
+                    "HelixEntropySum"     : ("HELIX_ENTROPY", False, 1.0),
+                    "CoilEntropySum"      : ("COIL_ENTROPY", False, 1.0),
+                    "HydrophobicitySum"   : ("KD_HYDROPHOBICITY", False, 1.0),
+                    "HydrophobicityScore" : ("KD_HYDROPHOBICITY", True, None),
+                    "AntiStructureScore"  : (_ANTISTRUCTURE, False, 1.0)}
+
+# registered scales used by BATCH_DESCRIPTORS
+_PROFILE_SCALES = tuple(sorted(set([_DESCRIPTOR_DEFS[_name][0] for _name in BATCH_DESCRIPTORS if isinstance(_DESCRIPTOR_DEFS[_name][0], basestring)])))
+
+
+def _descriptorDef(name):
+    """ (per-residue values, per residue?, scale) of a _DESCRIPTOR_DEFS
+        descriptor, looking registered scales up in aaGroups.SCALES when
+        called so a re-registered scale is used straight away
+    """
+    (values, perResidue, scale) = _DESCRIPTOR_DEFS[name]
+    if isinstance(values, basestring):
+        values = SCALES[values]
+        if scale is None:
+            scale = max(values.values())
+    return (values, perResidue, scale)
+
+
+# (scale tables, columns, terms) last built by _profileTerms
+_PROFILE_CACHE = [None, None, None]
+
+def _profileTerms():
+    """ Per-residue values of each distinct descriptor sum (several
+        descriptors share one, e.g. NetCharge and NCPR), and for each
+        descriptor the sum it uses and what it's divided by. Rebuilt
+        whenever one of the _PROFILE_SCALES has been re-registered
+    """
+    tables = [SCALE_TABLES[name] for name in _PROFILE_SCALES]
+    if _PROFILE_CACHE[0] is None or not all(map(operator.is_, tables, _PROFILE_CACHE[0])):
+        columns = []
+        terms = []
+        for name in BATCH_DESCRIPTORS:
+            (values, perResidue, scale) = _descriptorDef(name)
+            column = tuple([values[a] for a in AA])
+            if column not in columns:
+                columns.append(column)
+            terms.append((name, columns.index(column), scale if perResidue else None))
+        _PROFILE_CACHE[:] = [tables, columns, terms]
+
+    return (_PROFILE_CACHE[1], _PROFILE_CACHE[2])
+
+
+# ---------------------------------------
+# 
+@_convertToUpperCase_sanitize
+def calc_profile(seq):
+    """ Calculate the full descriptor profile of a sequence in one pass:
+        net and total charge, NCPR, TCPR, ACPR, HCPR, PCPR, BHCPR, the
+        helix and coil entropy sums, the Kyte-Doolittle hydrophobicity
+        sum and score and the anti-structure score. Values are the same
+        (to within floating point rounding) as the individual calc_*
+        functions.
+        Return type: <dict> keyed by BATCH_DESCRIPTORS name
+
+        seq        Protein sequence
+    """
+    if isinstance(seq, EncodedSequence):
+        composition = seq.composition
+    elif np is not None:
+        # one pass over the sequence's bytes
+        composition = np.bincount(_CODE_LUT[np.frombuffer(seq, dtype=np.uint8)], minlength=len(AA)).tolist()
+    else:
+        # str.count is a C loop, so 20 of them are still faster than
+        # counting in Python
+        composition = [seq.count(a) for a in AA]
+
+    (columns, terms) = _profileTerms()
+    sums = [sum(map(operator.mul, composition, column)) for column in columns]
+
+    length = float(len(seq))
+    profile = {}
+    for (name, k, divisor) in terms:
+        total = sums[k]
+        if divisor is None:
+            profile[name] = total
+        else:
+            profile[name] = total/(length*divisor)
+
+    return profile
+
+
+# 256 entry byte -> residue code table (255 = invalid), upper and lower case
+if np is not None:
+    _CODE_LUT = np.empty(256, dtype=np.uint8)
+    _CODE_LUT.fill(255)
+    for _k, _a in enumerate(AA):
+        _CODE_LUT[ord(_a)] = _k
+        _CODE_LUT[ord(_a.lower())] = _k
+
+
+def _requireNumpy():
+    if np is None:
+        raise sequenceToolsException("Batch functions require numpy, which could not be imported")
+
+
+# ---------------------------------------
+# 
+def _encodeBatch(seqs):
+    """ Concatenate a list of sequences into a single array of residue codes
+        (index into AA). Returns (codes, lengths), both numpy arrays.
+
+        Raises a sequenceToolsException on a non-cannonical amino acid or an
+        empty sequence
+    """
+    _requireNumpy()
+    return _lookupBatch(seqs, _CODE_LUT, lambda codes: codes == 255)
+
+
+def _lookupBatch(seqs, table, invalid):
+    """ Concatenate a list of sequences and map their raw bytes through a
+        256 entry numpy table. Returns (values, lengths), raising a
+        sequenceToolsException on an empty sequence or if invalid(values)
+        flags a value (a non-cannonical amino acid)
+    """
+    try:
+        joined = "".join(seqs)
+        if not isinstance(joined, bytes):
+            joined = joined.encode("ascii")
+    except (TypeError, UnicodeError):
+        raise sequenceToolsException("Invalid sequence input: Must be a list of strings")
+
+    lengths = np.array([len(s) for s in seqs], dtype=np.int64)
+    if len(lengths) > 0 and lengths.min() == 0:
+        raise sequenceToolsException("Invalid sequence input: Sequence " + str(int(np.argmin(lengths))) + " is empty")
+
+    values = table[np.frombuffer(joined, dtype=np.uint8)]
+
+    bad = np.flatnonzero(invalid(values))
+    if len(bad) > 0:
+        seqIdx = int(np.searchsorted(np.cumsum(lengths), bad[0], side="right"))
+        badChars = sorted(set(seqs[seqIdx].upper()) - set(AA))
+        raise sequenceToolsException("Invalid sequence input: Sequence " + str(seqIdx) + " contains non-cannonical amino acid: " + str(badChars))
+
+    return (values, lengths)
+
+
+# ---------------------------------------
+# 
+def _batchChunks(lengths):
+    """ Split a batch into chunks of whole sequences holding roughly 
+        BATCH_CHUNK_RESIDUES residues. Yields (first, last, start, stop)
+        where sequences first to last-1 occupy codes[start:stop]
+    """
+    ends = np.cumsum(lengths)
+    first = 0
+    while first < len(lengths):
+        start = ends[first] - lengths[first]
+        last = max(first+1, int(np.searchsorted(ends, start + BATCH_CHUNK_RESIDUES, side="right")))
+        yield (first, last, start, ends[last-1])
+        first = last
+
+
+# ---------------------------------------
+# 
+def calc_batchComposition(seqs):
+    """ Calculate the amino acid composition of every sequence in a list
+        Return type: <numpy array> of shape (len(seqs), 20) with integer
+                     counts, columns ordered as in AA
+
+        seqs       List of protein sequences
+    """
+    codes, lengths = _encodeBatch(seqs)
+    composition = np.zeros((len(lengths), len(AA)), dtype=np.int64)
+
+    # go through the buffer a chunk of whole sequences at a time, building
+    # segment ids for the chunk and doing one bincount segment reduction
+    for (first, last, start, stop) in _batchChunks(lengths):
+        segments = np.repeat(np.arange(last-first, dtype=np.int64), lengths[first:last])
+        counts = np.bincount(segments*len(AA) + codes[start:stop], minlength=(last-first)*len(AA))
+        composition[first:last] = counts.reshape(last-first, len(AA))
+
+    return composition
+
+
+# ---------------------------------------
+# 
+def calc_batchDescriptors(seqs, descriptors=None):
+    """ Calculate a set of descriptors for every sequence in a list in
+        one go. Gives the same values (to within floating point rounding)
+        as calling the equivalent calc_* function on each sequence.
+        Return type: <numpy array> of shape (len(seqs), len(descriptors))
+
+        seqs          List of protein sequences
+
+        descriptors   Names of the descriptors to calculate, which
+                      also defines the column order. Any of
+                      BATCH_DESCRIPTORS or ORDER_DESCRIPTORS (default
+                      = all of BATCH_DESCRIPTORS)
+    """
+    _requireNumpy()
+
+    if descriptors is None:
+        descriptors = BATCH_DESCRIPTORS
+
+    for name in descriptors:
+        if name not in _DESCRIPTOR_DEFS and name not in _ORDER_DESCRIPTOR_FUNCTIONS:
+            raise sequenceToolsException("Unknown batch descriptor '" + str(name) + "'. Options are " + str(BATCH_DESCRIPTORS + ORDER_DESCRIPTORS))
+
+    values = np.empty((len(seqs), len(descriptors)))
+
+    composed = [(col, name) for (col, name) in enumerate(descriptors) if name in _DESCRIPTOR_DEFS]
+    if len(composed) > 0:
+        composition = calc_batchComposition(seqs)
+        lengths = composition.sum(axis=1).astype(np.float64)
+
+        defs = [_descriptorDef(name) for (_, name) in composed]
+        table = np.array([[perAA[a] for (perAA, _, _) in defs] for a in AA], dtype=np.float64)
+        sums = composition.dot(table)
+
+        for (k, (col, name)) in enumerate(composed):
+            (_, perResidue, scale) = defs[k]
+            if perResidue:
+                values[:, col] = sums[:, k] / (lengths*scale)
+            else:
+                values[:, col] = sums[:, k]
+
+    for (col, name) in enumerate(descriptors):
+        if name in _ORDER_DESCRIPTOR_FUNCTIONS:
+            values[:, col] = _ORDER_DESCRIPTOR_FUNCTIONS[name](seqs)
+
+    return values
+
+
+# ---------------------------------------
+# 
+def calc_batchSCD(seqs):
+    """ Calculate the sequence charge decoration (see calc_SCD) of every
+        sequence in a list
+        Return type: <numpy array> of length len(seqs)
+
+        Sequences are grouped by FFT size (the power of two at least twice
+        their length, so the circular autocorrelation doesn't wrap) and
+        each group is transformed as one zero padded 2D array.
+
+        seqs       List of protein sequences
+    """
+    codes, lengths = _encodeBatch(seqs)
+    charges = np.array([_CHARGE[a] for a in AA], dtype=np.float64)[codes]
+    starts = np.cumsum(lengths) - lengths
+    values = np.empty(len(lengths))
+
+    sizes = 2**np.ceil(np.log2(2*lengths)).astype(np.int64)
+    for size in np.unique(sizes):
+        members = np.flatnonzero(sizes == size)
+        weights = np.sqrt(np.arange(size//2))
+
+        step = max(1, BATCH_CHUNK_RESIDUES // size)
+        for lo in xrange(0, len(members), step):
+            idx = members[lo:lo+step]
+            L = lengths[idx]
+
+            # scatter the chunk's sequences into zero padded rows
+            rows = np.repeat(np.arange(len(idx)), L)
+            cols = np.arange(L.sum()) - np.repeat(np.cumsum(L) - L, L)
+            padded = np.zeros((len(idx), size))
+            padded[rows, cols] = charges[np.repeat(starts[idx], L) + cols]
+
+            # autocorrelation at separations 0..size/2-1 (charges are
+            # integers, so rounding removes the FFT error)
+            spectrum = np.fft.rfft(padded, axis=1)
+            autocorr = np.round(np.fft.irfft(spectrum*spectrum.conj(), n=size, axis=1)[:, :size//2])
+
+            values[idx] = autocorr.dot(weights) / L
+
+    return values
+
+
+# ---------------------------------------
+# 
+def calc_batchSHD(seqs):
+    """ Calculate the sequence hydropathy decoration (see calc_SHD) of
+        every sequence in a list, using one prefix sum over the whole
+        batch
+        Return type: <numpy array> of length len(seqs)
+
+        seqs       List of protein sequences
+    """
+    codes, lengths = _encodeBatch(seqs)
+    hydropathy = np.array([_NORMALIZED_KD[a] for a in AA], dtype=np.float64)
+    values = np.empty(len(lengths))
+
+    for (first, last, start, stop) in _batchChunks(lengths):
+        L = lengths[first:last]
+        prefix = np.concatenate(([0.0], np.cumsum(hydropathy[codes[start:stop]])))
+        starts = np.cumsum(L) - L
+
+        # one term per (sequence, separation d) for d = 1..N-1
+        seg = np.repeat(np.arange(last-first), L-1)
+        d = np.arange((L-1).sum()) - np.repeat(np.cumsum(L-1) - (L-1), L-1) + 1
+        a = starts[seg]
+        N = L[seg]
+
+        terms = (prefix[a+N-d] + prefix[a+N] - prefix[a] - prefix[a+d]) / d
+        values[first:last] = np.bincount(seg, weights=terms, minlength=last-first) / L
+
+    return values
+
+
+_ORDER_DESCRIPTOR_FUNCTIONS = {"SCD" : calc_batchSCD,
+                               "SHD" : calc_batchSHD}
+
+
+
+# ---------------------------------------
+# ---------------------------------------
+# WINDOWED PROFILES
+#
+# Per-residue sliding window averages of a per-residue scale. The scale
+# values for a batch of sequences are looked up in one go and turned
+# into a cumulative sum, so every window average is the difference of
+# two cumulative sums (O(n) regardless of window size).
+#
+
+# named scales for the windowed profiles
+WINDOW_SCALES = {"hydropathy" : KD_HYDROPHOBICITY,
+                 "NCPR"       : _CHARGE,
+                 "helix"      : HELIX_PROPENSITY,
+                 "sheet"      : SHEET_PROPENSITY}
+
+# "valid" - only windows which fit entirely inside the sequence, so there
+#           are len(seq)-window+1 values (value i is the window starting
+#           at residue i)
+# "same"  - one value per residue for the window centred on it, with the
+#           window truncated (and averaged over fewer residues) at the ends
+# "pad"   - one value per residue for the window centred on it, NaN where
+#           the window doesn't fit inside the sequence
+WINDOW_EDGES = ("valid", "same", "pad")
+
+WINDOW_SIZE = 9
+
+# character codes of AA, to pick the 20 residue values out of a compiled
+# scale table
+if np is not None:
+    _AA_BYTES = np.array([ord(a) for a in AA])
+
+
+def _windowScaleTable(scale):
+    """ Per-residue values (ordered as in AA) for a window scale, which
+        can be the name of one of WINDOW_SCALES, the name of a scale
+        registered in aaGroups, a dictionary of values for each amino
+        acid, or a group of residues (in which case the profile is the
+        fraction of the window in the group). Strings are always scale
+        names, so a misspelt name raises a sequenceToolsException
+    """
+    if isinstance(scale, basestring) and scale in WINDOW_SCALES:
+        scale = WINDOW_SCALES[scale]
+
+    if isinstance(scale, (dict, basestring)):
+        try:
+            table = get_scale_table(scale)
+        except aaGroupsException, e:
+            raise sequenceToolsException("Window scale: " + str(e) + ". Window scales are " + str(sorted(WINDOW_SCALES.keys())))
+        return np.frombuffer(table, dtype=np.float64)[_AA_BYTES]
+
+    return np.array([1.0 if a in scale else 0.0 for a in AA], dtype=np.float64)
+
+
+def _windowMeans(cumsum, lengths, window, edge):
+    """ Window averages for a chunk of concatenated sequences, given the
+        cumulative sum (with a leading 0) of their per-residue values.
+        Returns (profile, splits) where splits are the indices at which
+        to split profile into one array per sequence
+    """
+    starts = np.cumsum(lengths) - lengths
+    segStart = np.repeat(starts, lengths)
+    segLength = np.repeat(lengths, lengths)
+    i = np.arange(len(segStart)) - segStart
+
+    if edge == "valid":
+        p = np.flatnonzero(i <= segLength - window)
+        profile = (cumsum[p+window] - cumsum[p]) / float(window)
+        counts = np.maximum(lengths - window + 1, 0)
+
+    else:
+        lo = i - (window-1)//2
+        hi = i + window//2 + 1
+        clippedLo = np.maximum(lo, 0)
+        clippedHi = np.minimum(hi, segLength)
+
+        profile = (cumsum[segStart+clippedHi] - cumsum[segStart+clippedLo]) / (clippedHi - clippedLo).astype(np.float64)
+        if edge == "pad":
+            profile[(lo < 0) | (hi > segLength)] = np.nan
+        counts = lengths
+
+    return (profile, np.cumsum(counts)[:-1])
+
+
+# ---------------------------------------
+# 
+def calc_windowProfiles(seqs, scales=None, windows=(WINDOW_SIZE,), edge="same"):
+    """ Calculate sliding window profiles of one or more scales, for one or
+        more window sizes, over a sequence or a list of sequences. 
+        Return type: <dict> keyed by (scale, window). For a single sequence
+                     each value is a numpy array, for a list of sequences
+                     it's a list with one numpy array per sequence
+
+        seqs       Protein sequence, or list of protein sequences
+
+        scales     Either a list of names from WINDOW_SCALES, names of 
+                   scales registered in aaGroups (e.g. "HELIX_ENTROPY") 
+                   and/or groups of residues (e.g. AROMATIC), used as the
+                   result keys, or
+                   a dictionary of key -> scale where each scale can also
+                   be a dictionary of per-residue values (default = all
+                   WINDOW_SCALES)
+
+        windows    List of window sizes
+
+        edge       How windows at the ends of the sequence are handled, 
+                   one of WINDOW_EDGES (default "same")
+    """
+    _requireNumpy()
+
+    if edge not in WINDOW_EDGES:
+        raise sequenceToolsException("Invalid window edge handling '" + str(edge) + "'. Options are " + str(WINDOW_EDGES))
+
+    for window in windows:
+        if int(window) != window or window < 1:
+            raise sequenceToolsException("Invalid window size " + str(window))
+
+    if scales is None:
+        scales = WINDOW_SCALES.keys()
+    if not isinstance(scales, dict):
+        scales = dict([(key, key) for key in scales])
+
+    single = isinstance(seqs, basestring)
+    if single:
+        seqs = [seqs]
+
+    tables = [(key, _windowScaleTable(scale)) for (key, scale) in scales.items()]
+    codes, lengths = _encodeBatch(seqs)
+
+    profiles = dict([((key, window), []) for (key, _) in tables for window in windows])
+
+    # cumulative sums are per chunk, which keeps memory bounded and
+    # rounding errors small
+    for (first, last, start, stop) in _batchChunks(lengths):
+        chunkCodes = codes[start:stop]
+        for (key, table) in tables:
+            cumsum = np.concatenate(([0.0], np.cumsum(table[chunkCodes])))
+            for window in windows:
+                (profile, splits) = _windowMeans(cumsum, lengths[first:last], int(window), edge)
+                profiles[(key, window)].extend(np.split(profile, splits))
+
+    if single:
+        return dict([(k, v[0]) for (k, v) in profiles.items()])
+
+    return profiles
+
+
+# ---------------------------------------
+# 
+def calc_windowProfile(seqs, scale="hydropathy", window=WINDOW_SIZE, edge="same"):
+    """ Calculate the sliding window profile of a single scale over a 
+        sequence or a list of sequences (see calc_windowProfiles)
+        Return type: <numpy array> for a single sequence, or a list of 
+                     numpy arrays for a list of sequences
+
+        seqs       Protein sequence, or list of protein sequences
+
+        scale      Name of one of WINDOW_SCALES or of a registered
+                   scale, a dictionary of per-residue values or a group
+                   of residues (a tuple or list, e.g. AROMATIC)
+
+        window     Window size
+
+        edge       One of WINDOW_EDGES (default "same")
+    """
+    return calc_windowProfiles(seqs, {"scale" : scale}, [window], edge)[("scale", window)]
+
+
+
+# ---------------------------------------
+# ---------------------------------------
+# GROUP PAIR SWEEPS
+#
+# calc_flankingScore for every (TARGET, FLANKER) pair of groups and 
+# calc_maximumResidueSeperation for every group, over a whole list of
+# sequences. A (20 x groups) membership table is built once, and each
+# group's per-residue mask is looked up from the residue codes, so the
+# sweep is a handful of array operations per group rather than a Python
+# loop per pair and sequence. Sequence boundaries are handled with start
+# and end masks rather than catching IndexError.
+#
+
+def _groupTables(groups):
+    """ Resolve a list of groups (names from GROUP_NAMES or groups of 
+        residues) into a (20 x len(groups)) boolean membership table
+    """
+    resolved = []
+    for GROUP in groups:
+        if isinstance(GROUP, basestring) and GROUP in GROUP_BITS:
+            GROUP = globals()[GROUP]
+        resolved.append(GROUP)
+
+    return np.array([[a in GROUP for GROUP in resolved] for a in AA], dtype=bool)
+
+
+def _flankingMaxVal(lengths, bonusHug):
+    maxMul = 6 if bonusHug else 2
+    return np.where(lengths % 2 == 0, (lengths//2 - 1)*maxMul + 1, (lengths//2)*maxMul)
+
+
+# ---------------------------------------
+# 
+def calc_groupSweep(seqs, groups=None, bonusHug=True):
+    """ Calculate flanking scores for every pair of groups and maximum
+        residue separations (both nonDelin modes) for every group. Gives
+        the same values as calc_flankingScore and 
+        calc_maximumResidueSeperation.
+        Return type: <dict> with keys
+ 
+                     "flankingScore"             (k x k) array, where
+                                                 [t, f] is TARGET t and
+                                                 FLANKER f (NaN for single
+                                                 residue sequences)
+                     "maximumResidueSeperation"  (k) array, nonDelin=False
+                     "maximumResidueSeperationNonDelin"  
+                                                 (k) array, nonDelin=True
+
+                     with an extra leading axis of length len(seqs) for a
+                     list of sequences
+
+        seqs       Protein sequence, or list of protein sequences
+
+        groups     List of k groups, either names from GROUP_NAMES or 
+                   groups of residues (default = all of GROUP_NAMES)
+
+        bonusHug   As for calc_flankingScore
+    """
+    if groups is None:
+        groups = GROUP_NAMES
+
+    single = isinstance(seqs, basestring)
+    if single:
+        seqs = [seqs]
+
+    table = _groupTables(groups)
+    k = table.shape[1]
+    codes, lengths = _encodeBatch(seqs)
+    n = len(lengths)
+
+    flanking = np.empty((n, k, k))
+    seperation = np.empty((n, k))
+    seperationNonDelin = np.empty((n, k))
+
+    maxVal = _flankingMaxVal(lengths, bonusHug).astype(np.float64)
+    maxVal[lengths < 2] = np.nan
+
+    for (first, last, start, stop) in _batchChunks(lengths):
+        chunkCodes = codes[start:stop]
+        L = lengths[first:last]
+        m = last - first
+        seg = np.repeat(np.arange(m), L)
+
+        # residue pairs (i-1, i) and (i, i+1) which are in the same sequence
+        hasLeft = np.ones(len(chunkCodes), dtype=bool)
+        hasLeft[np.cumsum(L) - L] = False
+        hasRight = np.ones(len(chunkCodes), dtype=bool)
+        hasRight[np.cumsum(L) - 1] = False
+
+        # per residue, sum over positions of code c of the flanking points
+        # it would get if it were a target of flanker group f, i.e. 
+        # left + right + 4*left*right (1, or 6 when flanked on both sides)
+        points = np.empty((m, len(AA), k))
+        for f in xrange(k):
+            isFlanker = table[chunkCodes, f]
+            left = np.zeros(len(chunkCodes))
+            left[1:] = isFlanker[:-1]
+            left[~hasLeft] = 0
+            right = np.zeros(len(chunkCodes))
+            right[:-1] = isFlanker[1:]
+            right[~hasRight] = 0
+
+            weights = left + right + 4*left*right
+            points[:, :, f] = np.bincount(seg*len(AA) + chunkCodes, weights=weights, minlength=m*len(AA)).reshape(m, len(AA))
+
+        # sum over the residues in each target group
+        counts = np.einsum("ct,scf->stf", table.astype(np.float64), points)
+        flanking[first:last] = counts / maxVal[first:last, None, None]
+
+        for g in xrange(k):
+            (seperation[first:last, g], seperationNonDelin[first:last, g]) = _groupSeperations(table[chunkCodes, g], seg, m)
+
+    if single:
+        return {"flankingScore"                    : flanking[0],
+                "maximumResidueSeperation"         : seperation[0],
+                "maximumResidueSeperationNonDelin" : seperationNonDelin[0]}
+
+    return {"flankingScore"                    : flanking,
+            "maximumResidueSeperation"         : seperation,
+            "maximumResidueSeperationNonDelin" : seperationNonDelin}
+
+
+def _groupSeperations(mask, seg, m):
+    """ calc_maximumResidueSeperation with nonDelin False and True for one
+        group mask over m concatenated sequences (seg gives the sequence
+        of each residue). -1 for sequences with fewer than two members
+    """
+    positions = np.flatnonzero(mask)
+    members = np.bincount(seg[positions], minlength=m)
+
+    delin = np.empty(m)
+    delin.fill(-1)
+    nonDelin = np.empty(m)
+    nonDelin.fill(-1)
+
+    several = members > 1
+    if not several.any():
+        return (delin, nonDelin)
+
+    firstMember = np.cumsum(members) - members
+    lastMember = np.cumsum(members) - 1
 
-    if not polar and matchCheck(seq, motif[::-1]):
-        return True
+    # first to last member
+    nonDelin[several] = positions[lastMember[several]] - positions[firstMember[several]] - 1
 
-    return False
+    # largest gap between consecutive members, where gaps between two
+    # sequences are zeroed so they never win. The gaps of one sequence are
+    # contiguous, so a reduceat from each sequence's first gap covers its
+    # own gaps plus only zeroed ones
+    gaps = np.diff(positions)
+    gaps[seg[positions[1:]] != seg[positions[:-1]]] = 0
+    delin[several] = np.maximum.reduceat(gaps, firstMember[several]) - 1
 
+    return (delin, nonDelin)
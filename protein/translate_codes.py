@@ -5,10 +5,101 @@
 # Febuary 2013
 # v 0.1
 #
-# Simple script which takes a FASTA style sequence and converts it into a CAMPARI-ready sequence file. Note this DOES NOT 
-# switch out His for CAMPARI readable histadine 3 amino acid codes (Hie and Hid)
-# 
+# Simple script which takes a FASTA style sequence and converts it into a CAMPARI-ready sequence file. By default this
+# DOES NOT switch out His for CAMPARI readable histadine 3 amino acid codes (Hie and Hid), use --his to choose one
+#
+# One to three letter conversion (and back) goes through precomputed
+# tables, so whole sequences and batches of sequences are converted
+# without a per-character function call. Three to one conversion
+# understands the CAMPARI histidine variants (HIE, HID, HIP) and skips
+# terminal caps (ACE, NME, NH2, FOR) and END.
+#
+# Whole proteomes are converted as a stream: records are read one at a
+# time, each is converted through a 256 entry lookup table (character ->
+# "Xxx\n" line) into the complete contents of its .in file, and the
+# contents are handed to a small thread pool which does the file I/O,
+# so reading and converting overlaps with writing. Output can go to one
+# file per record in a directory (optionally sharded into subdirectories
+# so no one directory holds millions of files) or into a single tar
+# archive. Unknown residues are counted and reported once at the end.
+#
+
+import collections
+import hashlib
+import os
+import tarfile
+import time
+from cStringIO import StringIO
+from multiprocessing.pool import ThreadPool
+
+from aaGroups import AA1_TO_3, AA3_TO_1
+from extract_accessions import read_fasta
+
+
+CAMPARI_START = "ACE\n"
+CAMPARI_END = "NME\nEND\n"
+
+# default number of I/O threads
+WRITER_THREADS = 4
+
+# CAMPARI histidine tautomers / protonation states
+HIS_VARIANTS = ("HIE", "HID", "HIP")
+
+# CAMPARI terminal caps
+CAMPARI_CAPS = ("ACE", "NME", "NH2", "FOR")
+
+# upper case three letter code -> one letter code, including the CAMPARI
+# variants, with caps and END mapping to "" (dropped)
+THREE_TO_ONE = dict(AA3_TO_1)
+THREE_TO_ONE.update([(variant, "H") for variant in HIS_VARIANTS])
+THREE_TO_ONE.update([(cap, "") for cap in CAMPARI_CAPS + ("END",)])
+
+
+def _oneToThreeTable(his=None, upper=False, suffix=""):
+    """ 256 entry list of character -> three letter code (+ suffix), None
+        for characters which aren't amino acids
+    """
+    table = [None]*256
+    for (one, three) in AA1_TO_3.items():
+        if upper:
+            three = three.upper()
+        if one == "H" and his is not None:
+            three = his
+        table[ord(one)] = three + suffix
+        table[ord(one.lower())] = three + suffix
+    return table
+
+
+# (his, upper) -> table, built on first use
+_ONE_TO_THREE = {}
 
+def _table(his, upper):
+    if his is not None and his.upper() not in HIS_VARIANTS + ("HIS",):
+        raise translate_codesException("Unknown histidine variant '" + str(his) + "'. Options are " + str(HIS_VARIANTS))
+    if his is not None:
+        his = his.upper()
+
+    key = (his, upper)
+    if key not in _ONE_TO_THREE:
+        _ONE_TO_THREE[key] = _oneToThreeTable(his, upper)
+    return _ONE_TO_THREE[key]
+
+
+# character -> CAMPARI line (empty for anything which isn't an amino acid)
+_CAMPARI_LINES = [three or "" for three in _oneToThreeTable(suffix="\n")]
+
+# characters dropped without being reported
+_IGNORED = " \t\r\n"
+_KNOWN = "".join(AA1_TO_3.keys()) + "".join(AA1_TO_3.keys()).lower() + _IGNORED
+
+
+# ---------------------------------------
+#
+class translate_codesException(Exception):
+    """
+       Exception class for translate_codes methods
+    """
+    pass
 
 
 # ---------------------------------------
@@ -28,58 +119,325 @@ def convert_AA_1_to_3(one_AACode):
 
     """
     try:
-        return (AA1_TO_3[str(i).upper()])
+        return (AA1_TO_3[str(one_AACode).upper()])
     except KeyError:
         return None
 
 def convert_AA_sequence_1_to_3(sequence):
-    returnSequence = []
+    """
+        Convert a one letter amino acid sequence to a list of three
+        letter codes, skipping anything that isn't an amino acid.
+
+    """
+    return convert_sequence_1_to_3(sequence)
+
+
+def convert_AA_3_to_1(three_AACode):
+    """
+        Convert a three letter amino acid code (any case, including
+        the CAMPARI histidine variants) to a one letter code.
+
+        Returns a one letter code as a string on success, or None on
+        failure (including caps, which have no one letter code).
+
+        three_AAcode       Three letter amino acid code.
+
+    """
+    one = THREE_TO_ONE.get(str(three_AACode).strip().upper())
+    if one:
+        return one
+    return None
+
+
+def convert_sequence_1_to_3(sequence, his=None, upper=False, caps=False, unknown=None):
+    """
+        Convert a one letter amino acid sequence to a list of three
+        letter codes with a precomputed table.
+
+        sequence           Amino acid sequence (string)
+        his                Code to use for histidine, one of HIS_VARIANTS
+                           (default = His)
+        upper              If True codes are upper case (ALA rather
+                           than Ala)
+        caps               If True add ACE and NME caps
+        unknown            Optional dictionary which counts every
+                           character that isn't an amino acid (these
+                           are skipped)
+
+    """
+    sequence = str(sequence)
+    codes = map(_table(his, upper).__getitem__, bytearray(sequence))
+
+    if None in codes:
+        if unknown is not None:
+            for character in sequence.translate(None, _KNOWN):
+                unknown[character] = unknown.get(character, 0) + 1
+        codes = [code for code in codes if code is not None]
+
+    if caps:
+        return ["ACE"] + codes + ["NME"]
+    return codes
+
+
+def convert_sequence_3_to_1(codes, unknown=None):
+    """
+        Convert three letter codes to a one letter amino acid sequence.
+        Caps (ACE, NME, NH2, FOR) and END are dropped, and CAMPARI
+        histidine variants become H.
+
+        codes              List of three letter codes, or a string of
+                           them seperated by whitespace (e.g. the
+                           contents of a CAMPARI .in file)
+        unknown            Optional dictionary which counts every code
+                           that couldn't be converted (these are
+                           skipped). If not given an unknown code raises
+                           a translate_codesException
+
+    """
+    if isinstance(codes, basestring):
+        codes = codes.split()
+
+    letters = map(THREE_TO_ONE.get, [code.upper() for code in codes])
+
+    if None in letters:
+        bad = [code for (code, letter) in zip(codes, letters) if letter is None]
+        if unknown is None:
+            raise translate_codesException("Unknown three letter code(s): " + str(sorted(set(bad))))
+        for code in bad:
+            unknown[code] = unknown.get(code, 0) + 1
+        letters = [letter for letter in letters if letter is not None]
+
+    return "".join(letters)
+
+
+def convert_batch_1_to_3(sequences, his=None, upper=False, caps=False, unknown=None):
+    """
+        convert_sequence_1_to_3 for a list of sequences, returning a list
+        of lists of three letter codes
+
+    """
+    return [convert_sequence_1_to_3(sequence, his, upper, caps, unknown) for sequence in sequences]
+
+
+def convert_batch_3_to_1(batch, unknown=None):
+    """
+        convert_sequence_3_to_1 for a list of code lists (or strings),
+        returning a list of one letter sequences
+
+    """
+    return [convert_sequence_3_to_1(codes, unknown) for codes in batch]
 
-    for i in sequence:
-        converted = convert_AA_1_to_3(i)
-        if converted:
-            returnSequence.append(converted)
 
-    return returnSequence
+# ---------------------------------------
+# Streaming conversion
+def campari_sequence(sequence, unknown=None, his=None):
+    """
+        Convert a one letter amino acid sequence into the contents
+        of a CAMPARI .in sequence file (ACE cap, one three letter
+        code per line, NME cap and END), built in a single string.
+
+        Characters which aren't amino acids are skipped. If unknown
+        (a dictionary, e.g. collections.Counter) is given the number
+        of times each one was seen is added to it.
+
+        sequence           Amino acid sequence (string)
+        unknown            Optional dictionary of character -> count
+        his                Code to use for histidine, one of
+                           HIS_VARIANTS (default = His)
+
+    """
+    sequence = str(sequence)
+
+    if unknown is not None:
+        for character in sequence.translate(None, _KNOWN):
+            unknown[character] = unknown.get(character, 0) + 1
+
+    lines = _CAMPARI_LINES
+    if his is not None:
+        lines = list(_CAMPARI_LINES)
+        lines[ord("H")] = lines[ord("h")] = _table(his, False)[ord("H")] + "\n"
+
+    return CAMPARI_START + "".join(map(lines.__getitem__, bytearray(sequence))) + CAMPARI_END
+
+
+def record_filename(record_id):
+    """
+        Name of the .in file for a record (its id, with any path
+        separators replaced)
+
+    """
+    return record_id.replace(os.sep, "_") + ".in"
+
+
+class DirectoryWriter(object):
+    """
+        Writes each file into a directory. With shard_depth > 0 files are
+        spread over nested subdirectories named after the leading hex
+        digits of a hash of the filename (two per level), e.g.
+        out/3f/P04637.in for shard_depth=1.
+
+        directory          Output directory (created if needed)
+        shard_depth        Number of levels of subdirectories
+        threads            Number of I/O threads
+
+    """
+
+    def __init__(self, directory=".", shard_depth=0, threads=WRITER_THREADS):
+        self.directory = directory
+        self.shard_depth = shard_depth
+        self.threads = threads
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+
+    def path(self, filename):
+        digest = hashlib.md5(filename).hexdigest()
+        shards = [digest[2*k:2*k+2] for k in xrange(self.shard_depth)]
+        return os.path.join(self.directory, *(shards + [filename]))
 
 
-from ensemble.biotools.protein.aaGroups import AA1_TO_3
+    def write(self, filename, contents):
+        path = self.path(filename)
+        parent = os.path.dirname(path)
+        if self.shard_depth > 0 and not os.path.isdir(parent):
+            try:
+                os.makedirs(parent)
+            except OSError:
+                # made by another thread in the meantime
+                if not os.path.isdir(parent):
+                    raise
+
+        with open(path, "w") as f:
+            f.write(contents)
+
+
+    def close(self):
+        pass
+
+
+class TarWriter(object):
+    """
+        Writes every file into a single tar archive (gzip compressed if
+        the name ends in .gz or .tgz). Writes are serialized, so this
+        always uses one I/O thread.
+
+        filename           Archive to create
+
+    """
+
+    def __init__(self, filename):
+        mode = "w:gz" if filename.endswith((".gz", ".tgz")) else "w"
+        self.archive = tarfile.open(filename, mode)
+        self.threads = 1
+        self.mtime = time.time()
+
+
+    def write(self, filename, contents):
+        info = tarfile.TarInfo(filename)
+        info.size = len(contents)
+        info.mtime = self.mtime
+        self.archive.addfile(info, StringIO(contents))
+
+
+    def close(self):
+        self.archive.close()
+
+
+def write_campari(filenames, writer, his=None):
+    """
+        Convert every record of a set of FASTA files into a CAMPARI .in
+        file, streaming the input and writing through writer (a
+        DirectoryWriter or TarWriter) on a pool of I/O threads.
+
+        Returns (number of records written, dictionary of unknown
+        character -> count). Records are named after their id (see
+        record_filename), and a record whose file name has already been
+        used gets _2, _3 ... appended to its id, so duplicate ids never
+        overwrite each other.
+
+        filenames          List of FASTA files (or file objects)
+        writer             DirectoryWriter or TarWriter
+        his                Code to use for histidine, one of
+                           HIS_VARIANTS (default = His)
+
+    """
+    threads = writer.threads
+    unknown = collections.Counter()
+    written = 0
+    used = set()
+
+    pool = ThreadPool(threads)
+    try:
+        # bounded so a fast reader can't queue the whole proteome in memory
+        pending = collections.deque()
+        for filename in filenames:
+            for (header, sequence) in read_fasta(filename):
+                record_id = header.split()[0] if header.strip() else "record_" + str(written)
+                contents = campari_sequence(sequence, unknown, his)
+
+                # writes are concurrent, so two records must never share
+                # a file
+                name = record_filename(record_id)
+                copy = 1
+                while name in used:
+                    copy += 1
+                    name = record_filename(record_id + "_" + str(copy))
+                used.add(name)
+
+                pending.append(pool.apply_async(writer.write, (name, contents)))
+                written += 1
+
+                if len(pending) >= 8*threads:
+                    pending.popleft().get()
+
+        while pending:
+            pending.popleft().get()
+
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        writer.close()
+
+    return (written, unknown)
+
 
 if __name__ == "__main__":
-    from Bio import SeqIO
-    import string
-    import argparse	
-    import sys	
+    import argparse
+    import sys
 
     parser = argparse.ArgumentParser(description='Convert a FASTA sequence to a CAMPARI ready .in sequence file. [Contact alex@holehouse.org]')
     parser.add_argument('filename', metavar='filename',  nargs='+',
                         help='.fasta file')
 
+    parser.add_argument('--out', dest='out', default=".",
+                        help='output directory (default = current directory)')
+
+    parser.add_argument('--archive', dest='archive', default=None,
+                        help='write every .in file into this tar archive (.tar, .tar.gz or .tgz) instead of a directory')
+
+    parser.add_argument('--shard', dest='shard', type=int, default=0,
+                        help='number of levels of subdirectories to spread output files over (default = 0)')
+
+    parser.add_argument('--his', dest='his', default=None, choices=HIS_VARIANTS,
+                        help='CAMPARI code to use for histidine (default = His)')
+
+    parser.add_argument('--threads', dest='threads', type=int, default=WRITER_THREADS,
+                        help='number of I/O threads (default = ' + str(WRITER_THREADS) + ')')
+
     args = parser.parse_args()
-    inputString = args.filename[0]
-    sequence = {}
-    
-    ## READ IN FILE
-    handle = open(inputString, "rU")
-    for record in SeqIO.parse(handle, "fasta"):
-        sequence[record.id] = record.seq
-    handle.close()
-    
-    # CONVERT EACH AA from file and 
-    for entry in sequence:
-        f = open(str(entry)+".in", 'w')
-        f.write("ACE\n")
-        for i in sequence[entry]:
-            
-            converted = convert_AA_1_to_3(i)
-            if converted:
-                f.write(converted)
-                f.write("\n")
-
-            # to avoid silently missing certain residues (e.g. X)
-            elif not i == "\n":
-                print "WARNING: Tried to convert character '" + str(i) + "' but failed. Skipping..."
-
-
-        f.write("NME\nEND\n")
-        f.close()
+
+    if args.archive:
+        writer = TarWriter(args.archive)
+    else:
+        writer = DirectoryWriter(args.out, args.shard, args.threads)
+
+    (written, unknown) = write_campari(args.filename, writer, args.his)
+
+    # to avoid silently missing certain residues (e.g. X)
+    if unknown:
+        summary = ", ".join(["'" + character + "' x " + str(count) for (character, count) in sorted(unknown.items())])
+        sys.stderr.write("WARNING: Skipped " + str(sum(unknown.values())) + " characters which couldn't be converted: " + summary + "\n")
+
+    sys.stderr.write("Wrote " + str(written) + " sequence files\n")
@@ -10,4 +10,17 @@ sys.path.insert(0,os.path.abspath(__file__+"/../../"))
 sys.path.insert(0,os.path.abspath(__file__+"/../../protein/"))
 
 import klean_test
+import extract_accessions_test
+import fasta_index_test
+import proteome_analysis_test
+import dedup_test
 import sequenceTools_test
+import prosite_test
+import pssm_test
+import patterning_test
+import scramble_test
+import mutagenesis_test
+import design_test
+import cache_test
+import translate_codes_test
+import translate_nuc_test
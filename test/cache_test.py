@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+import cache
+import sequenceTools
+from aaGroups import *
+
+class TestCacheFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_LRUCache(self):
+        lru = cache.LRUCache(2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        self.assertEqual(1, lru.get("a"))
+        lru.set("c", 3)
+
+        # b was least recently used
+        self.assertTrue("b" not in lru)
+        self.assertEqual(1, lru.get("a"))
+        self.assertEqual(3, lru.get("c"))
+        self.assertEqual(2, len(lru))
+
+
+    def test_DescriptorCache(self):
+        descriptors = cache.DescriptorCache(maxsize=10)
+
+        self.assertEqual(sequenceTools.calc_EntropySum("MKRSTQEED"), descriptors.calc("EntropySum", "MKRSTQEED"))
+        self.assertEqual(sequenceTools.calc_EntropySum("MKRSTQEED"), descriptors.calc("calc_EntropySum", "mkrstqeed", conf="helix"))
+        self.assertEqual(sequenceTools.calc_EntropySum("MKRSTQEED", "coil"), descriptors.calc("EntropySum", "MKRSTQEED", "coil"))
+        self.assertEqual({"memory_hits" : 1, "disk_hits" : 0, "misses" : 2, "hit_rate" : 1/3.0}, descriptors.stats())
+
+        flanking = descriptors.wrap("flankingScore")
+        self.assertEqual(sequenceTools.calc_flankingScore("KEKGGE", NEG, POS, bonusHug=False), flanking("KEKGGE", NEG, POS, bonusHug=False))
+        self.assertNotEqual(flanking("KEKGGE", NEG, POS), flanking("KEKGGE", NEG, POS, bonusHug=False))
+        self.assertEqual(flanking("KEKGGE", NEG, POS), flanking("KEKGGE", NEG, POS, False, True))
+
+        self.assertRaises(cache.cacheException, descriptors.calc, "NotADescriptor", "MKR")
+        self.assertRaises(sequenceTools.sequenceToolsException, descriptors.calc, "NetCharge", "MKRZ")
+
+
+    def test_DiskStore(self):
+        directory = os.path.join(self.tmpdir, "store")
+
+        first = cache.DescriptorCache(maxsize=10, directory=directory)
+        value = first.calc("NetCharge", "MKRSTQEED")
+
+        # a second process with the same store gets a disk hit
+        second = cache.DescriptorCache(maxsize=10, directory=directory)
+        self.assertEqual(value, second.calc("NetCharge", "MKRSTQEED"))
+        self.assertEqual(1, second.stats()["disk_hits"])
+        self.assertEqual(value, second.calc("NetCharge", "MKRSTQEED"))
+        self.assertEqual(1, second.stats()["memory_hits"])
+
+        # eviction keeps the store under max_bytes, removing the oldest
+        store = cache.DiskStore(os.path.join(self.tmpdir, "small"), max_bytes=2000)
+        for k in xrange(50):
+            store.set("%040x" % k, "X"*100)
+            os.utime(store._path("%040x" % k), (k, k))
+        store.evict()
+
+        self.assertTrue(store.size() <= 2000)
+        self.assertEqual((True, "X"*100), store.get("%040x" % 49))
+        self.assertEqual((False, None), store.get("%040x" % 0))
@@ -0,0 +1,55 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import dedup
+
+class TestDedupFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.fasta")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_dedup(self):
+        rng = random.Random(11)
+        AA = "ACDEFGHIKLMNPQRSTVWY"
+        base = ["".join([rng.choice(AA) for i in range(rng.randint(100, 300))]) for j in range(40)]
+
+        # B<i> exact copies (ignoring case), N<i> about 97% identical
+        with open(self.filename, "w") as f:
+            for (i, seq) in enumerate(base):
+                f.write(">A" + str(i) + " original\n" + seq + "\n")
+                if i % 4 == 0:
+                    f.write(">B" + str(i) + "\n" + seq.lower() + "\n")
+                if i % 5 == 0:
+                    mutant = list(seq)
+                    for j in rng.sample(range(len(seq)), len(seq)//30):
+                        mutant[j] = AA[(AA.index(mutant[j]) + 1) % 20]
+                    f.write(">N" + str(i) + "\n" + "".join(mutant) + "\n")
+
+        exact = list(dedup.iter_clusters([self.filename], buckets=3))
+        self.assertEqual(48, len(exact))
+        self.assertEqual(58, sum([len(members) for (_, _, members) in exact]))
+        self.assertTrue(("A0", base[0], ["A0", "B0"]) in exact)
+        self.assertTrue(("N5", ) in [c[:1] for c in exact])
+
+        near = list(dedup.iter_clusters([self.filename], identity=0.9, buckets=3))
+        self.assertEqual(40, len(near))
+        self.assertTrue(("A0", base[0], ["A0", "B0", "N0"]) in near)
+        self.assertTrue(("A5", base[5], ["A5", "N5"]) in near)
+        for (accession, sequence, members) in near:
+            self.assertEqual(set([accession[1:]]), set([m[1:] for m in members]))
+
+        # unrelated sequences share few signature entries, identical ones all
+        signatures = dedup.calc_signatures(base[:2] + [base[0].lower(), "AC", ""])
+        self.assertTrue((signatures[0] == signatures[1]).mean() < 0.2)
+        self.assertTrue((signatures[0] == signatures[2]).all())
+        self.assertEqual((5, dedup.NUM_HASHES), signatures.shape)
+
+        self.assertRaises(dedup.dedupException, list, dedup.iter_clusters([self.filename], identity=1.5))
@@ -0,0 +1,51 @@
+import random
+import unittest
+import numpy as np
+import design
+import patterning
+import sequenceTools
+from aaGroups import *
+
+class TestDesignFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        pass
+
+
+    def test_design(self):
+        seq = "GSGSGSEKEKEKGSGSGSEKEKEKGSGSGSEKEKEK"
+        objectives = [("NCPR", 0.1, 10.0), ("kappa", 0.4, 1.0), ("SCD", -2.0, 0.1)]
+        result = design.design_sequence(seq, objectives, steps=5000, seed=1, fixed=[0, 1], composition={"P" : (0, 0), NEG : (2, 12)})
+
+        designed = result["sequence"]
+        self.assertEqual(len(seq), len(designed))
+        self.assertEqual("GS", designed[:2])
+        self.assertTrue("P" not in designed)
+        self.assertTrue(2 <= sequenceTools.calc_GroupContent(designed, NEG) <= 12)
+
+        # incrementally tracked values match a full recalculation
+        self.assertAlmostEqual(sequenceTools.calc_NCPR(designed), result["values"][0])
+        self.assertAlmostEqual(patterning.calc_kappa(designed), result["values"][1])
+        self.assertAlmostEqual(sequenceTools.calc_SCD(designed), result["values"][2])
+        self.assertTrue(result["energy"] < 0.1)
+
+        results = design.design_chains(seq, objectives[:1], chains=2, processes=1, seed=3, steps=500)
+        self.assertEqual(2, len(results))
+        self.assertTrue(results[0]["energy"] <= results[1]["energy"])
+
+        self.assertRaises(design.designException, design.design_sequence, seq, [("nope", 0, 1)])
+        self.assertRaises(design.designException, design.design_sequence, seq, objectives, composition={"G" : (0, 1)})
+
+
+    def test_design_kappa(self):
+        # the design objective normalises kappa the same way as calc_kappa
+        rng = random.Random(5)
+        seqs = ["".join([rng.choice("ACDEFGHIKLMNPQRSTVWY") for i in range(rng.randint(20, 120))]) for j in range(15)]
+        seqs += ["".join([rng.choice("EKPGGGG") for i in range(rng.randint(6, 40))]) for j in range(15)]
+        seqs += ["RAGGGDK", "GGQAGGGGGQGAGKAGAGQTGGGGGQG", "EGGGGGE", "EGGPPGE"]
+
+        for seq in seqs:
+            (encoded, _) = sequenceTools._encodeBatch([seq])
+            objective = design._KappaObjective(bytearray(encoded.astype(np.uint8).tobytes()))
+            self.assertAlmostEqual(patterning.calc_kappa(seq), objective.value)
@@ -0,0 +1,88 @@
+import os
+import shutil
+import tempfile
+import unittest
+import extract_accessions
+
+FASTA = """>sp|P04637|P53_HUMAN Cellular tumor antigen p53 OS=Homo sapiens OX=9606 GN=TP53 PE=1 SV=4
+MEEPQSDPSVEPPLSQETFSDLWKLLPENNVLSPLPSQAMDDLMLSPDDIEQWFTEDPGP
+DEAPRMPEAAPPVAPAPAAPTPAAPAPAPSWPLSSSVPSQKTYQGSYGFRLGFLHSGTAK
+>tr|Q9XYZ1|Q9XYZ1_DROME Uncharacterized protein OS=Drosophila melanogaster OX=7227 PE=4 SV=1
+MKKLLPTAAAGLLLLAAQPAMA
+>custom_record no database prefix
+ACDEFGHIK
+>sp|P69905|HBA_HUMAN Hemoglobin subunit alpha OS=Homo sapiens OX=9606 GN=HBA1 PE=1 SV=2
+MVLSPADKTNVKAAWGKVGAHAGEYGAEALERMFLSFPTTKTYFPHFDLSHGSAQVKGHGKKVADALTNAVAHV
+"""
+
+class TestExtractAccessionsFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.fasta")
+        with open(self.filename, "w") as f:
+            f.write(FASTA)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_read_fasta(self):
+        records = list(extract_accessions.read_fasta(self.filename))
+
+        self.assertEqual(4, len(records))
+        self.assertEqual("custom_record no database prefix", records[2][0])
+        self.assertEqual("ACDEFGHIK", records[2][1])
+        self.assertEqual(120, len(records[0][1]))
+
+        with open(self.filename) as f:
+            self.assertEqual(records, list(extract_accessions.read_fasta(f)))
+
+
+    def test_get_from_file(self):
+        self.assertEqual(["P04637", "Q9XYZ1", "P69905"], extract_accessions.get_acc_from_file(self.filename))
+        self.assertEqual("P53_HUMAN Cellular tumor antigen p53", extract_accessions.get_name_from_file(self.filename)[0])
+        self.assertEqual("P69905 HBA_HUMAN Hemoglobin subunit alpha", extract_accessions.get_acc_and_name_from_file(self.filename)[2])
+
+        records = list(extract_accessions.iter_records(self.filename))
+        self.assertEqual("tr", records[1]["db"])
+        self.assertEqual("MKKLLPTAAAGLLLLAAQPAMA", records[1]["sequence"])
+
+
+    def test_header_scan(self):
+        self.assertEqual(list(extract_accessions.iter_headers(self.filename)), list(extract_accessions.scan_headers(self.filename)))
+
+        self.assertEqual(4, extract_accessions.count_records(self.filename))
+        self.assertEqual(3, extract_accessions.count_records(self.filename, prefixes=("sp|", "tr|")))
+
+        # counts across chunk boundaries
+        old = extract_accessions.SCAN_CHUNK_BYTES
+        try:
+            for size in [1, 2, 3, 7]:
+                extract_accessions.SCAN_CHUNK_BYTES = size
+                self.assertEqual(4, extract_accessions.count_records(self.filename))
+                self.assertEqual(4, extract_accessions.count_records(self.filename, prefixes=("sp|", "tr|", "c")))
+        finally:
+            extract_accessions.SCAN_CHUNK_BYTES = old
+
+        record = extract_accessions.parse_uniprot_header(">sp|P04637|P53_HUMAN Cellular tumor antigen p53 OS=Homo sapiens OX=9606 GN=TP53 PE=1 SV=4")
+        self.assertEqual("P53_HUMAN", record["entry_name"])
+        self.assertEqual("Cellular tumor antigen p53", record["description"])
+        self.assertEqual("Homo sapiens", record["OS"])
+        self.assertEqual("TP53", record["GN"])
+        self.assertEqual("4", record["SV"])
+        self.assertEqual(None, extract_accessions.parse_uniprot_header("custom_record"))
+
+        columns = extract_accessions.get_header_columns(self.filename)
+        self.assertEqual(["P04637", "Q9XYZ1", "P69905"], columns["accession"])
+        self.assertEqual(["TP53", None, "HBA1"], columns["GN"])
+
+
+    def test_unique(self):
+        with open(self.filename, "a") as f:
+            f.write(FASTA)
+
+        self.assertEqual(6, len(extract_accessions.get_acc_from_file(self.filename)))
+        self.assertEqual(["P04637", "Q9XYZ1", "P69905"], extract_accessions.get_acc_from_file(self.filename, unique=True))
+        self.assertEqual(3, len(extract_accessions.get_acc_and_name_from_file(self.filename, True)))
@@ -0,0 +1,79 @@
+import os
+import shutil
+import tempfile
+import unittest
+import extract_accessions
+import fasta_index
+from extract_accessions_test import FASTA
+
+class TestFastaIndexFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.fasta")
+        with open(self.filename, "w") as f:
+            f.write(FASTA)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_fasta_index(self):
+        self.assertEqual(4, fasta_index.build_index(self.filename))
+        with fasta_index.load_index(self.filename + fasta_index.INDEX_EXTENSION) as index:
+            self.assertEqual(4, len(index))
+            self.assertEqual(120, index["P04637"][2])
+            self.assertEqual(["P04637", "P69905", "Q9XYZ1", "custom_record"], [acc for (acc, _) in index.items()])
+            self.assertEqual(None, index.get("P0463"))
+            self.assertFalse("P046371" in index)
+            self.assertRaises(KeyError, index.__getitem__, "NOPE")
+
+        # runs spilled and merged while building, first duplicate kept
+        with open(self.filename, "a") as f:
+            f.write(FASTA)
+        old = fasta_index.INDEX_RUN_RECORDS
+        try:
+            fasta_index.INDEX_RUN_RECORDS = 3
+            self.assertEqual(4, fasta_index.build_index(self.filename))
+        finally:
+            fasta_index.INDEX_RUN_RECORDS = old
+        with fasta_index.load_index(self.filename + fasta_index.INDEX_EXTENSION) as index:
+            self.assertEqual(0, index["P04637"][0])
+            self.assertEqual(["P04637", "P69905", "Q9XYZ1", "custom_record"], [acc for (acc, _) in index.items()])
+
+        # an index in another format is rebuilt when opened
+        with open(self.filename + fasta_index.INDEX_EXTENSION, "w") as f:
+            f.write("P04637\t0\t1\t2\t3\n")
+        self.assertRaises(fasta_index.fastaIndexException, fasta_index.load_index, self.filename + fasta_index.INDEX_EXTENSION)
+        with fasta_index.FastaIndex(self.filename) as fasta:
+            self.assertEqual(4, len(fasta))
+
+        with open(self.filename, "w") as f:
+            f.write(FASTA)
+        os.remove(self.filename + fasta_index.INDEX_EXTENSION)
+
+        records = dict(extract_accessions.read_fasta(self.filename))
+
+        with fasta_index.FastaIndex(self.filename) as fasta:
+            self.assertEqual(4, len(fasta))
+            self.assertTrue("custom_record" in fasta)
+
+            header = "sp|P69905|HBA_HUMAN Hemoglobin subunit alpha OS=Homo sapiens OX=9606 GN=HBA1 PE=1 SV=2"
+            self.assertEqual((header, records[header]), fasta.fetch("P69905"))
+            self.assertEqual("ACDEFGHIK", fasta["custom_record"])
+
+            fetched = list(fasta.fetch_many(["P69905", "P04637", "NOPE"], ignore_missing=True))
+            self.assertEqual(["P04637", "P69905"], [x[0] for x in fetched])
+            self.assertEqual(records[fetched[0][1]], fetched[0][2])
+
+            self.assertRaises(fasta_index.fastaIndexException, fasta.fetch, "NOPE")
+            self.assertRaises(fasta_index.fastaIndexException, list, fasta.fetch_many(["NOPE"]))
+
+        # an empty FASTA file gives an empty index
+        empty = os.path.join(self.tmpdir, "empty.fasta")
+        open(empty, "w").close()
+        with fasta_index.FastaIndex(empty) as fasta:
+            self.assertEqual(0, len(fasta))
+            self.assertFalse("P69905" in fasta)
+            self.assertRaises(fasta_index.fastaIndexException, fasta.fetch, "P69905")
@@ -1,3 +1,7 @@
+import StringIO
+import os
+import shutil
+import tempfile
 import unittest
 import klean
 
@@ -5,8 +9,36 @@ class TestKleanFunctions(unittest.TestCase):
 
     # Build manager object for all tests here
     def setUp(self):
-        pass
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
 
     def do_test(self):
         print "No tests to run"
-                
+
+
+    def test_klean_string(self):
+        self.assertEqual("MEEPQSDPSV", klean.klean_string(" 1 MEEPQ SDPSV\n\t61 "))
+        self.assertEqual("acgtuACGT", klean.klean_string("acgtu xz\nACGTN", klean.NUCLEOTIDES))
+        self.assertEqual("", klean.klean_string("1234 \n"))
+
+
+    def test_klean_stream(self):
+        text = ">header\n" + "   1 acgtnnacgt   11 ACGU\n"*1000
+
+        # chunk boundaries fall all over the lines
+        out = StringIO.StringIO()
+        written = klean.klean_stream(StringIO.StringIO(text), out, klean.NUCLEOTIDES, chunk_bytes=7)
+        self.assertEqual(klean.klean_string(text, klean.NUCLEOTIDES), out.getvalue())
+        self.assertEqual(len(out.getvalue()), written)
+
+        filenames = []
+        for i in range(2):
+            filenames.append(os.path.join(self.tmpdir, str(i) + ".txt"))
+            with open(filenames[-1], "w") as f:
+                f.write(text)
+
+        out = StringIO.StringIO()
+        self.assertEqual(2*written, klean.klean_files(filenames, out, klean.NUCLEOTIDES))
+        self.assertEqual(klean.klean_string(text+text, klean.NUCLEOTIDES), out.getvalue())
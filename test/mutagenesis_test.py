@@ -0,0 +1,33 @@
+import unittest
+import mutagenesis
+import sequenceTools
+from aaGroups import *
+
+class TestMutagenesisFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        pass
+
+
+    def test_calc_mutationalScan(self):
+        seq = "MKRSTQEEDYWWPLLAGHKRCDEW"
+        scan = mutagenesis.calc_mutationalScan(seq, window=5)
+
+        for i in xrange(0, len(seq), 5):
+            for (a, residue) in enumerate(AA):
+                mutant = seq[:i] + residue + seq[i+1:]
+                profile = sequenceTools.calc_profile(mutant)
+                for name in sequenceTools.BATCH_DESCRIPTORS:
+                    self.assertAlmostEqual(profile[name], scan[name][i, a])
+
+                self.assertAlmostEqual(sequenceTools.calc_SCD(mutant), scan["SCD"][i, a])
+                self.assertAlmostEqual(sequenceTools.calc_SHD(mutant), scan["SHD"][i, a])
+                self.assertEqual(sequenceTools.calc_GroupContent(mutant, AROMATIC), scan[("GroupContent", "AROMATIC")][i, a])
+
+                windows = sequenceTools.calc_windowProfile(mutant, "hydropathy", 5, "valid")
+                self.assertAlmostEqual(windows.max(), scan[("windowMax", "hydropathy")][i, a])
+                self.assertAlmostEqual(windows.min(), scan[("windowMin", "hydropathy")][i, a])
+
+        self.assertEqual((len(seq), len(AA)), scan["NCPR"].shape)
+        self.assertRaises(mutagenesis.mutagenesisException, mutagenesis.calc_mutationalScan, seq, ["nope"])
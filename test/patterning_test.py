@@ -0,0 +1,92 @@
+import numpy as np
+import unittest
+import patterning
+import sequenceTools
+from aaGroups import *
+
+class TestPatterningFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        pass
+
+
+    def naive_delta(self, seq, G1, G2, blob):
+        def sigma(s):
+            f1 = len([x for x in s if x in G1])/float(len(s))
+            f2 = len([x for x in s if x in G2])/float(len(s))
+            if f1 + f2 == 0:
+                return 0.0
+            return (f1-f2)**2/(f1+f2)
+
+        total = sigma(seq)
+        blobs = [sigma(seq[i:i+blob]) for i in xrange(len(seq)-blob+1)]
+        return sum([(b-total)**2 for b in blobs])/len(blobs)
+
+
+    def test_calc_patterningDelta(self):
+        seqs = ["EEEKKKGSGSEKEKRRDD", "MKRSTQEEDYWWPLLAGHKRCDEW", "GGGGGGGG", "KKKKGGGG"]
+
+        deltas = patterning.calc_patterningDelta(seqs, NEG, POS, 5)
+        for (seq, delta) in zip(seqs, deltas):
+            self.assertAlmostEqual(self.naive_delta(seq, NEG, POS, 5), delta)
+            self.assertAlmostEqual(self.naive_delta(seq, NEG, POS, 6), patterning.calc_patterningDelta(seq, NEG, POS, 6))
+
+        self.assertTrue(patterning.calc_patterningDelta("EK", blob=5) != patterning.calc_patterningDelta("EK", blob=5))
+
+
+    def test_segregatedDeltas(self):
+        import numpy as np
+        for (n1, n2, length, before, middle) in [(3, 4, 20, 2, 5), (1, 1, 39, 10, 15), (5, 0, 12, 0, 3), (2, 2, 6, 1, 0)]:
+            seq = "G"*before + "E"*n1 + "G"*middle + "K"*n2 + "G"*(length-before-n1-middle-n2)
+            for blob in (5, 6):
+                value = patterning._segregatedDeltas(np.array([n1]), np.array([n2]), np.array([length]), blob, np.array([before]), np.array([middle]))[0]
+                self.assertAlmostEqual(self.naive_delta(seq, NEG, POS, blob), value)
+
+
+    def test_calc_kappa(self):
+        self.assertAlmostEqual(1.0, patterning.calc_kappa("EEEEEEEEEEKKKKKKKKKK"))
+        self.assertTrue(patterning.calc_kappa("EKEKEKEKEKEKEKEKEKEK") < 0.01)
+        self.assertEqual(-1, patterning.calc_kappa("GGGGGGGGGG"))
+        self.assertEqual(-1, patterning.calc_kappa("EKE"))
+
+        seqs = ["EEEKKKGSGSEKEKRRDD", "EKEKEKEKEKEKEKEKEKEK", "GGGGGGGGGG", "MKRSTQEEDYWWPLLAGHKRCDEW"]
+        batch = patterning.calc_kappa(seqs)
+        for (seq, kappa) in zip(seqs, batch):
+            self.assertAlmostEqual(patterning.calc_kappa(seq), kappa)
+            self.assertTrue(kappa == -1 or 0 <= kappa <= 1)
+
+        # few charges in a long sequence
+        for seq in ["GGGGGGGGGGGGGGGEGGGGGGGGGGGGGGGGGGGGGKG", "GGGGGEGGGGGGGGGGKGGGG", "KGGGGGGGGGGGGGGGGGE"]:
+            self.assertTrue(0 <= patterning.calc_kappa(seq) <= 1.0 + 1e-9)
+
+        # segregating the same composition increases kappa
+        self.assertTrue(patterning.calc_kappa("EEEEEGGGGGKKKKK") > patterning.calc_kappa("EGKEGKEGKEGKEGK"))
+
+
+    def test_kappa_Omega_bounds(self):
+        import random
+        rng = random.Random(5)
+        seqs = ["".join([rng.choice("ACDEFGHIKLMNPQRSTVWY") for i in range(rng.randint(20, 120))]) for j in range(500)]
+        seqs += ["".join([rng.choice("EKPGGGG") for i in range(rng.randint(6, 40))]) for j in range(500)]
+        seqs += ["RAGGGDK", "GGQAGGGGGQGAGKAGAGQTGGGGGQG", "EGGGGGE"]
+
+        for values in (patterning.calc_kappa(seqs), patterning.calc_Omega(seqs)):
+            for value in values:
+                self.assertTrue(value == -1 or 0 <= value <= 1.0 + 1e-9)
+
+        # G2 residues on both sides of the G1 block
+        self.assertTrue(patterning.calc_Omega("RAGGGDK") <= 1.0 + 1e-9)
+
+        blocks = [(0, np.array([2])), (2, np.array([3])), (1, np.array([4])), (2, np.array([2])), (0, np.array([1]))]
+        seq = "GGKKKEEEEKKG"
+        for blob in (5, 6):
+            self.assertAlmostEqual(self.naive_delta(seq, NEG, POS, blob), patterning._blockDeltas(blocks, np.array([len(seq)]), blob)[0])
+
+
+    def test_calc_Omega(self):
+        self.assertAlmostEqual(1.0, patterning.calc_Omega("PPPPPEEEEEGGGGGGGGGG"))
+        self.assertTrue(patterning.calc_Omega("PGPGPGPGPGPGPGPGPGPG") < patterning.calc_Omega("PPPPPPPPPPGGGGGGGGGG"))
+        self.assertEqual(-1, patterning.calc_Omega("GGGGGGGGGG"))
+        self.assertEqual(-1, patterning.calc_Omega("KKKKKKKKKK"))
+        self.assertAlmostEqual(patterning.calc_Omega("MKRSTQEEDYWWPLLAGHKRCDEW"), patterning.calc_Omega(["AAAAAAA", "MKRSTQEEDYWWPLLAGHKRCDEW"])[1])
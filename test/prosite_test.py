@@ -0,0 +1,55 @@
+import re
+import unittest
+import prosite
+
+class TestPrositeFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        pass
+
+
+    def test_prosite_to_regex(self):
+        self.assertEqual("^M(?:.){2,4}[ST][^P](?:[RK]){2}", prosite.prosite_to_regex("<M-x(2,4)-[ST]-{P}-[RK](2)."))
+        self.assertEqual("C(?:[G]|\\Z)", prosite.prosite_to_regex("C-[G>]"))
+        self.assertEqual("CG\\Z", prosite.prosite_to_regex("C-G>"))
+
+        for bad in ["", "<>", "M-x(4,2)", "M-?", "x(0,2)", "M--K"]:
+            self.assertRaises(prosite.prositeException, prosite.prosite_to_regex, bad)
+
+
+    def test_PatternSet(self):
+        patterns = {"nglyc" : "N-{P}-[ST]-{P}",
+                    "start" : "<M-x(2,4)-K",
+                    "cterm" : "K-[KR>]",
+                    "gap"   : "C-x(2,3)-C"}
+        seq = "MAAKNGSANLTPCAACKACCCK"
+        patternSet = prosite.PatternSet(patterns)
+        hits = patternSet.scan(seq)
+
+        # compare against running each pattern on its own at every start
+        expected = []
+        for pid in sorted(patterns):
+            regex = re.compile(prosite.prosite_to_regex(patterns[pid]))
+            for start in xrange(len(seq)):
+                match = regex.match(seq, start)
+                if match is not None and (start == 0 or not regex.pattern.startswith("^")):
+                    expected.append((pid, start, match.end()))
+        self.assertEqual(expected, hits)
+
+        self.assertTrue(("nglyc", 4, 8) in hits)
+        self.assertTrue(("cterm", 21, 22) in hits)
+        self.assertTrue(("start", 0, 4) in hits)
+        self.assertFalse(("nglyc", 8, 12) in hits)
+
+        # packing patterns into several expressions doesn't change the hits
+        old = prosite.PATTERNS_PER_REGEX
+        try:
+            prosite.PATTERNS_PER_REGEX = 1
+            self.assertEqual(hits, prosite.PatternSet(patterns).scan(seq.lower()))
+        finally:
+            prosite.PATTERNS_PER_REGEX = old
+
+        records = list(patternSet.scan_records([("a", seq), ("b", "PPPP"), ("c", "NASA")]))
+        self.assertEqual(len(hits) + 1, len(records))
+        self.assertEqual(("c", "nglyc", 0, 4), records[-1])
@@ -0,0 +1,39 @@
+import os
+import shutil
+import tempfile
+import unittest
+import proteome_analysis
+import sequenceTools
+from extract_accessions_test import FASTA
+
+class TestProteomeAnalysisFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.fasta")
+        with open(self.filename, "w") as f:
+            f.write(FASTA)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_proteome_analysis(self):
+        with open(self.filename, "a") as f:
+            f.write(">sp|P00000|BAD_HUMAN Non-cannonical OS=Homo sapiens\nACDXU\n")
+
+        chunks = list(proteome_analysis.iter_chunks([self.filename, self.filename], chunk_residues=100))
+        self.assertEqual(10, sum([len(chunk) for chunk in chunks]))
+        self.assertTrue(len(chunks) > 1)
+
+        for processes in [1, 2]:
+            results = list(proteome_analysis.analyse_proteome([self.filename], ["NCPR", "HydrophobicitySum"], processes=processes, chunk_residues=50))
+            rows = sum([r[0] for r in results], [])
+            skipped = sum([r[1] for r in results], [])
+
+            self.assertEqual(["P04637", "Q9XYZ1", "custom_record", "P69905"], [r[0] for r in rows])
+            self.assertEqual(["P00000"], skipped)
+            self.assertEqual(9, rows[2][1])
+            self.assertAlmostEqual(sequenceTools.calc_NCPR("ACDEFGHIK"), rows[2][2][0])
+            self.assertAlmostEqual(sequenceTools.calc_HydrophobicitySum("ACDEFGHIK"), rows[2][2][1])
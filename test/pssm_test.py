@@ -0,0 +1,42 @@
+import unittest
+import pssm
+from aaGroups import AA
+
+class TestPssmFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        pass
+
+
+    def test_pssm(self):
+        sites = ["RRASV", "RKASI", "RRGSL", "KRAST"]
+        matrix = pssm.PSSM.from_sites(sites, threshold=5.0)
+        self.assertEqual(5, len(matrix))
+
+        seqs = ["MARRASVLLKRKASIGG", "RRAS", "XRRASVX", "PPPPPPPPPP", "rrgsl"]
+
+        def naive(seq):
+            return [sum([matrix.matrix[j][AA.index(seq[i+j].upper())] for j in xrange(5)]) if all([c.upper() in AA for c in seq[i:i+5]]) else float("-inf") for i in xrange(len(seq)-4)]
+
+        for seq in seqs:
+            scores = matrix.score(seq)
+            self.assertEqual(max(len(seq)-4, 0), len(scores))
+            for (a, b) in zip(naive(seq), scores):
+                self.assertAlmostEqual(a, b)
+
+        self.assertEqual([2, 10], [h[0] for h in matrix.find(seqs[0])])
+
+        # batch scanning against several PSSMs of different widths
+        other = pssm.PSSM([{"P" : 1.0}]*3, threshold=3.0)
+        hits = pssm.scan_batch(seqs, [matrix, other])
+        expected = []
+        for (s, seq) in enumerate(seqs):
+            for (p, m) in enumerate([matrix, other]):
+                expected.extend([(s, p, start, score) for (start, score) in m.find(seq)])
+        self.assertEqual(sorted(expected), hits)
+        self.assertEqual(8, len([h for h in hits if h[1] == 1]))
+        self.assertEqual(hits, pssm.scan_batch(seqs, [matrix, other], chunk_residues=3))
+
+        self.assertRaises(pssm.pssmException, pssm.PSSM, [[1.0, 2.0]])
+        self.assertRaises(pssm.pssmException, pssm.PSSM.from_sites, ["AAA", "AA"])
@@ -11,3 +11,42 @@ unittest.TextTestRunner(verbosity=2).run(suite)
 suite = unittest.TestLoader().loadTestsFromTestCase(test.sequenceTools_test.TestSequenceToolsFunctions)
 unittest.TextTestRunner(verbosity=2).run(suite)
 
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.extract_accessions_test.TestExtractAccessionsFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.fasta_index_test.TestFastaIndexFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.proteome_analysis_test.TestProteomeAnalysisFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.dedup_test.TestDedupFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.prosite_test.TestPrositeFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.pssm_test.TestPssmFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.patterning_test.TestPatterningFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.scramble_test.TestScrambleFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.mutagenesis_test.TestMutagenesisFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.design_test.TestDesignFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.cache_test.TestCacheFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.translate_codes_test.TestTranslateCodesFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
+
+suite = unittest.TestLoader().loadTestsFromTestCase(test.translate_nuc_test.TestTranslateNucFunctions)
+unittest.TextTestRunner(verbosity=2).run(suite)
@@ -0,0 +1,39 @@
+import unittest
+import patterning
+import scramble
+import sequenceTools
+from aaGroups import *
+
+class TestScrambleFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        pass
+
+
+    def test_scramble(self):
+        seq = "MKRSTQEEDYWWPLLAGHKRCDEWKKGSE"
+        metrics = [("flankingScore", (NEG, POS)), ("flankingScore", (NEG, POS, False)), ("Patterning", (NEG, POS)), ("kappa", (NEG, POS))]
+
+        (observed, null) = scramble.calc_scrambledScores(seq, metrics, n=50, rng=1, chunk_rows=7)
+        self.assertEqual((50, 4), null.shape)
+        self.assertAlmostEqual(sequenceTools.calc_flankingScore(seq, NEG, POS), observed[0])
+        self.assertAlmostEqual(sequenceTools.calc_flankingScore(seq, NEG, POS, bonusHug=False), observed[1])
+        self.assertEqual(sequenceTools.calc_Patterning(seq, NEG, POS), observed[2])
+        self.assertAlmostEqual(patterning.calc_kappa(seq), observed[3])
+
+        # every row scores the same as the scrambled string it stands for
+        perms = scramble.permutations(len(seq), 20, rng=3)
+        for perm in perms:
+            self.assertEqual(sorted(perm), range(len(seq)))
+            shuffled = "".join([seq[i] for i in perm])
+            (values, _) = scramble.calc_scrambledScores(shuffled, metrics, n=1)
+            self.assertAlmostEqual(sequenceTools.calc_flankingScore(shuffled, NEG, POS), values[0])
+            self.assertEqual(sequenceTools.calc_Patterning(shuffled, NEG, POS), values[2])
+
+        results = scramble.calc_scrambleSignificance("EEEEEEKKKKKKGGGGGGGG", [("kappa", (NEG, POS))], n=200, rng=2, tail="greater")
+        self.assertTrue(results[0]["z"] > 2)
+        self.assertTrue(results[0]["p"] < 0.05)
+
+        self.assertRaises(scramble.scrambleException, scramble.calc_scrambledScores, seq, [("nope", ())])
+        self.assertRaises(scramble.scrambleException, scramble.calc_scrambledScores, seq, [("Patterning", (NEG, NEG))])
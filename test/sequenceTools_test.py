@@ -1,4 +1,5 @@
 import unittest
+import motif
 import sequenceTools
 from aaGroups import *
 
@@ -29,3 +30,350 @@ class TestSequenceToolsFunctions(unittest.TestCase):
 
     
                 
+
+
+    def test_calc_batchDescriptors(self):
+
+        seqs = ["AFGHIKLLKPLKET", "edEDEDPEDEDDE", "W", "MKRSTQEEDYWWPLLAGHKR"*20]
+
+        table = sequenceTools.calc_batchDescriptors(seqs)
+        self.assertEqual((len(seqs), len(sequenceTools.BATCH_DESCRIPTORS)), table.shape)
+
+        for row, seq in enumerate(seqs):
+            expected = {"NetCharge"           : sequenceTools.calc_NetCharge(seq),
+                        "TotalCharge"         : sequenceTools.calc_TotalCharge(seq),
+                        "NCPR"                : sequenceTools.calc_NCPR(seq),
+                        "TCPR"                : sequenceTools.calc_TCPR(seq),
+                        "ACPR"                : sequenceTools.calc_ACPR(seq),
+                        "HCPR"                : sequenceTools.calc_HCPR(seq),
+                        "PCPR"                : sequenceTools.calc_PCPR(seq),
+                        "BHCPR"               : sequenceTools.calc_BHCPR(seq),
+                        "HelixEntropySum"     : sequenceTools.calc_EntropySum(seq, "helix"),
+                        "CoilEntropySum"      : sequenceTools.calc_EntropySum(seq, "coil"),
+                        "HydrophobicitySum"   : sequenceTools.calc_HydrophobicitySum(seq),
+                        "HydrophobicityScore" : sequenceTools.calc_HydrophobicityScore(seq),
+                        "AntiStructureScore"  : sequenceTools.calc_AntiStructureScore(seq)}
+
+            for col, name in enumerate(sequenceTools.BATCH_DESCRIPTORS):
+                self.assertAlmostEqual(expected[name], table[row, col])
+
+        # column selection/order follows descriptors
+        sub = sequenceTools.calc_batchDescriptors(seqs, ["TCPR", "NetCharge"])
+        self.assertEqual((len(seqs), 2), sub.shape)
+        self.assertAlmostEqual(sequenceTools.calc_NetCharge(seqs[1]), sub[1, 1])
+
+        # chunking does not change the answer
+        composition = sequenceTools.calc_batchComposition(seqs)
+        old = sequenceTools.BATCH_CHUNK_RESIDUES
+        try:
+            sequenceTools.BATCH_CHUNK_RESIDUES = 7
+            self.assertTrue((composition == sequenceTools.calc_batchComposition(seqs)).all())
+            chunked = sequenceTools.calc_batchDescriptors(seqs)
+        finally:
+            sequenceTools.BATCH_CHUNK_RESIDUES = old
+        self.assertTrue(abs(chunked - table).max() < 1e-9)
+
+        # without numpy the batch functions raise a sequenceToolsException
+        np = sequenceTools.np
+        try:
+            sequenceTools.np = None
+            self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_batchDescriptors, seqs)
+        finally:
+            sequenceTools.np = np
+
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_batchDescriptors, ["ACDX"])
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_batchDescriptors, ["ACD", ""])
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_batchDescriptors, ["ACD"], ["Nope"])
+
+
+    def test_EncodedSequence(self):
+
+        seq = "mkrstqeEDYWWPLLAGHKRC"
+        enc = sequenceTools.EncodedSequence(seq)
+
+        self.assertEqual(seq.upper(), enc)
+        self.assertEqual(len(seq), len(enc.codes))
+        self.assertEqual("M", AA[enc.codes[0]])
+        self.assertEqual(sum(enc.composition), len(seq))
+
+        # group bitmasks
+        self.assertTrue(enc.masks[2] & sequenceTools.GROUP_BITS["POS"])
+        self.assertFalse(enc.masks[2] & sequenceTools.GROUP_BITS["NEG"])
+        self.assertTrue(enc.masks[10] & sequenceTools.calc_groupBit(AROMATIC))
+        self.assertEqual(sequenceTools.GROUP_BITS["NEG"], sequenceTools.calc_groupBit(NEG))
+        self.assertEqual(0, sequenceTools.calc_groupBit(("V","I","L")))
+        self.assertEqual(sequenceTools.GROUP_BITS["NEG"], sequenceTools.calc_groupBit(list(NEG)))
+        self.assertEqual(sequenceTools.GROUP_BITS["NEG"], sequenceTools.calc_groupBit(set(NEG)))
+        self.assertEqual(0, sequenceTools.calc_groupBit("NOT_A_GROUP"))
+
+        # every function gives the same answer on an EncodedSequence
+        for fn in [sequenceTools.calc_NetCharge, sequenceTools.calc_TotalCharge, sequenceTools.calc_NCPR,
+                   sequenceTools.calc_TCPR, sequenceTools.calc_ACPR, sequenceTools.calc_HCPR,
+                   sequenceTools.calc_PCPR, sequenceTools.calc_BHCPR, sequenceTools.calc_HydrophobicitySum,
+                   sequenceTools.calc_HydrophobicityScore, sequenceTools.calc_AntiStructureScore]:
+            self.assertAlmostEqual(fn(seq), fn(enc))
+
+        self.assertAlmostEqual(sequenceTools.calc_EntropySum(seq, conf="coil"), sequenceTools.calc_EntropySum(enc, conf="coil"))
+        self.assertEqual(sequenceTools.calc_GroupContent(seq, "AG"), sequenceTools.calc_GroupContent(enc, "AG"))
+        self.assertEqual(sequenceTools.calc_Patterning(seq, NEG, POS), sequenceTools.calc_Patterning(enc, NEG, POS))
+        self.assertAlmostEqual(sequenceTools.calc_flankingScore(seq, NEG, POS, bonusHug=False), sequenceTools.calc_flankingScore(enc, NEG, POS, bonusHug=False))
+
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.EncodedSequence, "ACDXB")
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.EncodedSequence, 12)
+        self.assertEqual("calc_NCPR", sequenceTools.calc_NCPR.__name__)
+
+
+    def test_calc_profile(self):
+
+        seqs = ["AFGHIKLLKPLKET", "edEDEDPEDEDDE", "W", "MKRSTQEEDYWWPLLAGHKR"*20]
+        table = sequenceTools.calc_batchDescriptors(seqs)
+
+        for row, seq in enumerate(seqs):
+            profile = sequenceTools.calc_profile(seq)
+            encodedProfile = sequenceTools.calc_profile(sequenceTools.EncodedSequence(seq))
+
+            self.assertEqual(sorted(sequenceTools.BATCH_DESCRIPTORS), sorted(profile.keys()))
+            for col, name in enumerate(sequenceTools.BATCH_DESCRIPTORS):
+                self.assertAlmostEqual(table[row, col], profile[name])
+                self.assertAlmostEqual(profile[name], encodedProfile[name])
+
+            self.assertEqual(sequenceTools.calc_NetCharge(seq), profile["NetCharge"])
+            self.assertAlmostEqual(sequenceTools.calc_EntropySum(seq, "coil"), profile["CoilEntropySum"])
+
+        # same counts without numpy
+        np = sequenceTools.np
+        try:
+            sequenceTools.np = None
+            self.assertEqual(sequenceTools.calc_profile(seqs[3]), profile)
+        finally:
+            sequenceTools.np = np
+
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_profile, "ACDZ")
+
+
+    def test_calc_windowProfiles(self):
+
+        seq = "MKRSTQEEDYWWPLLAGHKRCDEW"
+        w = 5
+
+        valid = sequenceTools.calc_windowProfile(seq, "hydropathy", w, edge="valid")
+        self.assertEqual(len(seq)-w+1, len(valid))
+        for i in xrange(len(valid)):
+            self.assertAlmostEqual(sequenceTools.calc_HydrophobicitySum(seq[i:i+w])/float(w), valid[i])
+
+        profiles = sequenceTools.calc_windowProfiles(seq, ["NCPR", AROMATIC], [w, 4], edge="same")
+        self.assertEqual(4, len(profiles))
+        ncpr = profiles[("NCPR", w)]
+        self.assertEqual(len(seq), len(ncpr))
+        self.assertAlmostEqual(sequenceTools.calc_NCPR(seq[0:3]), ncpr[0])
+        self.assertAlmostEqual(sequenceTools.calc_NCPR(seq[8:13]), ncpr[10])
+        self.assertAlmostEqual(sequenceTools.calc_NCPR(seq[-3:]), ncpr[-1])
+        self.assertAlmostEqual(sequenceTools.calc_ACPR(seq[8:12]), profiles[(AROMATIC, 4)][9])
+
+        padded = sequenceTools.calc_windowProfile(seq, dict.fromkeys(AA, 1.0), w, edge="pad")
+        self.assertTrue(all([x != x for x in padded[:2]]) and all([x != x for x in padded[-2:]]))
+        self.assertAlmostEqual(1.0, padded[2])
+
+        # batches give the same profiles as single sequences, including
+        # sequences shorter than the window
+        seqs = [seq, "ACD", seq[::-1]]
+        batch = sequenceTools.calc_windowProfiles(seqs, {"h" : "helix"}, [w], edge="valid")[("h", w)]
+        self.assertEqual(3, len(batch))
+        self.assertEqual(0, len(batch[1]))
+        self.assertTrue(abs(batch[2] - sequenceTools.calc_windowProfile(seq[::-1], "helix", w, edge="valid")).max() < 1e-12)
+
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_windowProfile, seq, "hydropathy", 0)
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_windowProfile, seq, "hydropathy", 5, "wrap")
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_windowProfile, seq, "hydropaty", 5)
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_windowProfiles, seq, ["NCPR", "DE"], [5])
+
+
+    def test_calc_motifPositions(self):
+
+        motifDef = [AROMATIC, "*", NEG, "KR"]
+        original = list(motifDef)
+
+        seq = "QEGFAEKFVDRALAEYWWDKKEAYF"
+        hits = sequenceTools.calc_motifPositions(seq, motifDef)
+        self.assertEqual(original, motifDef)
+
+        # brute force check of every window in both orientations
+        allowed = [AA if m == "*" else m for m in motifDef]
+        expected = []
+        for i in xrange(len(seq)-len(motifDef)+1):
+            window = seq[i:i+len(motifDef)]
+            if all([window[k] in allowed[k] for k in xrange(len(allowed))]):
+                expected.append((i, "+"))
+            if all([window[::-1][k] in allowed[k] for k in xrange(len(allowed))]):
+                expected.append((i, "-"))
+        self.assertEqual(sorted(expected), hits)
+        self.assertTrue(len(hits) > 1)
+
+        self.assertEqual([h for h in hits if h[1] == "+"], sequenceTools.calc_motifPositions(seq, motifDef, polar=True))
+        self.assertEqual(True, sequenceTools.calc_isMotifPresent(seq, motifDef))
+        self.assertEqual(False, sequenceTools.calc_isMotifPresent("AAAA", motifDef))
+
+        # compiled motifs scan batches without matching across sequences
+        compiled = motif.Motif(["K", "L", "L", "K"])
+        self.assertEqual([(0, 5, "+"), (0, 5, "-"), (2, 0, "+"), (2, 0, "-")], compiled.find_in_batch(["AFGHIKLLKPLKET", "LLK", "KLLKA"]))
+        self.assertEqual([], compiled.find_in_batch(["AKL", "LK"]))
+        self.assertRaises(motif.motifException, motif.Motif, [])
+
+
+    def test_calc_SCD_SHD(self):
+        def naive_SCD(seq):
+            q = [(1 if a in POS else 0) - (1 if a in NEG else 0) for a in seq]
+            return sum([q[i]*q[j]*(j-i)**0.5 for j in xrange(len(seq)) for i in xrange(j)])/len(seq)
+
+        def naive_SHD(seq):
+            lo = min(KD_HYDROPHOBICITY.values())
+            hi = max(KD_HYDROPHOBICITY.values())
+            h = [(KD_HYDROPHOBICITY[a]-lo)/(hi-lo) for a in seq]
+            return sum([(h[i]+h[j])/float(j-i) for j in xrange(len(seq)) for i in xrange(j)])/len(seq)
+
+        seqs = ["K", "EK", "EEEEEKKKKK", "EKEKEKEKEK", "AFGHIKLLKPLKET", "edEDEDPEDEDDE", "MKRSTQEEDYWWPLLAGHKR"*9]
+
+        scd = sequenceTools.calc_batchSCD(seqs)
+        shd = sequenceTools.calc_batchSHD(seqs)
+        for (k, seq) in enumerate(seqs):
+            self.assertAlmostEqual(naive_SCD(seq.upper()), scd[k])
+            self.assertAlmostEqual(naive_SCD(seq.upper()), sequenceTools.calc_SCD(seq))
+            self.assertAlmostEqual(naive_SHD(seq.upper()), shd[k])
+            self.assertAlmostEqual(naive_SHD(seq.upper()), sequenceTools.calc_SHD(seq))
+
+        # segregated charges are strongly negative, alternating close to 0
+        self.assertTrue(sequenceTools.calc_SCD("EEEEEKKKKK") < sequenceTools.calc_SCD("EKEKEKEKEK"))
+
+        table = sequenceTools.calc_batchDescriptors(seqs, ("NetCharge", "SCD", "SHD"))
+        for (k, seq) in enumerate(seqs):
+            self.assertAlmostEqual(sequenceTools.calc_NetCharge(seq), table[k, 0])
+            self.assertAlmostEqual(scd[k], table[k, 1])
+            self.assertAlmostEqual(shd[k], table[k, 2])
+
+
+    def test_calc_groupSweep(self):
+        seqs = ["AFGHIKLLKPLKET", "EDEDEDPEDEDDE", "KE", "MKRSTQEEDYWWPLLAGHKR"*3, "WYFDKWYW", "AXXXAXAXXAXX".replace("X", "G")]
+
+        for bonusHug in (True, False):
+            sweep = sequenceTools.calc_groupSweep(seqs, bonusHug=bonusHug)
+            for (s, seq) in enumerate(seqs):
+                for (t, TARGET) in enumerate(sequenceTools.GROUP_NAMES):
+                    for (f, FLANKER) in enumerate(sequenceTools.GROUP_NAMES):
+                        self.assertAlmostEqual(sequenceTools.calc_flankingScore(seq, globals()[TARGET], globals()[FLANKER], bonusHug=bonusHug), sweep["flankingScore"][s, t, f])
+
+                    self.assertEqual(sequenceTools.calc_maximumResidueSeperation(seq, globals()[TARGET]), sweep["maximumResidueSeperation"][s, t])
+                    self.assertEqual(sequenceTools.calc_maximumResidueSeperation(seq, globals()[TARGET], True), sweep["maximumResidueSeperationNonDelin"][s, t])
+
+        single = sequenceTools.calc_groupSweep("AGGGAGAGGAGG", ["A", NEG])
+        self.assertEqual((2, 2), single["flankingScore"].shape)
+        self.assertEqual(3, single["maximumResidueSeperation"][0])
+        self.assertEqual(8, single["maximumResidueSeperationNonDelin"][0])
+        self.assertEqual(-1, single["maximumResidueSeperation"][1])
+
+
+    def test_Protein(self):
+        import proteinObject
+
+        seq = "MKRSTQEEDYWWPLLAGHKRCDEWkkgse"
+        p = proteinObject.Protein(seq)
+
+        self.assertEqual(seq.upper(), p.sequence)
+        self.assertEqual(len(seq), len(p))
+        for name in sequenceTools.BATCH_DESCRIPTORS:
+            self.assertAlmostEqual(sequenceTools.calc_profile(seq)[name], getattr(p, name))
+
+        self.assertEqual(sequenceTools.calc_NetCharge(seq), p.NetCharge)
+        self.assertAlmostEqual(sequenceTools.calc_NCPR(seq), p.NCPR)
+        self.assertAlmostEqual(sequenceTools.calc_HydrophobicityScore(seq), p.HydrophobicityScore)
+        self.assertAlmostEqual(sequenceTools.calc_EntropySum(seq, "coil"), p.EntropySum("coil"))
+        self.assertAlmostEqual(sequenceTools.calc_SCD(seq), p.SCD)
+        self.assertEqual(sequenceTools.calc_GroupContent(seq, AROMATIC), p.GroupContent(AROMATIC))
+        self.assertEqual(sequenceTools.calc_flankingScore(seq, NEG, POS), p.flankingScore(NEG, POS))
+        self.assertEqual(sequenceTools.calc_maximumResidueSeperation(seq, NEG, True), p.maximumResidueSeperation(NEG, True))
+        self.assertEqual(sequenceTools.calc_motifPositions(seq, ["K", "R"]), p.motifPositions(["K", "R"]))
+        self.assertTrue(p.isMotifPresent(motif.Motif([NEG, NEG])))
+        self.assertEqual(list(sequenceTools.calc_windowProfile(seq, window=5)), list(p.windowProfile(window=5)))
+
+        # values are kept, and cleared on request
+        self.assertTrue(p.flankingScore(NEG, POS) is p.flankingScore(NEG, POS))
+        self.assertTrue(p.windowProfile(window=5) is p.windowProfile(window=5))
+
+        # set groups (and dictionary scales) are valid memo keys too
+        group = set(["A", "G"])
+        self.assertEqual(sequenceTools.calc_GroupContent(seq, group), p.GroupContent(group))
+        self.assertEqual(p.GroupContent(group), p.GroupContent(frozenset(["G", "A"])))
+        self.assertEqual(sequenceTools.calc_flankingScore(seq, set(NEG), set(POS)), p.flankingScore(set(NEG), set(POS)))
+        self.assertTrue(p.flankingScore(set(NEG), set(POS)) is p.flankingScore(set(NEG), set(POS)))
+        self.assertEqual(sequenceTools.calc_maximumResidueSeperation(seq, set(NEG)), p.maximumResidueSeperation(set(NEG)))
+        self.assertEqual(sequenceTools.calc_Patterning(seq, set(NEG), set(POS)), p.Patterning(set(NEG), set(POS)))
+        p.clear()
+        self.assertEqual(sequenceTools.calc_NetCharge(seq), p.NetCharge)
+
+        # no per-object dictionary
+        self.assertFalse(hasattr(p, "__dict__"))
+        self.assertRaises(sequenceTools.sequenceToolsException, proteinObject.Protein, "MKRZ")
+
+
+    def test_scale_registry(self):
+        seqs = ["AFGHIKLLKPLKET", "edEDEDPEDEDDE", "W"]
+
+        self.assertTrue("SHEET_PROPENSITY_KCAL" in SCALES)
+        for (name, values) in SCALES.items():
+            sums = sequenceTools.calc_scaleSum(seqs, name)
+            means = sequenceTools.calc_scaleMean(seqs, name)
+            for (k, seq) in enumerate(seqs):
+                expected = sum([values[a] for a in seq.upper()])
+                self.assertAlmostEqual(expected, sequenceTools.calc_scaleSum(seq, name))
+                self.assertAlmostEqual(expected, sums[k])
+                self.assertAlmostEqual(expected/len(seq), means[k])
+
+        self.assertAlmostEqual(sequenceTools.calc_HydrophobicitySum(seqs[0]), sequenceTools.calc_scaleSum(seqs[0], "KD_HYDROPHOBICITY"))
+        self.assertAlmostEqual(sequenceTools.calc_EntropySum(seqs[1], "coil"), sequenceTools.calc_scaleSum(seqs[1], "COIL_ENTROPY"))
+
+        # a user scale works everywhere once registered
+        register_scale("TEST_SCALE", dict([(a, float(k)) for (k, a) in enumerate(AA)]))
+        self.assertAlmostEqual(AA.index("W"), sequenceTools.calc_scaleSum("W", "TEST_SCALE"))
+        self.assertEqual([AA.index("A"), AA.index("C")], list(sequenceTools.calc_windowProfile("AC", "TEST_SCALE", 1)))
+        del SCALES["TEST_SCALE"]
+        del SCALE_TABLES["TEST_SCALE"]
+
+        # replacing a built in scale changes string and encoded input alike
+        import proteinObject
+        original = dict(SCALES["KD_HYDROPHOBICITY"])
+        try:
+            register_scale("KD_HYDROPHOBICITY", dict([(a, 1.0) for a in AA]))
+            for seq in seqs:
+                enc = sequenceTools.EncodedSequence(seq)
+                self.assertAlmostEqual(len(seq), sequenceTools.calc_HydrophobicitySum(seq))
+                self.assertAlmostEqual(len(seq), sequenceTools.calc_HydrophobicitySum(enc))
+                self.assertAlmostEqual(sequenceTools.calc_HydrophobicityScore(seq), sequenceTools.calc_HydrophobicityScore(enc))
+                self.assertAlmostEqual(len(seq), proteinObject.Protein(seq).HydrophobicitySum)
+
+            # and every function built on the batch descriptor tables
+            import design
+            import mutagenesis
+            scaled = dict(original)
+            scaled["A"] = 10.0
+            register_scale("KD_HYDROPHOBICITY", scaled)
+            names = ["HydrophobicitySum", "HydrophobicityScore"]
+            batch = sequenceTools.calc_batchDescriptors(["AAAK"], names)
+            scan = mutagenesis.calc_mutationalScan("AAAK", names, groups=[], scales=[])
+            codes = bytearray([AA.index(a) for a in "AAAK"])
+            for (k, name) in enumerate(names):
+                expected = getattr(sequenceTools, "calc_" + name)("AAAK")
+                self.assertAlmostEqual(expected, sequenceTools.calc_profile("AAAK")[name])
+                self.assertAlmostEqual(expected, batch[0, k])
+                self.assertAlmostEqual(expected, scan[name][0, AA.index("A")])
+                self.assertAlmostEqual(expected, design._CompositionObjective(name, codes).value)
+            self.assertAlmostEqual(26.1, sequenceTools.calc_HydrophobicitySum("AAAK"))
+        finally:
+            register_scale("KD_HYDROPHOBICITY", original)
+
+        self.assertAlmostEqual(sequenceTools.calc_HydrophobicitySum("AAAK"), sequenceTools.calc_profile("AAAK")["HydrophobicitySum"])
+
+        enc = sequenceTools.EncodedSequence(seqs[1])
+        self.assertAlmostEqual(sequenceTools.calc_EntropySum(seqs[1], "helix"), sequenceTools.calc_EntropySum(enc, "helix"))
+
+        self.assertRaises(aaGroupsException, register_scale, "BAD", {"A" : 1.0})
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_scaleSum, "MKR", "NOT_A_SCALE")
+        self.assertRaises(sequenceTools.sequenceToolsException, sequenceTools.calc_scaleSum, ["MKR", "MKZ"], "KD_HYDROPHOBICITY")
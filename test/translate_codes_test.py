@@ -0,0 +1,99 @@
+import collections
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import translate_codes
+
+FASTA = """>seq1 first record
+MKR
+STw
+>sp|P69905|HBA_HUMAN second record
+ACXE*
+"""
+
+class TestTranslateCodesFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmpdir, "test.fasta")
+        with open(self.filename, "w") as f:
+            f.write(FASTA)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_campari_sequence(self):
+        unknown = collections.Counter()
+        self.assertEqual("ACE\nMet\nLys\nArg\nNME\nEND\n", translate_codes.campari_sequence("MKR"))
+        self.assertEqual("ACE\nAla\nCys\nGlu\nNME\nEND\n", translate_codes.campari_sequence("AcX E*", unknown))
+        self.assertEqual({"X" : 1, "*" : 1}, unknown)
+
+
+    def test_write_campari(self):
+        out = os.path.join(self.tmpdir, "out")
+        (written, unknown) = translate_codes.write_campari([self.filename], translate_codes.DirectoryWriter(out))
+
+        self.assertEqual(2, written)
+        self.assertEqual({"X" : 1, "*" : 1}, unknown)
+        with open(os.path.join(out, "seq1.in")) as f:
+            self.assertEqual("ACE\nMet\nLys\nArg\nSer\nThr\nTrp\nNME\nEND\n", f.read())
+        self.assertTrue(os.path.exists(os.path.join(out, "sp|P69905|HBA_HUMAN.in")))
+
+        # sharded directory
+        sharded = translate_codes.DirectoryWriter(os.path.join(self.tmpdir, "sharded"), shard_depth=2)
+        translate_codes.write_campari([self.filename], sharded)
+        path = sharded.path("seq1.in")
+        self.assertEqual(3, len(os.path.relpath(path, sharded.directory).split(os.sep)))
+        self.assertTrue(os.path.exists(path))
+
+        # archive
+        archive = os.path.join(self.tmpdir, "out.tar.gz")
+        translate_codes.write_campari([self.filename], translate_codes.TarWriter(archive))
+        with tarfile.open(archive) as tar:
+            self.assertEqual(["seq1.in", "sp|P69905|HBA_HUMAN.in"], sorted(tar.getnames()))
+            self.assertEqual("ACE\nAla\nCys\nGlu\nNME\nEND\n", tar.extractfile("sp|P69905|HBA_HUMAN.in").read())
+
+        # duplicate ids (and ids which clash once made into file names)
+        # each get their own file
+        with open(self.filename, "w") as f:
+            f.write(">seq1 a\nMK\n>seq1 b\nMR\n>seq1_2\nMW\n>seq1 c\nMH\n")
+        out = os.path.join(self.tmpdir, "duplicates")
+        (written, _) = translate_codes.write_campari([self.filename], translate_codes.DirectoryWriter(out, threads=4))
+        self.assertEqual(4, written)
+        contents = {}
+        for name in os.listdir(out):
+            with open(os.path.join(out, name)) as f:
+                contents[name] = f.read().split("\n")[2]
+        self.assertEqual({"seq1.in" : "Lys", "seq1_2.in" : "Arg", "seq1_2_2.in" : "Trp", "seq1_3.in" : "His"}, contents)
+
+
+    def test_convert(self):
+        self.assertEqual("Ala", translate_codes.convert_AA_1_to_3("a"))
+        self.assertEqual(None, translate_codes.convert_AA_1_to_3("X"))
+        self.assertEqual(["Met", "Lys", "His"], translate_codes.convert_AA_sequence_1_to_3("MKXH"))
+
+        self.assertEqual("H", translate_codes.convert_AA_3_to_1("hie"))
+        self.assertEqual("W", translate_codes.convert_AA_3_to_1("Trp"))
+        self.assertEqual(None, translate_codes.convert_AA_3_to_1("ACE"))
+
+        unknown = {}
+        self.assertEqual(["ACE", "MET", "HID", "NME"], translate_codes.convert_sequence_1_to_3("M*H", his="HID", upper=True, caps=True, unknown=unknown))
+        self.assertEqual({"*" : 1}, unknown)
+        self.assertRaises(translate_codes.translate_codesException, translate_codes.convert_sequence_1_to_3, "MH", his="HIX")
+
+        campari = translate_codes.campari_sequence("MKHW", his="HIE")
+        self.assertEqual("ACE\nMet\nLys\nHIE\nTrp\nNME\nEND\n", campari)
+        self.assertEqual("MKHW", translate_codes.convert_sequence_3_to_1(campari))
+        self.assertRaises(translate_codes.translate_codesException, translate_codes.convert_sequence_3_to_1, ["Ala", "Xyz"])
+
+        unknown = {}
+        self.assertEqual("A", translate_codes.convert_sequence_3_to_1(["Ala", "Xyz"], unknown))
+        self.assertEqual({"Xyz" : 1}, unknown)
+
+        seqs = ["MKRSTW", "ACDEFGHIKLMNPQRSTVWY", "h"]
+        codes = translate_codes.convert_batch_1_to_3(seqs)
+        self.assertEqual([s.upper() for s in seqs], translate_codes.convert_batch_3_to_1(codes))
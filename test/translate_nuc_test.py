@@ -0,0 +1,95 @@
+import os
+import random
+import shutil
+import tempfile
+import unittest
+import sequenceTools
+import translate_nuc
+
+COMPLEMENT = {"A" : "T", "T" : "A", "C" : "G", "G" : "C"}
+
+CODONS = [a+b+c for a in "TCAG" for b in "TCAG" for c in "TCAG"]
+
+
+def slowTranslate(seq):
+    code = dict(zip(CODONS, translate_nuc.STANDARD_CODE))
+    return "".join([code.get(seq[i:i+3], "X") for i in range(0, len(seq)-2, 3)])
+
+
+def reverseComplement(seq):
+    return "".join([COMPLEMENT[x] for x in reversed(seq)])
+
+
+class TestTranslateNucFunctions(unittest.TestCase):
+
+    # Build manager object for all tests here
+    def setUp(self):
+        rng = random.Random(7)
+        random_dna = "".join([rng.choice("ACGT") for i in range(2000)])
+
+        # a known ORF on each strand
+        self.orf = "ATG" + "GCTAAAGAA"*12 + "TAA"
+        self.seq = random_dna[:500] + self.orf + random_dna[500:1000] + reverseComplement(self.orf) + random_dna[1000:]
+
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+
+    def test_translate_frames(self):
+        frames = translate_nuc.translate_frames(self.seq)
+        rc = reverseComplement(self.seq)
+        for offset in range(3):
+            self.assertEqual(slowTranslate(self.seq[offset:]), frames[offset+1])
+            self.assertEqual(slowTranslate(rc[offset:]), frames[-(offset+1)])
+
+        # RNA, lower case and unknown bases
+        self.assertEqual("MK*", translate_nuc.translate("augaaauaa"))
+        self.assertEqual("MXK", translate_nuc.translate("ATGANAAAA"))
+        self.assertEqual("F", translate_nuc.translate("AAAA", -1))
+        self.assertEqual("", translate_nuc.translate("AT"))
+
+        self.assertRaises(translate_nuc.translate_nucException, translate_nuc.translate, "ATG", 4)
+        self.assertRaises(translate_nuc.translate_nucException, translate_nuc.translate, "ATG", 1, "FF")
+
+
+    def test_find_orfs(self):
+        orfs = translate_nuc.find_orfs(self.seq, 20)
+        protein = slowTranslate(self.orf)[:-1]
+
+        self.assertTrue((1 + 500 % 3, 500, 500+len(self.orf), protein) in orfs)
+        start = 1000 + len(self.orf)
+        self.assertTrue(protein in [p for (frame, s, e, p) in orfs if frame < 0 and s == start and e == start + len(self.orf)])
+
+        # coordinates cover the ORF and its stop on either strand
+        for (frame, start, end, protein) in orfs:
+            self.assertTrue(len(protein) >= 20)
+            region = self.seq[start:end]
+            if frame < 0:
+                region = reverseComplement(region)
+            self.assertEqual(protein + "*", slowTranslate(region))
+
+        # ORFs go straight into the descriptor functions
+        values = sequenceTools.calc_batchDescriptors([p for (_, _, _, p) in orfs], ["NCPR"])
+        self.assertEqual(len(orfs), len(values))
+
+        self.assertEqual([], translate_nuc.find_orfs("ATGAAACCC", 1))
+        self.assertEqual([(1, 0, 9, "MKP")], translate_nuc.find_orfs("ATGAAACCC", 1, partial=True))
+        self.assertEqual([], translate_nuc.find_orfs("ATGANATAA", 1))
+        self.assertEqual([(1, 0, 9, "MX")], translate_nuc.find_orfs("ATGANATAA", 1, allow_unknown=True))
+
+
+    def test_iter_orfs(self):
+        filename = os.path.join(self.tmpdir, "test.fna")
+        with open(filename, "w") as f:
+            f.write(">chr1 test\n")
+            for i in range(0, len(self.seq), 70):
+                f.write(self.seq[i:i+70] + "\n")
+            f.write(">chr2\n" + self.orf + "\n")
+
+        orfs = list(translate_nuc.iter_orfs(filename, 20))
+        self.assertEqual([("chr1 test",) + orf for orf in translate_nuc.find_orfs(self.seq, 20)], orfs[:-1])
+        self.assertEqual(("chr2", 1, 0, len(self.orf)), orfs[-1][:4])
+
+        self.assertEqual(12, len(list(translate_nuc.iter_frames(filename))))
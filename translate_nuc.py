@@ -0,0 +1,253 @@
+#!/usr/bin/python
+# translate_nuc
+#
+# Six frame translation of DNA/RNA and open reading frame (ORF) finding.
+#
+# Every nucleotide is mapped to a code (T/U=0, C=1, A=2, G=3, anything
+# else 4) with a 256 entry lookup table, and every position i of a strand
+# gets the codon index
+#
+#     16*code[i] + 4*code[i+1] + code[i+2]
+#
+# in one vectorized pass. Codons containing an unknown base get index 64.
+# Frame f of the strand is then just index[f::3], and the amino acids are
+# a single lookup of those indices in a 65 entry table (the genetic code
+# plus 'X'). The reverse strand is the same calculation on the reverse
+# complement, which is the code array reversed with T<->A and C<->G
+# swapped (code ^ 2).
+#
+# ORFs run from a start codon (M) to the next stop codon in the same
+# frame. Proteins are returned without the stop, and by default ORFs
+# containing unknown bases (X) are skipped, so every protein can be passed
+# straight to the sequenceTools descriptor functions.
+#
+# Files are read one record at a time (see read_fasta), so only the
+# record being translated is ever held in memory.
+#
+
+import numpy as np
+
+from protein.extract_accessions import read_fasta
+
+
+# ---------------------------------------
+#
+class translate_nucException(Exception):
+    """
+       Exception class for translate_nuc methods
+    """
+    pass
+
+
+# NCBI translation table 1, codons ordered TTT, TTC, TTA, TTG, TCT ...
+STANDARD_CODE = "FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG"
+
+# frame names, in the order returned by translate_frames
+FRAMES = (1, 2, 3, -1, -2, -3)
+
+# default minimum ORF length (amino acids, not counting the stop)
+MIN_ORF_LENGTH = 30
+
+_UNKNOWN = 4
+
+_NUC_LUT = np.empty(256, dtype=np.uint8)
+_NUC_LUT.fill(_UNKNOWN)
+for (_bases, _code) in (("TtUu", 0), ("Cc", 1), ("Aa", 2), ("Gg", 3)):
+    for _base in _bases:
+        _NUC_LUT[ord(_base)] = _code
+
+
+def _codeTable(code):
+    """ Genetic code as a 65 entry uint8 array (index 64 = 'X')
+    """
+    if len(code) != 64:
+        raise translate_nucException("Genetic code must have 64 entries, not " + str(len(code)))
+    return np.frombuffer(code.upper() + "X", dtype=np.uint8)
+
+
+def _encode(seq):
+    """ Nucleotide sequence as an array of base codes
+    """
+    return _NUC_LUT[np.frombuffer(seq, dtype=np.uint8)]
+
+
+def _codonIndices(codes):
+    """ Codon index starting at every position of a strand (len-2 values)
+    """
+    if len(codes) < 3:
+        return np.zeros(0, dtype=np.uint8)
+
+    index = 16*codes[:-2] + 4*codes[1:-1] + codes[2:]
+    index[(codes[:-2] == _UNKNOWN) | (codes[1:-1] == _UNKNOWN) | (codes[2:] == _UNKNOWN)] = 64
+    return index
+
+
+def _strandIndices(seq):
+    """ Codon indices of the forward strand and of the reverse complement
+    """
+    codes = _encode(seq)
+    reverse = codes[::-1] ^ 2
+    reverse[reverse == _UNKNOWN ^ 2] = _UNKNOWN
+    return (_codonIndices(codes), _codonIndices(reverse))
+
+
+def translate_frames(seq, code=STANDARD_CODE):
+    """ Input:  A nucleotide sequence (DNA or RNA, any case) and optionally
+                a genetic code (64 amino acids in TCAG order)
+
+        Output: Dictionary of frame -> protein sequence for each of the
+                FRAMES, where frames 1-3 start at the first, second and
+                third base of the sequence and -1 to -3 at the first,
+                second and third base of its reverse complement. Stops
+                are '*' and codons with unknown bases 'X'
+    """
+    table = _codeTable(code)
+    (forward, reverse) = _strandIndices(seq)
+
+    frames = {}
+    for offset in range(3):
+        frames[offset+1] = table[forward[offset::3]].tostring()
+        frames[-(offset+1)] = table[reverse[offset::3]].tostring()
+    return frames
+
+
+def translate(seq, frame=1, code=STANDARD_CODE):
+    """ Input:  A nucleotide sequence, a frame (one of FRAMES) and
+                optionally a genetic code
+
+        Output: Translation of that frame (see translate_frames)
+    """
+    if frame not in FRAMES:
+        raise translate_nucException("Invalid frame " + str(frame) + ". Options are " + str(FRAMES))
+    return translate_frames(seq, code)[frame]
+
+
+def _framePosition(frame, aa, n):
+    """ Position (0 based, on the forward strand) of the first base of
+        codon aa in frame, for a sequence of n bases
+    """
+    if frame > 0:
+        return frame - 1 + 3*aa
+    return n - (-frame - 1 + 3*aa) - 3
+
+
+def find_orfs(seq, min_length=MIN_ORF_LENGTH, code=STANDARD_CODE, allow_unknown=False, partial=False):
+    """ Input:  A nucleotide sequence and optionally
+
+                min_length      Shortest ORF returned (amino acids, not
+                                counting the stop)
+
+                code            Genetic code (64 amino acids in TCAG
+                                order)
+
+                allow_unknown   Keep ORFs containing unknown bases (X)
+
+                partial         Also return ORFs which reach the end of
+                                the sequence without a stop
+
+        Output: List of (frame, start, end, protein) tuples, ordered by
+                frame and then position in the frame. start and end are
+                0 based positions on the forward strand with end
+                exclusive (so seq[start:end] covers the ORF and its stop
+                for frames 1-3, and its reverse complement for -1 to -3)
+                and protein doesn't include the stop
+    """
+    frames = translate_frames(seq, code)
+    n = len(seq)
+
+    orfs = []
+    for frame in FRAMES:
+        aa = np.frombuffer(frames[frame], dtype=np.uint8)
+
+        stops = np.flatnonzero(aa == ord("*"))
+        if partial:
+            stops = np.append(stops, len(aa))
+        starts = np.flatnonzero(aa == ord("M"))
+        if len(stops) == 0 or len(starts) == 0:
+            continue
+
+        # the first start codon after each stop (or the beginning of
+        # the frame) begins the ORF closed by the next stop
+        previous = np.concatenate(([0], stops[:-1] + 1))
+        first = np.searchsorted(starts, previous)
+        valid = first < len(starts)
+        (previous, first, stops) = (previous[valid], starts[first[valid]], stops[valid])
+
+        keep = (first < stops) & (stops - first >= min_length)
+        for (begin, stop) in zip(first[keep], stops[keep]):
+            protein = frames[frame][begin:stop]
+            if not allow_unknown and "X" in protein:
+                continue
+
+            # the coordinates include the stop codon, if there is one
+            last = stop if stop < len(aa) else stop - 1
+            if frame > 0:
+                (start, end) = (_framePosition(frame, begin, n), _framePosition(frame, last, n) + 3)
+            else:
+                (start, end) = (_framePosition(frame, last, n), _framePosition(frame, begin, n) + 3)
+            orfs.append((frame, start, end, protein))
+
+    return orfs
+
+
+def iter_orfs(filename, min_length=MIN_ORF_LENGTH, code=STANDARD_CODE, allow_unknown=False, partial=False):
+    """ Input:  Name of a nucleotide FASTA file as string (or an open file
+                object) and the options for find_orfs
+
+        Output: Generator which yields (header, frame, start, end, protein)
+                for every ORF in every record, reading one record at a time
+    """
+    for (header, seq) in read_fasta(filename):
+        for orf in find_orfs(seq, min_length, code, allow_unknown, partial):
+            yield (header,) + orf
+
+
+def iter_frames(filename, code=STANDARD_CODE):
+    """ Input:  Name of a nucleotide FASTA file as string (or an open file
+                object)
+
+        Output: Generator which yields (header, frame, protein) for each
+                of the six frames of every record, reading one record at
+                a time
+    """
+    for (header, seq) in read_fasta(filename):
+        frames = translate_frames(seq, code)
+        for frame in FRAMES:
+            yield (header, frame, frames[frame])
+
+
+def _writeFasta(out, header, protein, width=60):
+    out.write(">" + header + "\n")
+    for i in xrange(0, len(protein), width):
+        out.write(protein[i:i+width] + "\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='Translate a nucleotide FASTA file in all six frames, or find its open reading frames, writing protein FASTA to stdout. [Contact alex@holehouse.org]')
+    parser.add_argument('filename', help='nucleotide FASTA file ("-" for stdin)')
+    parser.add_argument('--frames', action='store_true', help='write the six frame translations rather than ORFs')
+    parser.add_argument('--min', type=int, default=MIN_ORF_LENGTH, help='shortest ORF in amino acids (default = %(default)s)')
+    parser.add_argument('--unknown', action='store_true', help='keep ORFs containing unknown bases (X)')
+    parser.add_argument('--partial', action='store_true', help='keep ORFs which run off the end of a record without a stop')
+
+    args = parser.parse_args()
+
+    source = sys.stdin if args.filename == "-" else args.filename
+
+    try:
+        if args.frames:
+            for (header, frame, protein) in iter_frames(source):
+                _writeFasta(sys.stdout, header.split()[0] + " frame=" + str(frame), protein)
+        else:
+            count = {}
+            for (header, frame, start, end, protein) in iter_orfs(source, args.min, allow_unknown=args.unknown, partial=args.partial):
+                name = header.split()[0]
+                count[name] = count.get(name, 0) + 1
+                _writeFasta(sys.stdout, name + "_orf" + str(count[name]) + " frame=" + str(frame) + " start=" + str(start+1) + " end=" + str(end), protein)
+
+    except (IOError, translate_nucException), e:
+        print "[ERROR] - " + str(e)
+        exit(1)